@@ -1,10 +1,12 @@
 import logging
+import os
 from pathlib import Path
 
 import requests
 
 from back.scripts.datasets.entities import FileMetadata
 from back.scripts.interfaces.file_downloader import IFileDownloader
+from back.scripts.utils.downloads import conditional_headers, save_validators, verify
 
 LOGGER = logging.getLogger(__name__)
 
@@ -12,11 +14,15 @@ LOGGER = logging.getLogger(__name__)
 class HttpFileDownloader(IFileDownloader):
     """
     A file downloader that retrieves files from HTTP/HTTPS URLs.
+
+    With `refresh`, files already downloaded are revalidated with a conditional GET
+    (ETag / Last-Modified of the previous download), and only downloaded again if modified.
     """
 
-    def __init__(self, base_data_folder: Path):
+    def __init__(self, base_data_folder: Path, refresh: bool = False):
         self.base_data_folder = base_data_folder
         self.base_data_folder.mkdir(exist_ok=True, parents=True)
+        self.refresh = refresh
 
     def _get_raw_path(self, file_metadata: FileMetadata) -> Path:
         """
@@ -27,21 +33,33 @@ class HttpFileDownloader(IFileDownloader):
     def download(self, file_metadata: FileMetadata) -> Path | None:
         """
         Downloads the file specified in the metadata.
-        If the file already exists, it is not re-downloaded.
+        If the file already exists, it is not re-downloaded, unless it has been modified
+        on the server and the downloader is refreshing.
         """
         output_filename = self._get_raw_path(file_metadata)
-        if output_filename.exists():
+        if output_filename.exists() and not self.refresh:
             LOGGER.debug(f"File {output_filename} already exists, skipping download.")
             return output_filename
 
         output_filename.parent.mkdir(exist_ok=True, parents=True)
+        part_filename = output_filename.with_name(output_filename.name + ".part")
 
         try:
-            with requests.get(file_metadata.url, stream=True) as r:
+            headers = conditional_headers(output_filename)
+            with requests.get(file_metadata.url, headers=headers, stream=True) as r:
+                if r.status_code == 304:
+                    LOGGER.debug(f"File {file_metadata.url} not modified, skipping download.")
+                    return output_filename
                 r.raise_for_status()
-                with open(output_filename, "wb") as f:
+                with open(part_filename, "wb") as f:
                     for chunk in r.iter_content(chunk_size=8192):
                         f.write(chunk)
+                # requests decodes compressed content, whose length differs from Content-Length
+                size = r.headers.get("Content-Length")
+                if size and size.isdigit() and "Content-Encoding" not in r.headers:
+                    verify(part_filename, size=int(size))
+                os.replace(part_filename, output_filename)
+                save_validators(output_filename, file_metadata.url, r.headers)
             LOGGER.debug(f"Downloaded file {file_metadata.url}")
             return output_filename
         except requests.exceptions.HTTPError as error:
@@ -1,4 +1,5 @@
 import logging
+import time
 from pathlib import Path
 from typing import Any
 
@@ -13,6 +14,7 @@ from back.scripts.interfaces.file_downloader import IFileDownloader
 from back.scripts.interfaces.file_parser import IFileParser
 from back.scripts.interfaces.workflow import IWorkflow, IWorkflowFactory
 from back.scripts.utils.config import get_project_base_path
+from back.scripts.utils.norm_manifest import NormManifest
 from back.scripts.utils.polars_operation import normalize_date_pl
 
 LOGGER = logging.getLogger(__name__)
@@ -26,25 +28,34 @@ def _normalize_files(
 ) -> None:
     """Download, parse, and save normalized versions of financial account files."""
     LOGGER.info(f"Normalizing {len(files)} financial account files...")
+    manifest = NormManifest(data_folder)
+    normalized = manifest.normalized_hashes()
     for file_meta in tqdm(files, desc="Normalizing financial account files"):
         norm_path = data_folder / file_meta.url_hash / "norm.parquet"
-        if norm_path.exists():
+        if file_meta.url_hash in normalized:
             continue
 
         raw_path = downloader.download(file_meta)
         if not raw_path:
             LOGGER.warning(f"Failed to download {file_meta.url}, skipping.")
+            manifest.record_failed(file_meta.url_hash, "Download failed")
             continue
 
+        start = time.monotonic()
         parsed_lazy_df = parser.parse(file_meta, raw_path)
         if parsed_lazy_df is not None:
             norm_path.parent.mkdir(exist_ok=True, parents=True)
             parsed_lazy_df.sink_parquet(norm_path)
+            manifest.record_normalized(file_meta.url_hash, norm_path, time.monotonic() - start)
+        else:
+            manifest.record_failed(
+                file_meta.url_hash, "Parsing failed", time.monotonic() - start
+            )
 
 
 def _concatenate_normalized_files(data_folder: Path, output_path: Path) -> None:
     """Concatenates all normalized parquet files into a single output file."""
-    all_norm_files = list(data_folder.glob("*/norm.parquet"))
+    all_norm_files = NormManifest(data_folder).normalized_paths()
     if not all_norm_files:
         LOGGER.warning("No normalized files found to concatenate for Financial Accounts.")
         return
@@ -226,15 +237,24 @@ class FinancialAccountsWorkflow(IWorkflow):
 class FinancialAccountsWorkflowFactory(IWorkflowFactory):
     """Factory to create the FinancialAccountsWorkflow from configuration."""
 
+    config_key = "financial_accounts"
+
+    @classmethod
+    def get_output_path(cls, main_config: dict) -> Path:
+        return get_project_base_path() / main_config[cls.config_key]["combined_filename"]
+
+    @classmethod
+    def get_input_paths(cls, main_config: dict) -> list[Path]:
+        return []
+
     @classmethod
     def from_config(cls, main_config: dict) -> IWorkflow:
-        config_key = "financial_accounts"
-        config = main_config[config_key]
+        config = main_config[cls.config_key]
 
         base_path = get_project_base_path()
         files_csv_path = base_path / config["files_csv"]
         data_folder = base_path / config["data_folder"]
-        output_path = base_path / config["combined_filename"]
+        output_path = cls.get_output_path(main_config)
 
         data_source = UrlDataSource(files_csv_path)
         downloader = HttpFileDownloader(data_folder)
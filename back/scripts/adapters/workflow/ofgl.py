@@ -1,4 +1,5 @@
 import logging
+import time
 from pathlib import Path
 
 import pandera.polars as pa
@@ -15,6 +16,7 @@ from back.scripts.interfaces.file_parser import IFileParser
 from back.scripts.interfaces.workflow import IWorkflow, IWorkflowFactory
 from back.scripts.utils.config import get_project_base_path
 from back.scripts.utils.dataframe_operation import IdentifierFormat
+from back.scripts.utils.norm_manifest import NormManifest
 from back.scripts.utils.polars_operation import (
     normalize_column_names_pl,
     normalize_identifiant_pl,
@@ -107,6 +109,7 @@ class OfglWorkflow(IWorkflow):
         self.parser = parser
         self.output_path = output_path
         self.data_folder = data_folder
+        self.manifest = NormManifest(data_folder)
 
     def get_output_path(self) -> Path:
         return self.output_path
@@ -125,10 +128,10 @@ class OfglWorkflow(IWorkflow):
             return
 
         all_files = self.data_source.get_files()
+        normalized = self.manifest.normalized_hashes()
         for file_meta in tqdm(all_files, desc="Processing OFGL files"):
             norm_path = self._get_norm_path(file_meta)
-            val_path = self._get_validation_path(file_meta)
-            if norm_path.exists():
+            if file_meta.url_hash in normalized:
                 continue
 
             raw_path = None
@@ -150,19 +153,28 @@ class OfglWorkflow(IWorkflow):
                     raw_path = None
 
             if not raw_path:
+                self.manifest.record_failed(file_meta.url_hash, "Raw file not available")
                 continue
 
+            start = time.monotonic()
             parsed_lazy_df = self.parser.parse(file_meta, raw_path)
             if parsed_lazy_df is not None:
                 norm_path.parent.mkdir(exist_ok=True, parents=True)
                 # Use sink_parquet for lazy frames
                 parsed_lazy_df.sink_parquet(norm_path)
+                self.manifest.record_normalized(
+                    file_meta.url_hash, norm_path, time.monotonic() - start
+                )
+            else:
+                self.manifest.record_failed(
+                    file_meta.url_hash, "Parsing failed", time.monotonic() - start
+                )
 
         self._concatenate_files()
 
     def _concatenate_files(self):
         """Concatenates all normalized parquet files into a single output file."""
-        all_norm_files = list(self.data_folder.glob("*/norm.parquet"))
+        all_norm_files = self.manifest.normalized_paths()
         if not all_norm_files:
             LOGGER.warning("No normalized files found to concatenate for OFGL.")
             return
@@ -178,15 +190,24 @@ class OfglWorkflow(IWorkflow):
 class OfglWorkflowFactory(IWorkflowFactory):
     """Factory to create the OfglWorkflow from configuration."""
 
+    config_key = "ofgl"
+
+    @classmethod
+    def get_output_path(cls, main_config: dict) -> Path:
+        return get_project_base_path() / main_config[cls.config_key]["combined_filename"]
+
+    @classmethod
+    def get_input_paths(cls, main_config: dict) -> list[Path]:
+        return []
+
     @classmethod
     def from_config(cls, main_config: dict) -> IWorkflow:
-        config_key = "ofgl"
-        ofgl_config = main_config[config_key]
+        ofgl_config = main_config[cls.config_key]
 
         base_path = get_project_base_path()
         urls_csv_path = base_path / ofgl_config["urls_csv"]
         data_folder = base_path / ofgl_config["data_folder"]
-        output_path = base_path / ofgl_config["combined_filename"]
+        output_path = cls.get_output_path(main_config)
 
         data_source = UrlDataSource(urls_csv_path)
         downloader = HttpFileDownloader(data_folder)
@@ -1,11 +1,12 @@
 import logging
+from pathlib import Path
 
 import pandas as pd
 
 from back.scripts.adapters.workflow.ofgl import OfglWorkflowFactory
+from back.scripts.datasets.sirene import SireneWorkflow
 from back.scripts.datasets.utils import BaseDataset
 from back.scripts.loaders.base_loader import BaseLoader
-from back.scripts.utils.config import project_config
 from back.scripts.utils.dataframe_operation import (
     IdentifierFormat,
     normalize_column_names,
@@ -29,6 +30,13 @@ class CommunitiesSelector(BaseDataset):
     def get_config_key(cls) -> str:
         return "communities"
 
+    @classmethod
+    def get_input_paths(cls, main_config: dict) -> list[Path]:
+        return [
+            OfglWorkflowFactory.get_output_path(main_config),
+            SireneWorkflow.get_public_sector_path(main_config),
+        ]
+
     @tracker(ulogger=LOGGER, log_start=True)
     def run(self):
         if self.output_filename.exists():
@@ -61,10 +69,16 @@ class CommunitiesSelector(BaseDataset):
 
     @tracker(ulogger=LOGGER, log_start=True)
     def add_sirene_infos(self, frame: pd.DataFrame) -> pd.DataFrame:
-        sirene = pd.read_parquet(
-            project_config["sirene"]["combined_filename"],
-            columns=["siren", "naf8", "tranche_effectif", "raison_sociale", "is_active"],
-        ).pipe(lambda df: df[df["naf8"].isin(["8411Z", "8710C", "3700Z", "8413Z"])])
+        # Public administrations only, among which the communities are found
+        sirene = (
+            BaseLoader.loader_factory(
+                SireneWorkflow.get_public_sector_path(self.main_config),
+                columns=["siren", "naf8", "tranche_effectif", "raison_sociale", "is_active"],
+            )
+            .load_lazy()
+            .collect()
+            .to_pandas()
+        )
 
         return (
             frame.merge(sirene, on="siren", how="left")
@@ -75,8 +89,14 @@ class CommunitiesSelector(BaseDataset):
                 nom=lambda df: df["raison_sociale"].fillna(df["nom"]),
             )
             .assign(
-                should_publish=lambda df: (df["type"] != "COM")
-                | ((df["type"] == "COM") & (df["population"] >= 3500) & df["effectifs_sup_50"])
+                should_publish=lambda df: (
+                    (df["type"] != "COM")
+                    | (
+                        (df["type"] == "COM")
+                        & (df["population"] >= 3500)
+                        & df["effectifs_sup_50"]
+                    )
+                )
             )
             .drop(columns=["raison_sociale", "is_active"])
             .merge(
@@ -1,7 +1,6 @@
 import json
 import os
 import tarfile
-import urllib.request
 from io import StringIO
 from pathlib import Path
 
@@ -12,6 +11,7 @@ from polars import col
 from back.scripts.datasets.datagouv_catalog import DataGouvCatalog
 from back.scripts.datasets.utils import BaseDataset
 from back.scripts.utils.dataframe_operation import IdentifierFormat, normalize_identifiant
+from back.scripts.utils.downloads import download
 
 
 class CommunitiesContact(BaseDataset):
@@ -27,6 +27,10 @@ class CommunitiesContact(BaseDataset):
     def get_config_key(cls) -> str:
         return "communities_contacts"
 
+    @classmethod
+    def get_input_paths(cls, main_config: dict) -> list[Path]:
+        return [DataGouvCatalog.get_output_path(main_config)]
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.interm_filename = self.data_folder / "raw.tar.bz2"
@@ -71,7 +75,7 @@ class CommunitiesContact(BaseDataset):
         if self.interm_filename.exists():
             return
         url = self._db_url()
-        urllib.request.urlretrieve(url, self.interm_filename)
+        download(url, self.interm_filename)
 
     def _extract_targz(self):
         if self.extracted_dir.exists():
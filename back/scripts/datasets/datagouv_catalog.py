@@ -27,6 +27,10 @@ class DataGouvCatalog(BaseDataset):
     def get_config_key(cls) -> str:
         return "datagouv_catalog"
 
+    @classmethod
+    def get_input_paths(cls, main_config: dict) -> list[Path]:
+        return [CommunitiesSelector.get_output_path(main_config)]
+
     @tracker(ulogger=LOGGER, log_start=True)
     def run(self):
         if self.output_filename.exists():
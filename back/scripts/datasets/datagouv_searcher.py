@@ -1,5 +1,6 @@
 import logging
 import re
+from pathlib import Path
 
 import pandas as pd
 
@@ -23,6 +24,10 @@ class DataGouvSearcher(BaseDataset):
     def get_config_key(cls) -> str:
         return "datagouv_search"
 
+    @classmethod
+    def get_input_paths(cls, main_config: dict) -> list[Path]:
+        return [DataGouvCatalog.get_output_path(main_config)]
+
     def run(self):
         if self.output_filename.exists():
             return
@@ -1,9 +1,12 @@
 import hashlib
 import json
 import logging
-import urllib.request
+import threading
+import time
 from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Any, Callable
 from urllib.error import HTTPError
 
 import pandas as pd
@@ -13,6 +16,8 @@ from tqdm import tqdm
 from back.scripts.datasets.utils import BaseDataset
 from back.scripts.loaders import BaseLoader
 from back.scripts.utils.decorators import tracker
+from back.scripts.utils.downloads import HostThrottle, download
+from back.scripts.utils.norm_manifest import NormManifest
 from back.scripts.utils.typing import PandasRow
 
 LOGGER = logging.getLogger(__name__)
@@ -30,6 +35,37 @@ def _sha256(s: str | None) -> str | None:
     return None if pd.isna(s) else hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 
+_WORKER_AGGREGATOR: "DatasetAggregator | None" = None
+
+
+def _init_normalize_worker(aggregator: "DatasetAggregator") -> None:
+    global _WORKER_AGGREGATOR
+    _WORKER_AGGREGATOR = aggregator
+
+
+def _worker_ready() -> bool:
+    return True
+
+
+def _normalize_in_worker(file_record: dict) -> dict:
+    """
+    Normalize a file in a worker process and return the path of the normalized file,
+    with the contributions of the file to the aggregator state
+    (errors, and subclass specific audit data).
+    """
+    aggregator = _WORKER_AGGREGATOR
+    aggregator._reset_contributions()
+    index = file_record.pop("Index")
+    # itertuples namedtuples cannot be pickled, the row is rebuilt from its fields
+    file_metadata = next(pd.DataFrame([file_record], index=[index]).itertuples())
+    start = time.monotonic()
+    norm_path = aggregator._normalize_file(file_metadata)
+    return aggregator._get_contributions() | {
+        "norm_path": norm_path,
+        "duration": time.monotonic() - start,
+    }
+
+
 class DatasetAggregator(BaseDataset):
     """
     Base class for multiple dataset aggregation functionality.
@@ -54,6 +90,17 @@ class DatasetAggregator(BaseDataset):
 
     Intermediate files directory and final combined filename are defined in the config.yaml file,
     respectively as "data_folder" and "combined_filename".
+
+    Raw files are downloaded concurrently by a pool of "download_workers" threads, with at most
+    "download_workers_per_host" simultaneous requests and "download_delay_per_host" seconds between
+    two requests on the same host. Each file is normalized as soon as its download is over.
+    With "normalize_workers" > 1, normalization is run in a pool of processes. Each worker
+    returns the contributions of its file to the aggregator state, which are merged following
+    the order of the input files, so that the outputs match the ones of a sequential run.
+
+    The outcome of each normalization is recorded by the main process in a manifest stored
+    in the data folder, which is used instead of scanning the folder to find the files left
+    to normalize and the files to concatenate.
     """
 
     def __init__(self, files: pd.DataFrame, main_config: dict):
@@ -61,8 +108,20 @@ class DatasetAggregator(BaseDataset):
         Initialize a DatasetAggregator Instance which inherits attributes from BaseDataset.
         """
         super().__init__(main_config)
-        self.files_in_scope = files.pipe(self._ensure_url_hash)
+        self.files_in_scope = files.pipe(self._ensure_url_hash).pipe(self._ensure_checksum)
         self.errors = defaultdict(list)
+        self._error_buffer = threading.local()
+        self.manifest = NormManifest(self.data_folder)
+        self.refresh_downloads = self.config.get("refresh_downloads", False)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_error_buffer"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._error_buffer = threading.local()
 
     def _ensure_url_hash(self, frame: pd.DataFrame) -> pd.DataFrame:
         """
@@ -79,9 +138,22 @@ class DatasetAggregator(BaseDataset):
             return frame.assign(url_hash=hashes)
         return frame.fillna({"url_hash": hashes})
 
+    def _ensure_checksum(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Gather in a "checksum" column the checksums of the data.gouv catalog,
+        either declared with the resource or computed by the data.gouv analysis.
+        """
+        sources = [c for c in ["checksum_value", "extras_analysis:checksum"] if c in frame]
+        if "checksum" in frame.columns or not sources:
+            return frame
+        checksum = frame[sources[0]]
+        for source in sources[1:]:
+            checksum = checksum.fillna(frame[source])
+        return frame.assign(checksum=checksum)
+
     @tracker(ulogger=LOGGER, log_start=True)
     def run(self) -> None:
-        if self.output_filename.exists():
+        if self.output_filename.exists() and not self.refresh_downloads:
             return
         self._process_files()
         self._post_process()
@@ -90,47 +162,220 @@ class DatasetAggregator(BaseDataset):
             json.dump(self.errors, f)
 
     def _process_files(self) -> None:
-        for file_infos in tqdm(self._remaining_to_normalize()):
+        files = []
+        for file_infos in self._remaining_to_normalize():
             if file_infos.url is None or pd.isna(file_infos.url):
                 LOGGER.warning(f"URL not specified for file {file_infos.title}")
                 continue
+            files.append(file_infos)
+
+        throttle = HostThrottle(
+            max_per_host=self.config.get("download_workers_per_host", 2),
+            delay=self.config.get("download_delay_per_host", 0.0),
+        )
+        normalize_workers = self.config.get("normalize_workers", 1)
+        if normalize_workers > 1:
+            self._process_files_in_pool(files, throttle, normalize_workers)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.config.get("download_workers", 1)) as executor:
+            downloads = [
+                executor.submit(self._throttled_download, file_infos, throttle)
+                for file_infos in files
+            ]
+            # Normalization is CPU bound and not thread safe : it runs in the main thread,
+            # in the order of the input files, while the next files are still being downloaded.
+            for file_infos, download in tqdm(
+                zip(files, downloads, strict=True), total=len(files)
+            ):
+                download_errors = download.result()
+                start = time.monotonic()
+                norm_path, errors = self._buffer_errors(
+                    file_infos, self._normalize_file, file_infos
+                )
+                errors = download_errors + errors
+                self._add_errors(errors)
+                self._record_normalization(
+                    file_infos, norm_path, errors, time.monotonic() - start
+                )
+
+    def _process_files_in_pool(
+        self, files: list[PandasRow], throttle: HostThrottle, normalize_workers: int
+    ) -> None:
+        """
+        Download the files in threads and normalize them in a pool of processes.
+        """
+        download_errors: dict[int, list[tuple[str, str]]] = {}
+        normalizations: dict[int, Future] = {}
+        with ProcessPoolExecutor(
+            max_workers=normalize_workers,
+            initializer=_init_normalize_worker,
+            initargs=(self,),
+        ) as pool:
+            # With the fork start method, all the workers are started on the first submission:
+            # start them before the download threads to avoid forking a multi-threaded process.
+            pool.submit(_worker_ready).result()
+            with ThreadPoolExecutor(
+                max_workers=self.config.get("download_workers", 1)
+            ) as executor:
+                downloads = {
+                    executor.submit(self._throttled_download, file_infos, throttle): position
+                    for position, file_infos in enumerate(files)
+                }
+                # Normalizations are submitted as soon as the downloads are over
+                for download in as_completed(downloads):
+                    position = downloads[download]
+                    download_errors[position] = download.result()
+                    normalizations[position] = pool.submit(
+                        _normalize_in_worker, files[position]._asdict()
+                    )
+
+            # ... and their results are merged in the order of the input files
+            for position, file_infos in enumerate(tqdm(files)):
+                result, errors = self._buffer_errors(
+                    file_infos, self._merge_worker_result, normalizations[position]
+                )
+                norm_path, duration = result or (None, None)
+                errors = download_errors[position] + errors
+                self._add_errors(errors)
+                self._record_normalization(file_infos, norm_path, errors, duration)
+
+    def _merge_worker_result(self, normalization: Future) -> tuple[Path | None, float]:
+        """
+        Merge the contributions returned by a worker, and return the normalized file path
+        with the duration of the normalization.
+        """
+        contributions = normalization.result()
+        self._merge_contributions(contributions)
+        return contributions["norm_path"], contributions["duration"]
+
+    def _reset_contributions(self) -> None:
+        """
+        Reset the state filled while normalizing files, before processing a file in a worker.
+        """
+        self.errors = defaultdict(list)
 
-            try:
-                self._process_file(file_infos)
-            except Exception as e:
-                LOGGER.warning(f"Failed to process file {file_infos.url}: {e}")
-                self.errors[str(e)].append(file_infos.url)
+    def _get_contributions(self) -> dict:
+        """
+        State filled while normalizing a file in a worker, to be sent back to the main process.
+        """
+        return {"errors": dict(self.errors)}
+
+    def _merge_contributions(self, contributions: dict) -> None:
+        """
+        Merge into the aggregator the state returned by a worker.
+        """
+        for msg, identifiers in contributions["errors"].items():
+            for identifier in identifiers:
+                self._add_error(msg, identifier)
+
+    def _add_error(self, msg: str, identifier: str) -> None:
+        """
+        Record an error for a file.
+        Within `_buffer_errors`, the error is buffered instead, to be recorded by the caller.
+        """
+        buffer = getattr(self._error_buffer, "buffer", None)
+        if buffer is not None:
+            buffer.append((msg, identifier))
+            return
+        self.errors[msg].append(identifier)
+
+    def _add_errors(self, errors: list[tuple[str, str]]) -> None:
+        for msg, identifier in errors:
+            self._add_error(msg, identifier)
+
+    def _buffer_errors(
+        self, file_metadata: PandasRow, func: Callable, *args
+    ) -> tuple[Any, list[tuple[str, str]]]:
+        """
+        Call a processing step of a file, and return its result with the errors it raised,
+        so that the errors of the download threads and of the workers can be recorded
+        in the order of the input files.
+        The result is None if the step failed with an exception.
+        """
+        errors = []
+        self._error_buffer.buffer = errors
+        try:
+            return func(*args), errors
+        except Exception as e:
+            LOGGER.warning(f"Failed to process file {file_metadata.url}: {e}")
+            errors.append((str(e), file_metadata.url))
+            return None, errors
+        finally:
+            self._error_buffer.buffer = None
+
+    def _record_normalization(
+        self,
+        file_metadata: PandasRow,
+        norm_path: Path | None,
+        errors: list[tuple[str, str]],
+        duration: float | None,
+    ) -> None:
+        """
+        Record the outcome of the processing of a file in the manifest.
+        """
+        if norm_path is not None:
+            self.manifest.record_normalized(file_metadata.url_hash, norm_path, duration)
+            return
+        messages = list(dict.fromkeys(msg for msg, _ in errors))
+        self.manifest.record_failed(
+            file_metadata.url_hash, "; ".join(messages) or None, duration
+        )
 
     def _post_process(self) -> None:
         pass
 
-    def _process_file(self, file: PandasRow) -> None:
+    def _throttled_download(
+        self, file_metadata: PandasRow, throttle: HostThrottle
+    ) -> list[tuple[str, str]]:
         """
-        Download and normalize a spécific file.
+        Download a file in a download thread, and return the errors raised by the download.
         """
-        self._download_file(file)
-        self._normalize_file(file)
+
+        def download() -> None:
+            with throttle.slot(file_metadata.url):
+                self._download_file(file_metadata)
+
+        return self._buffer_errors(file_metadata, download)[1]
 
     def _download_file(self, file_metadata: PandasRow) -> None:
         """
         Save locally the output of the URL.
+        With "refresh_downloads", existing files are revalidated against the server,
+        and the normalized file is removed if the raw file has changed.
         """
         output_filename = self._dataset_filename(file_metadata, "raw")
-        if output_filename.exists():
+        if output_filename.exists() and not self.refresh_downloads:
             LOGGER.debug(f"File {output_filename} already exists, skipping")
             return
-        output_filename.parent.mkdir(exist_ok=True, parents=True)
         try:
-            urllib.request.urlretrieve(file_metadata.url, output_filename)
+            if download(
+                file_metadata.url,
+                output_filename,
+                refresh=self.refresh_downloads,
+                checksum=self._expected_checksum(file_metadata),
+            ):
+                self._dataset_filename(file_metadata, "norm").unlink(missing_ok=True)
         except HTTPError as error:
             LOGGER.warning(f"Failed to download file {file_metadata.url}: {error}")
             msg = f"HTTP error {error.code}"
-            self.errors[msg].append(file_metadata.url)
+            self._add_error(msg, file_metadata.url)
         except Exception as e:
             LOGGER.warning(f"Failed to download file {file_metadata.url}: {e}")
-            self.errors[str(e)].append(file_metadata.url)
+            self._add_error(str(e), file_metadata.url)
         LOGGER.debug(f"Downloaded file {file_metadata.url}")
 
+    def _expected_checksum(self, file_metadata: PandasRow) -> str | None:
+        """
+        Checksum of the file published by data.gouv, when the files come from the catalog.
+        The catalog is a snapshot : when revalidating downloads, the file may have been updated
+        since, so the checksum is not enforced.
+        """
+        if self.refresh_downloads:
+            return None
+        checksum = getattr(file_metadata, "checksum", None)
+        return None if pd.isna(checksum) else checksum
+
     def _dataset_filename(self, file_metadata: PandasRow, step: str) -> Path:
         """
         Expected path for a given file depending on the step (raw or norm).
@@ -141,19 +386,35 @@ class DatasetAggregator(BaseDataset):
             / f"{step}.{file_metadata.format if step == 'raw' else 'parquet'}"
         )
 
-    def _normalize_file(self, file_metadata: PandasRow) -> None:
+    def _normalize_file(self, file_metadata: PandasRow) -> Path | None:
+        """
+        Normalize a downloaded file, and return the path of the normalized file if any.
+        """
         out_filename = self._dataset_filename(file_metadata, "norm")
         if out_filename.exists():
             LOGGER.debug(f"File {out_filename} already exists, skipping")
-            return
+            return out_filename
 
         raw_filename = self._dataset_filename(file_metadata, "raw")
         if not raw_filename.exists():
             LOGGER.debug(f"File {raw_filename} does not exist, skipping")
-            return
+            return None
+        if self._write_normalized(file_metadata, raw_filename, out_filename):
+            return out_filename
+        return None
+
+    def _write_normalized(
+        self, file_metadata: PandasRow, raw_filename: Path, out_filename: Path
+    ) -> bool:
+        """
+        Write the normalized version of a raw file.
+        Returns False if the file could not be normalized.
+        """
         df = self._read_parse_file(file_metadata, raw_filename)
-        if isinstance(df, pd.DataFrame):
-            df.to_parquet(out_filename, index=False)
+        if not isinstance(df, pd.DataFrame):
+            return False
+        df.to_parquet(out_filename, index=False)
+        return True
 
     def _read_parse_file(
         self, file_metadata: PandasRow, raw_filename: Path
@@ -167,7 +428,7 @@ class DatasetAggregator(BaseDataset):
                 raise RuntimeError("Unable to load file into a DataFrame")
             return df.pipe(self._normalize_frame, file_metadata)
         except Exception as e:
-            self.errors[str(e)].append(raw_filename.parent.name)
+            self._add_error(str(e), raw_filename.parent.name)
 
     def _normalize_frame(self, df: pd.DataFrame, file_metadata: PandasRow):
         raise NotImplementedError()
@@ -175,24 +436,13 @@ class DatasetAggregator(BaseDataset):
     def _remaining_to_normalize(self) -> list:
         """
         Select among the input files the ones for which we do not have yet the normalized file.
+        All the files are selected when refreshing the downloads.
         """
-        current = pd.DataFrame(
-            {
-                "url_hash": [
-                    str(x.parent.name) for x in self.data_folder.glob("*/norm.parquet")
-                ],
-                "exists": 1,
-            },
-        ).assign(url_hash=lambda df: df["url_hash"].astype(str).where(df["url_hash"].notnull()))
+        if self.refresh_downloads:
+            return list(self.files_in_scope.itertuples())
+        normalized = self.manifest.normalized_hashes()
         return list(
-            self.files_in_scope.merge(
-                current,
-                how="left",
-                on="url_hash",
-            )
-            .pipe(lambda df: df[df["exists"].isnull()])
-            .drop(columns="exists")
-            .itertuples()
+            self.files_in_scope[~self.files_in_scope["url_hash"].isin(normalized)].itertuples()
         )
 
     def _add_normalized_filenames(self) -> None:
@@ -208,8 +458,10 @@ class DatasetAggregator(BaseDataset):
         Concatenate all the normalized files which have succeeded into a single parquet file.
         This step is made in polars as the sum of all dataset by be heavy on memory.
         """
-        all_files = list(self.data_folder.glob("*/norm.parquet"))
-        LOGGER.info(f"Concatenating {len(all_files)} files for {str(self.output_filename)}")
-        dfs = [pl.scan_parquet(f) for f in all_files]
-        df = pl.concat(dfs, how="diagonal_relaxed")
+        normalized = self.manifest.normalized_files().values()
+        LOGGER.info(f"Concatenating {len(normalized)} files for {str(self.output_filename)}")
+        dfs = [pl.scan_parquet(file.path) for file in normalized]
+        # Columns only need to be aligned and their types relaxed if the schemas differ
+        same_schema = len({file.schema_fingerprint for file in normalized}) <= 1
+        df = pl.concat(dfs, how="vertical" if same_schema else "diagonal_relaxed")
         df.sink_parquet(self.output_filename)
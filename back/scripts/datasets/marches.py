@@ -1,15 +1,19 @@
-import copy
 import decimal
 import itertools
 import json
 import logging
+import os
 import tempfile
+from collections import Counter
 from functools import reduce
 from pathlib import Path
+from typing import Iterable
 from urllib.request import urlretrieve
 
 import ijson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from back.scripts.datasets.datagouv_catalog import DataGouvCatalog
 from back.scripts.datasets.dataset_aggregator import DatasetAggregator
@@ -30,15 +34,48 @@ COLUMNS_RENAMER = {
     "acheteur.id": "acheteur_id",
 }
 
+# Types of the official schema with a dedicated column type, other properties are strings
+ARROW_TYPES = {"number": pa.float64(), "integer": pa.int64(), "boolean": pa.bool_()}
+BOOLEAN_VALUES = {
+    "true": True,
+    "oui": True,
+    "1": True,
+    "false": False,
+    "non": False,
+    "0": False,
+}
+
+# Fields with a dedicated cleaning in `clean_row`, the other ones are copied as is
+CLEANED_FIELDS = {"acheteur", "montant", "titulaires"}
+
+# Fields of the consolidated DECP files which are not part of the official schemas
+EXTRA_COLUMNS = ["uid", "uuid", "source"]
+
 # Fields that only exist in DECP v2.0.3 and not in v1.5.0.
 V2_ONLY_FIELDS = {"ccag", "marcheInnovant", "attributionAvance", "sousTraitanceDeclaree"}
 
 
+# Built once: json.dumps creates a new encoder on each call with non default options
+JSON_ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+
+def dumps_json(value: list | dict) -> str:
+    """
+    Serialize a nested field of a declaration, in a compact form keeping non ASCII characters.
+    The format must not change: the id of a contract is computed from its serialized titulaires.
+    """
+    return JSON_ENCODER.encode(value)
+
+
 class MarchesPublicsWorkflow(DatasetAggregator):
     @classmethod
     def get_config_key(cls) -> str:
         return "marches_publics"
 
+    @classmethod
+    def get_input_paths(cls, main_config: dict) -> list[Path]:
+        return [DataGouvCatalog.get_output_path(main_config)]
+
     @classmethod
     def from_config(cls, main_config: dict):
         """
@@ -78,6 +115,10 @@ class MarchesPublicsWorkflow(DatasetAggregator):
         mp_config = config[self.get_config_key()]
         self._load_schema(mp_config["schema"])
         self._load_schema_v2(mp_config.get("schema_v2"))
+        self.declarations_per_row_group = mp_config.get("declarations_per_row_group", 50_000)
+        # Computed once, and shared with the normalization workers,
+        # so that all the normalized files have the same schema.
+        self.declarations_schema = self.arrow_schema()
 
     def _load_schema(self, url):
         schema_filename = self.data_folder / "official_schema.parquet"
@@ -111,53 +152,66 @@ class MarchesPublicsWorkflow(DatasetAggregator):
     def _read_parse_file(
         self, file_metadata: PandasRow, raw_filename: Path
     ) -> pd.DataFrame | None:
-        self._read_parse_interim(raw_filename)
-        return self._read_parse_final(raw_filename)
-
-    def _read_parse_final(self, raw_filename: Path) -> pd.DataFrame | None:
-        interim_fn = raw_filename.parent / "interim.json"
-        if not interim_fn.exists():
+        out_filename = raw_filename.parent / "norm.parquet"
+        if not self._write_normalized(file_metadata, raw_filename, out_filename):
             return None
-        out = pd.read_json(interim_fn).rename(columns=COLUMNS_RENAMER)
-        object_columns = out.select_dtypes(include=["object"]).columns
-        corrected = {c: out[c].astype("string").where(out[c].notnull()) for c in object_columns}
-        return out.assign(**corrected)
+        return pd.read_parquet(out_filename)
 
     @tracker(ulogger=LOGGER, log_start=True)
-    def _read_parse_interim(self, raw_filename: Path) -> None:
+    def _write_normalized(
+        self, file_metadata: PandasRow, raw_filename: Path, out_filename: Path
+    ) -> bool:
         """
-        Create an intermediate JSON file with cleaned conventions,
-        so that pandas can read it properly.
+        Clean the declarations one at a time and write them directly to the normalized
+        parquet file, one row group every `declarations_per_row_group` declarations.
+        Memory usage does not depend on the size of the file.
         """
-        interim_fn = raw_filename.parent / "interim.json"
-        if interim_fn.exists():
-            return
-
         array_location = self.check_json_structure(raw_filename)
+        if array_location == "unknown":
+            LOGGER.warning(f"No list of declarations found in {raw_filename}")
+            return False
+        items_prefix = f"{array_location}.item" if array_location else "item"
 
-        def select_items(content):
-            """
-            filter top level elements according to detected json structure.
-            """
-            root_structure = array_location.split(".")
-            for top_level in root_structure:
-                if top_level in content:  # what to do when 'root_structure == "unknown"'
-                    content = content[top_level]
-            return content
-
-        with open(raw_filename, "rb") as raw:
-            raw_loaded = json.load(raw)
-            raw_loaded = select_items(raw_loaded)
-            with open(interim_fn, "w") as interim:
-                interim.write("[\n")
-                # Iterate over the JSON array items
-                for i, declaration in enumerate(raw_loaded):
-                    if i:
-                        interim.write(",\n")
-                    cleaned_row = json.dumps(self.clean_row(declaration))
-                    interim.write(cleaned_row)
-
-                interim.write("]\n")
+        writer = DeclarationsWriter(self.declarations_schema, self.declarations_per_row_group)
+        part_filename = out_filename.with_name(out_filename.name + ".part")
+        try:
+            with open(raw_filename, "rb") as raw:
+                declarations = ijson.items(raw, items_prefix, use_float=True)
+                writer.write(part_filename, map(self.clean_row, declarations))
+        except BaseException:
+            part_filename.unlink(missing_ok=True)
+            raise
+        # A partially written file must not be mistaken for a complete one
+        os.replace(part_filename, out_filename)
+        return True
+
+    def arrow_schema(self) -> pa.Schema:
+        """
+        Columns of the normalized files, derived from the official schemas (v1.5.0 and v2.0.3)
+        so that all the files share the same types.
+        Nested properties are stored as strings, as produced by `clean_row`.
+        """
+        types = {}
+        for schema in [self.official_schema, self.official_schema_v2]:
+            if schema is None:
+                continue
+            for prop, prop_type in zip(schema["property"], schema["type"], strict=True):
+                column, _, nested = prop.partition(".")
+                arrow_type = pa.string()
+                if not nested and isinstance(prop_type, str):
+                    arrow_type = ARROW_TYPES.get(prop_type, pa.string())
+                if types.setdefault(column, arrow_type) != arrow_type:
+                    types[column] = pa.string()
+
+        # Columns created by `clean_row`, and columns of the consolidated files outside the schemas
+        types.pop("acheteur", None)
+        types |= {column: types.get(column, pa.string()) for column in EXTRA_COLUMNS} | {
+            "acheteur.id": pa.string(),
+            "titulaires": pa.string(),
+            "countTitulaires": pa.int64(),
+            "_schema_version": pa.string(),
+        }
+        return pa.schema(types.items())
 
     @staticmethod
     def check_json_structure(file_path: Path) -> str:
@@ -208,17 +262,17 @@ class MarchesPublicsWorkflow(DatasetAggregator):
 
         We reconstruct a ``nom`` placeholder from typeCode + code so the
         downstream enricher receives a value instead of null.
+        The declaration is not modified, a new one is returned if needed.
         """
         lieu = declaration.get("lieuExecution")
         if not lieu or not isinstance(lieu, dict):
             return declaration
 
-        if "nom" not in lieu or lieu.get("nom") is None:
-            code = lieu.get("code", "")
+        code = lieu.get("code", "")
+        if lieu.get("nom") is None and code:
             type_code = lieu.get("typeCode", "")
-            if code:
-                lieu["nom"] = f"{type_code} {code}".strip()
-            declaration["lieuExecution"] = lieu
+            nom = f"{type_code} {code}".strip()
+            return declaration | {"lieuExecution": lieu | {"nom": nom}}
 
         return declaration
 
@@ -226,17 +280,23 @@ class MarchesPublicsWorkflow(DatasetAggregator):
     def clean_row(declaration: dict):
         """
         Nettoie le dataset brut de marché public (v1.5.0 et v2.0.3).
+        La déclaration n'est pas modifiée, et n'a donc pas besoin d'être copiée.
         """
-        local_decla = copy.deepcopy(declaration)
-
-        schema_version = MarchesPublicsWorkflow.detect_schema_version(local_decla)
+        schema_version = MarchesPublicsWorkflow.detect_schema_version(declaration)
 
         if schema_version == "v2":
-            local_decla = MarchesPublicsWorkflow._ensure_lieu_execution_v2(local_decla)
+            declaration = MarchesPublicsWorkflow._ensure_lieu_execution_v2(declaration)
 
         cleaned_row = {}
-        for k, v in local_decla.items():
-            if k == "acheteur":
+        for k, v in declaration.items():
+            if k not in CLEANED_FIELDS:
+                value_type = type(v)
+                if value_type is list or value_type is dict:
+                    v = dumps_json(v)
+                elif value_type is decimal.Decimal:
+                    v = float(v)
+                cleaned_row[k] = v
+            elif k == "acheteur":
                 try:
                     raw_id = str(v["id"])
                     cleaned_row["acheteur.id"] = (
@@ -273,12 +333,6 @@ class MarchesPublicsWorkflow(DatasetAggregator):
 
                 cleaned_row["titulaires"] = titulaires
                 cleaned_row["countTitulaires"] = len(titulaires)
-            else:
-                if isinstance(v, (list, dict)):
-                    v = json.dumps(v)
-                elif isinstance(v, decimal.Decimal):
-                    v = float(v)
-                cleaned_row[k] = v
 
         cleaned_row["_schema_version"] = schema_version
         return cleaned_row
@@ -371,3 +425,67 @@ class MarchesPublicsSchemaLoader:
                 )
             )
         return flattened_schema
+
+
+class DeclarationsWriter:
+    """
+    Write cleaned declarations to a parquet file, by batches of `batch_size` rows.
+
+    Values are cast to the type of their column. Values which cannot be cast are nulls.
+    Properties outside of the schema are dropped, so that all the files share the same schema.
+    """
+
+    def __init__(self, schema: pa.Schema, batch_size: int):
+        self.schema = schema
+        self.batch_size = batch_size
+        self.dropped = Counter()
+
+    def write(self, filename: Path, rows: Iterable[dict]) -> None:
+        writer = None
+        try:
+            rows = iter(rows)
+            while batch := list(itertools.islice(rows, self.batch_size)):
+                if writer is None:
+                    writer = pq.ParquetWriter(filename, self._output_schema())
+                writer.write_batch(self._record_batch(batch))
+            if writer is None:
+                writer = pq.ParquetWriter(filename, self._output_schema())
+        finally:
+            if writer is not None:
+                writer.close()
+        if self.dropped:
+            LOGGER.warning(f"Properties outside of the schema dropped: {dict(self.dropped)}")
+
+    def _output_schema(self) -> pa.Schema:
+        return pa.schema(
+            [pa.field(COLUMNS_RENAMER.get(f.name, f.name), f.type) for f in self.schema]
+        )
+
+    def _record_batch(self, batch: list[dict]) -> pa.RecordBatch:
+        known = set(self.schema.names)
+        for row in batch:
+            self.dropped.update(k for k in row if k not in known)
+        columns = [
+            pa.array([self._cast(row.get(f.name), f.type) for row in batch], type=f.type)
+            for f in self.schema
+        ]
+        return pa.RecordBatch.from_arrays(columns, schema=self._output_schema())
+
+    @staticmethod
+    def _cast(value, arrow_type: pa.DataType):
+        if value is None:
+            return None
+        if arrow_type == pa.string():
+            if isinstance(value, (list, dict)):
+                return dumps_json(value)
+            return value if isinstance(value, str) else str(value)
+        if arrow_type == pa.bool_():
+            return value if isinstance(value, bool) else BOOLEAN_VALUES.get(str(value).lower())
+        try:
+            if isinstance(value, str):
+                value = float(value.replace(",", ".").replace(" ", ""))
+            if arrow_type == pa.int64():
+                return int(value) if float(value).is_integer() else None
+            return float(value)
+        except (TypeError, ValueError):
+            return None
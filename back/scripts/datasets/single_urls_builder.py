@@ -15,9 +15,15 @@ class SingleUrlsBuilder:
     """
 
     def __init__(self):
-        self.scope = BaseLoader.loader_factory(
-            CommunitiesSelector.get_output_path(project_config)
-        ).load()
+        self.scope = (
+            BaseLoader.loader_factory(
+                CommunitiesSelector.get_output_path(project_config),
+                columns=["siren", "nom", "type"],
+            )
+            .load_lazy()
+            .collect()
+            .to_pandas()
+        )
 
     def get_datafiles(self, search_config):
         single_urls_source_file = search_config["single_urls_file"]
@@ -25,6 +31,6 @@ class SingleUrlsBuilder:
             BaseLoader.loader_factory(single_urls_source_file)
             .load()
             .pipe(normalize_identifiant, id_col="siren", format=IdentifierFormat.SIREN)
-            .merge(self.scope[["siren", "nom", "type"]], on="siren", how="left")
+            .merge(self.scope, on="siren", how="left")
             .assign(source="single_url")
         )
@@ -1,6 +1,6 @@
 import logging
+import os
 import time
-import urllib.request
 from pathlib import Path
 
 import polars as pl
@@ -8,6 +8,7 @@ from polars import col
 
 from back.scripts.datasets.utils import BaseDataset
 from back.scripts.utils.decorators import tracker
+from back.scripts.utils.downloads import download
 
 LOGGER = logging.getLogger(__name__)
 
@@ -29,9 +30,19 @@ EFFECTIF_CODE_TO_EMPLOYEES = {
     "53": 10000,
 }
 
+# NAF codes of the public administrations, among which the communities are searched
+PUBLIC_SECTOR_NAF = ["8411Z", "8710C", "3700Z", "8413Z"]
+# Rows per row group of the derived files. Sorted by siren, their row groups have disjoint
+# statistics on siren, so that a reader looking for a few sirens skips most of them.
+SUBSET_ROW_GROUP_SIZE = 100_000
+
 # Rate limiting configuration
 RATE_LIMIT_DELAY = 1.5  # seconds between requests
 MAX_RETRIES = 3  # number of retries for failed downloads
+DOWNLOAD_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "*/*",
+}
 
 
 class SireneWorkflow(BaseDataset):
@@ -42,6 +53,15 @@ class SireneWorkflow(BaseDataset):
     Given the size of the file, only a subset of the columns is kept,
     enriched with labels corresponding to the activity code.
 
+    Compact files derived from the dataset are also published, for the readers needing
+    only a part of it:
+    - `get_names_path`: the name (`raison_sociale`) of each `siren`
+    - `get_public_sector_path`: the public administrations, selected by NAF code
+
+    Between two refreshes of the stock file, the update files listed in `update_urls`
+    (same columns as the stock file) are merged into the dataset: the units they contain
+    replace the existing ones by `siren`.
+
     https://www.data.gouv.fr/fr/datasets/base-sirene-des-entreprises-et-de-leurs-etablissements-siren-siret/
     """
 
@@ -49,41 +69,152 @@ class SireneWorkflow(BaseDataset):
     def get_config_key(cls) -> str:
         return "sirene"
 
+    @classmethod
+    def get_output_paths(cls, main_config: dict) -> list[Path]:
+        return [
+            cls.get_output_path(main_config),
+            cls.get_names_path(main_config),
+            cls.get_public_sector_path(main_config),
+        ]
+
+    @classmethod
+    def get_names_path(cls, main_config: dict) -> Path:
+        output_path = cls.get_output_path(main_config)
+        return output_path.with_name(f"{output_path.stem}_names.parquet")
+
+    @classmethod
+    def get_public_sector_path(cls, main_config: dict) -> Path:
+        output_path = cls.get_output_path(main_config)
+        return output_path.with_name(f"{output_path.stem}_public_sector.parquet")
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.input_filename = self.data_folder / "sirene_raw.parquet"
+        self.updates_folder = self.data_folder / "updates"
         # Track the last download time to enforce rate limiting
         self._last_download_time = 0
+        # Revalidate the downloaded files against the server, and rebuild the output on change
+        self.refresh_downloads = self.config.get("refresh_downloads", False)
 
     @tracker(ulogger=LOGGER, log_start=True)
     def run(self) -> None:
-        if self.output_filename.exists():
-            return
-        self._fetch_zip()
-        self._fetch_xls_files()
-        self._format_to_parquet()
+        rebuilt = False
+        if not self.output_filename.exists() or self.refresh_downloads:
+            changed = self._fetch_zip()
+            changed = self._fetch_xls_files() or changed
+            if self.output_filename.exists() and not changed:
+                LOGGER.info("Sirene sources have not changed, keeping the current dataset")
+            else:
+                self._format_to_parquet()
+                rebuilt = True
+
+        if self._fetch_updates() or rebuilt:
+            rebuilt = self._apply_updates() or rebuilt
+
+        subsets = [
+            self.get_names_path(self.main_config),
+            self.get_public_sector_path(self.main_config),
+        ]
+        if rebuilt or not all(path.exists() for path in subsets):
+            self._write_subsets()
 
-    def _fetch_zip(self):
+    def _write_subsets(self) -> None:
+        """
+        Write the files derived from the dataset, sorted by siren.
+        """
+        sirene = pl.scan_parquet(self.output_filename)
+        sirene.select("siren", "raison_sociale").sort("siren").sink_parquet(
+            self.get_names_path(self.main_config), row_group_size=SUBSET_ROW_GROUP_SIZE
+        )
+        sirene.filter(col("naf8").is_in(PUBLIC_SECTOR_NAF)).sort("siren").sink_parquet(
+            self.get_public_sector_path(self.main_config),
+            row_group_size=SUBSET_ROW_GROUP_SIZE,
+        )
+
+    def _fetch_zip(self) -> bool:
+        return self._download_if_not_exists(self.config["url"], self.input_filename)
+
+    def _update_paths(self) -> list[Path]:
+        return [
+            self.updates_folder / url.split("/")[-1]
+            for url in self.config.get("update_urls", [])
+        ]
+
+    def _fetch_updates(self) -> bool:
+        changed = False
+        for url, path in zip(
+            self.config.get("update_urls", []), self._update_paths(), strict=True
+        ):
+            changed = self._download_if_not_exists(url, path) or changed
+        return changed
+
+    def _apply_updates(self) -> bool:
+        """
+        Merge the update files into the dataset.
+
+        Only the units processed after the stock file are kept, in their latest version.
+        All the update files are applied each time, which is idempotent and does not depend
+        on the order of the files.
+        Only these units are formatted, then the dataset is rewritten in a single streamed
+        pass, replacing the existing units with the same siren.
+
+        Returns:
+            True if the dataset has been rewritten.
+        """
+        paths = [path for path in self._update_paths() if path.exists()]
+        if not paths:
+            return False
+
+        updates = pl.concat([pl.scan_parquet(path) for path in paths], how="diagonal_relaxed")
         if self.input_filename.exists():
-            return
-        self._download_if_not_exists(self.config["url"], self.input_filename)
+            stock_date = (
+                pl.scan_parquet(self.input_filename)
+                .select(col("dateDernierTraitementUniteLegale").max())
+                .collect()
+                .item()
+            )
+            updates = updates.filter(col("dateDernierTraitementUniteLegale") > stock_date)
+        updates = updates.sort("dateDernierTraitementUniteLegale").unique(
+            "siren", keep="last", maintain_order=True
+        )
+        changes = self._format(updates).collect()
+        LOGGER.info(f"Applying {changes.height} updated units from {len(paths)} files")
+        if changes.is_empty():
+            return False
 
-    def _download_if_not_exists(self, url: str, file_path: Path | None = None) -> None:
+        tmp_filename = self.output_filename.with_name(
+            f"{self.output_filename.stem}.tmp.parquet"
+        )
+        pl.concat(
+            [
+                pl.scan_parquet(self.output_filename).join(
+                    changes.lazy().select("siren"), on="siren", how="anti"
+                ),
+                changes.lazy(),
+            ]
+        ).sink_parquet(tmp_filename)
+        os.replace(tmp_filename, self.output_filename)
+        return True
+
+    def _download_if_not_exists(self, url: str, file_path: Path | None = None) -> bool:
         """
         Download a file from a URL with rate limiting to avoid server throttling.
+        With "refresh_downloads", an existing file is revalidated with a conditional request.
 
         Args:
             url: The URL to download from
             file_path: Optional path to save the file to. If not provided, will use the filename from the URL.
+        Returns:
+            True if the file has been downloaded.
         """
         if file_path is None:
             file_name = url.split("/")[-1]
             file_path = self.data_folder / file_name
 
-        if file_path.exists():
+        if file_path.exists() and not self.refresh_downloads:
             LOGGER.info(f"File already exists: {file_path}")
-            return
+            return False
 
         LOGGER.info(f"Downloading {url} to {file_path}")
 
@@ -93,25 +224,17 @@ class SireneWorkflow(BaseDataset):
         # Try to download with retries
         for attempt in range(MAX_RETRIES):
             try:
-                # Create a custom opener with proper headers
-                opener = urllib.request.build_opener()
-                opener.addheaders = [
-                    (
-                        "User-Agent",
-                        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                    ),
-                    ("Accept", "*/*"),
-                ]
-                urllib.request.install_opener(opener)
-
-                # Download the file
-                urllib.request.urlretrieve(url, file_path)
+                downloaded = download(
+                    url, file_path, refresh=self.refresh_downloads, headers=DOWNLOAD_HEADERS
+                )
 
                 # Update last download time
                 self._last_download_time = time.time()
 
-                LOGGER.info(f"Successfully downloaded {url}")
-                return
+                LOGGER.info(
+                    f"Successfully downloaded {url}" if downloaded else f"{url} unchanged"
+                )
+                return downloaded
 
             except Exception as e:
                 LOGGER.warning(f"Download attempt {attempt + 1}/{MAX_RETRIES} failed: {e}")
@@ -136,13 +259,14 @@ class SireneWorkflow(BaseDataset):
 
         self._last_download_time = time.time()
 
-    def _fetch_xls_files(self) -> None:
+    def _fetch_xls_files(self) -> bool:
+        changed = False
         xls_links = self.config.get("xls_urls_naf", [])
         for file_url in xls_links:
-            self._download_if_not_exists(file_url)
+            changed = self._download_if_not_exists(file_url) or changed
 
         xls_url_cat_ju = self.config.get("xls_urls_cat_ju")
-        self._download_if_not_exists(xls_url_cat_ju)
+        return self._download_if_not_exists(xls_url_cat_ju) or changed
 
     def join_naf_level(self, base_df: pl.DataFrame, level: int) -> pl.DataFrame:
         """
@@ -209,36 +333,47 @@ class SireneWorkflow(BaseDataset):
         return base_df.join(juridical_polars, on=column_name, how="left").drop(column_name)
 
     def _format_to_parquet(self):
-        if self.output_filename.exists():
-            return
-
-        base_df = (
-            pl.scan_parquet(self.input_filename)
-            .select(
-                col("trancheEffectifsUniteLegale").cast(pl.String),
-                col("siren").cast(pl.String).str.zfill(9),
-                (col("etatAdministratifUniteLegale") == "A").alias("is_active"),
-                pl.coalesce(
-                    col("nomUsageUniteLegale"),
-                    col("denominationUniteLegale"),
-                    col("nomUniteLegale"),
-                ).alias("raison_sociale"),
-                col("prenomUsuelUniteLegale").alias("raison_sociale_prenom"),
-                col("activitePrincipaleUniteLegale")
-                .str.replace_all(".", "", literal=True)
-                .alias("naf8"),
-                col("categorieJuridiqueUniteLegale").alias("code_ju"),
-                col("trancheEffectifsUniteLegale")
-                .replace_strict(EFFECTIF_CODE_TO_EMPLOYEES, default=None)
-                .cast(pl.Int32)
-                .alias("tranche_effectif"),
-                col("nomenclatureActivitePrincipaleUniteLegale").alias("nomenclature_naf"),
-            )
-            .collect()
+        """
+        Format the raw dataset, streamed from the input file to the output file.
+        """
+        self._format(pl.scan_parquet(self.input_filename)).sink_parquet(self.output_filename)
+
+    def _format(self, raw: pl.LazyFrame) -> pl.LazyFrame:
+        """
+        Select the columns kept from the raw units, and add the labels of their codes.
+
+        The labels are joined on the distinct NAF and juridical codes first. The resulting
+        lookups are small, so the units are joined to them without being loaded in memory.
+        """
+        base_df = raw.select(
+            col("trancheEffectifsUniteLegale").cast(pl.String),
+            col("siren").cast(pl.String).str.zfill(9),
+            (col("etatAdministratifUniteLegale") == "A").alias("is_active"),
+            pl.coalesce(
+                col("nomUsageUniteLegale"),
+                col("denominationUniteLegale"),
+                col("nomUniteLegale"),
+            ).alias("raison_sociale"),
+            col("prenomUsuelUniteLegale").alias("raison_sociale_prenom"),
+            col("activitePrincipaleUniteLegale")
+            .str.replace_all(".", "", literal=True)
+            .alias("naf8"),
+            col("categorieJuridiqueUniteLegale").cast(pl.Utf8).alias("code_ju"),
+            col("trancheEffectifsUniteLegale")
+            .replace_strict(EFFECTIF_CODE_TO_EMPLOYEES, default=None)
+            .cast(pl.Int32)
+            .alias("tranche_effectif"),
+            col("nomenclatureActivitePrincipaleUniteLegale").alias("nomenclature_naf"),
+        )
+        naf_codes, ju_codes = pl.collect_all(
+            [
+                base_df.select("naf8", "nomenclature_naf").unique(),
+                base_df.select("code_ju").unique(),
+            ]
         )
 
         for level in range(1, 6):
-            base_df = self.join_naf_level(base_df, level)
+            naf_codes = self.join_naf_level(naf_codes, level)
 
         juridical_data_path = self.data_folder / "cj_septembre_2022.xls"
         sheet_levels = ["I", "II", "III"]
@@ -252,8 +387,14 @@ class SireneWorkflow(BaseDataset):
         ]
 
         for level in range(1, 4):
-            base_df = self.join_juridical_level(
-                base_df, level, categories_ju_data=categories_ju_data
+            ju_codes = self.join_juridical_level(
+                ju_codes, level, categories_ju_data=categories_ju_data
             )
 
-        base_df.write_parquet(self.output_filename)
+        # Null codes do not match: their labels are null, as when joining each level
+        return base_df.join(
+            naf_codes.lazy(),
+            on=["naf8", "nomenclature_naf"],
+            how="left",
+            maintain_order="left",
+        ).join(ju_codes.lazy(), on="code_ju", how="left", maintain_order="left")
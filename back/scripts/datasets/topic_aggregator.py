@@ -80,6 +80,22 @@ class TopicAggregator(DatasetAggregator):
     def get_output_path(cls, main_config: dict, topic: str = "subventions") -> Path:
         return Path(main_config[cls.get_config_key()]["combined_filename"] % {"topic": topic})
 
+    def _reset_contributions(self) -> None:
+        super()._reset_contributions()
+        self.extra_columns = Counter()
+        self.missing_data = []
+
+    def _get_contributions(self) -> dict:
+        return super()._get_contributions() | {
+            "extra_columns": list(self.extra_columns.elements()),
+            "missing_data": self.missing_data,
+        }
+
+    def _merge_contributions(self, contributions: dict) -> None:
+        super()._merge_contributions(contributions)
+        self.extra_columns.update(contributions["extra_columns"])
+        self.missing_data.extend(contributions["missing_data"])
+
     def _post_process(self) -> None:
         pd.DataFrame.from_dict(self.extra_columns, orient="index").to_csv(
             self.data_folder / "extra_columns.csv"
@@ -138,7 +154,8 @@ class TopicAggregator(DatasetAggregator):
         if not extra_columns:
             return
 
-        self.extra_columns.update(extra_columns)
+        # Sorted so that the audit files do not depend on the set ordering
+        self.extra_columns.update(sorted(extra_columns))
         LOGGER.info(f"File {file_metadata.url} has extra columns (ignored): {extra_columns}")
 
     def _normalize_frame(self, df: pd.DataFrame, file_metadata: PandasRow) -> pd.DataFrame:
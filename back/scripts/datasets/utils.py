@@ -26,6 +26,22 @@ class BaseDataset:
     def get_output_path(cls, main_config: dict | Config) -> Path:
         return get_project_base_path() / cls.get_config(main_config)["combined_filename"]
 
+    @classmethod
+    def get_output_paths(cls, main_config: dict | Config) -> list[Path]:
+        """
+        All the files written by the dataset, starting with its main output.
+        Used by the workflow scheduler to find the dataset producing an input of another one.
+        """
+        return [cls.get_output_path(main_config)]
+
+    @classmethod
+    def get_input_paths(cls, main_config: dict | Config) -> list[Path]:
+        """
+        Output files of other workflows required by this dataset.
+        Used by the workflow scheduler to order the datasets, none by default.
+        """
+        return []
+
     def __init__(self, main_config: dict, *args, **kwargs):
         self.main_config = main_config
         self.config = self.get_config(main_config)
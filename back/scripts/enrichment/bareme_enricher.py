@@ -58,7 +58,12 @@ class BaremeEnricher(BaseEnricher):
         ]
 
     @classmethod
-    def _clean_and_enrich(cls, inputs) -> pl.DataFrame:
+    def get_config_slice(cls, main_config: dict) -> dict:
+        # Le barème couvre les années jusqu'à l'année en cours
+        return super().get_config_slice(main_config) | {"annee": datetime.now().year}
+
+    @classmethod
+    def _clean_and_enrich(cls, inputs) -> pl.LazyFrame:
         """
         Méthode principale d'enrichissement qui orchestre le calcul du barème.
 
@@ -70,11 +75,11 @@ class BaremeEnricher(BaseEnricher):
         5. Jointure finale des scores
 
         Args:
-            inputs (typing.List[pl.DataFrame]): Liste des 4 DataFrames d'entrée :
+            inputs (typing.List[pl.LazyFrame]): Liste des 4 LazyFrames d'entrée :
                 [communities, subventions, financial, marches_publics]
 
         Returns:
-            pl.DataFrame: DataFrame final avec colonnes [siren, annee, subventions_score, mp_score]
+            pl.LazyFrame: LazyFrame final avec colonnes [siren, annee, subventions_score, mp_score]
 
         Raises:
             ValueError: Si le nombre d'inputs n'est pas égal à 4
@@ -116,6 +121,18 @@ class BaremeEnricher(BaseEnricher):
         mapping = {4: "A", 3: "B", 2: "C", 1: "D", 0: "E"}
         return pl.col(column).replace_strict(mapping)
 
+    @staticmethod
+    def _cross_join_annees(frame: pl.LazyFrame) -> pl.LazyFrame:
+        """
+        Une ligne par ligne de `frame` et par année de 2016 à l'année courante incluse.
+        Equivalent à une jointure croisée avec la liste des années, sans construire de
+        DataFrame, pour fonctionner aussi bien avec un DataFrame qu'un LazyFrame.
+        """
+        current_year = datetime.now().year
+        return frame.with_columns(
+            pl.int_ranges(2016, current_year + 1, dtype=pl.Int64).alias("annee")
+        ).explode("annee")
+
     @classmethod
     def build_bareme_table(cls, communities: pl.DataFrame) -> pl.DataFrame:
         """
@@ -134,16 +151,12 @@ class BaremeEnricher(BaseEnricher):
         Returns:
             pl.DataFrame: Table avec colonnes [siren, annee] pour toutes les combinaisons
         """
-        # Générer la liste des années valides (2016 à année courante incluse)
-        current_year = datetime.now().year
-        valid_years = pl.DataFrame({"annee": list(range(2016, current_year + 1))})
-
         # Produit cartésien : chaque SIREN × chaque année
         # Filtrage des SIREN null pour éviter les données corrompues
         bareme_table = (
             communities.select("siren")
             .filter(pl.col("siren") != "null")  # Exclusion des SIREN invalides
-            .join(valid_years, how="cross")  # Produit cartésien
+            .pipe(cls._cross_join_annees)  # Produit cartésien
         )
 
         return bareme_table
@@ -232,11 +245,7 @@ class BaremeEnricher(BaseEnricher):
             [
                 pl.when(pl.col("has_subventions_budget") & (pl.col("subventions_budget") == 0))
                 .then(pl.lit("A"))
-                .otherwise(
-                    pl.col("taux_subventions")
-                    .map_elements(cls.get_score_from_tp)  # Application fonction de scoring
-                    .cast(pl.Utf8)  # Score en format texte
-                )
+                .otherwise(cls.score_from_tp("taux_subventions"))
                 .alias("subventions_score")
             ]
         )
@@ -244,6 +253,28 @@ class BaremeEnricher(BaseEnricher):
         # Retour des colonnes essentielles uniquement
         return bareme_score.select(["siren", "annee", "subventions_score"])
 
+    @staticmethod
+    def score_from_tp(column: str) -> pl.Expr:
+        """
+        Version vectorisée de ``get_score_from_tp`` : convertit une colonne de taux de
+        publication en scores, avec les mêmes bornes. Les taux nuls restent nuls.
+        """
+        tp = pl.col(column)
+        return (
+            pl.when(tp.is_nan() | (tp <= 0))
+            .then(pl.lit("E"))
+            .when(tp <= 25)
+            .then(pl.lit("D"))
+            .when(tp <= 50)
+            .then(pl.lit("C"))
+            .when(tp <= 95)
+            .then(pl.lit("B"))
+            .when(tp <= 105)
+            .then(pl.lit("A"))
+            .when(tp.is_not_null())
+            .then(pl.lit("B"))
+        )
+
     @staticmethod
     def get_score_from_tp(tp: float) -> str:
         """
@@ -338,10 +369,7 @@ class BaremeEnricher(BaseEnricher):
         )
 
         # Construction table de référence (comme pour subventions)
-        current_year = datetime.now().year
-        valid_years = pl.DataFrame({"annee": list(range(2016, current_year + 1))})
-        communities_table = communities.select(["siren"])
-        table = communities_table.join(valid_years, how="cross")
+        table = communities.select(["siren"]).pipe(cls._cross_join_annees)
 
         # Jointure avec les données marchés
         # Left join pour conserver collectivités sans marchés (score E)
@@ -1,16 +1,80 @@
+import functools
+import hashlib
+import inspect
+import json
 import logging
+import os
 from pathlib import Path
 
 import polars as pl
 
 from back.scripts.utils.config import get_project_base_path
 from back.scripts.utils.decorators import tracker
+from back.scripts.utils.downloads import file_checksum
 
 LOGGER = logging.getLogger(__name__)
 
+PARQUET_MAGIC = b"PAR1"
+
+
+def input_fingerprint(path: Path) -> str:
+    """
+    Fingerprint of the content of an input file.
+
+    The footer of a parquet file describes every column chunk (offsets, sizes, statistics),
+    so hashing it along with the file size identifies the content without reading the data.
+    Other files are fully hashed.
+    """
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        if size >= 12:
+            f.seek(-8, os.SEEK_END)
+            tail = f.read(8)
+            footer_size = int.from_bytes(tail[:4], "little")
+            if tail[4:] == PARQUET_MAGIC and footer_size + 12 <= size:
+                f.seek(-8 - footer_size, os.SEEK_END)
+                footer = f.read(footer_size)
+                return hashlib.sha1(size.to_bytes(8, "little") + footer).hexdigest()
+    return file_checksum(path, "sha1")
+
+
+def eager(method):
+    """
+    Decorator for the enrichment steps which need materialized data (e.g. values read in python).
+
+    The LazyFrame arguments are collected together, so that their common inputs are only
+    read once, and the result is turned back into a LazyFrame so that the following steps
+    stay lazy. Called with DataFrames, the step is left unchanged.
+    """
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        lazy = [arg for arg in [*args, *kwargs.values()] if isinstance(arg, pl.LazyFrame)]
+        if not lazy:
+            return method(*args, **kwargs)
+
+        collected = dict(zip(map(id, lazy), pl.collect_all(lazy), strict=True))
+        result = method(
+            *[collected.get(id(arg), arg) for arg in args],
+            **{key: collected.get(id(arg), arg) for key, arg in kwargs.items()},
+        )
+        return result.lazy() if isinstance(result, pl.DataFrame) else result
+
+    return wrapper
+
 
 class BaseEnricher:
-    """Designed to be subclassed, subclasses must override get_dataset_name and get_input_paths and _clean_and_enrich."""
+    """
+    Designed to be subclassed, subclasses must override get_dataset_name and get_input_paths and _clean_and_enrich.
+
+    Inputs are scanned lazily and the output is streamed to its parquet file, so that only the
+    columns and rows used by the enrichment are read. The steps which need materialized data
+    are decorated with `eager`.
+
+    The fingerprint of the inputs, code and configuration used to build the output is stored
+    in a sidecar file. The output is only rebuilt when this fingerprint changes, so that
+    rebuilding an enricher cascades to the enrichers using its output, and only to them.
+    """
 
     def __init__(self):
         raise Exception("Utility class.")
@@ -24,7 +88,7 @@ class BaseEnricher:
         raise NotImplementedError("Method must be overriden")
 
     @classmethod
-    def _clean_and_enrich(cls, inputs: list[pl.DataFrame]) -> pl.DataFrame:
+    def _clean_and_enrich(cls, inputs: list[pl.LazyFrame]) -> pl.LazyFrame | pl.DataFrame:
         raise NotImplementedError("Method must be overriden")
 
     @classmethod
@@ -35,11 +99,91 @@ class BaseEnricher:
             / f"{cls.get_dataset_name()}.parquet"
         )
 
+    @classmethod
+    def get_config_slice(cls, main_config: dict) -> dict:
+        """
+        Part of the configuration the output depends on, besides the input paths.
+        """
+        return {"warehouse": main_config["warehouse"]}
+
+    @classmethod
+    def get_fingerprint_path(cls, main_config: dict) -> Path:
+        output_path = cls.get_output_path(main_config)
+        return output_path.with_name(output_path.name + ".meta.json")
+
+    @classmethod
+    def code_fingerprint(cls) -> str:
+        """
+        Hash of the source of the modules defining the enricher and its parents,
+        and of the project modules they import from.
+        """
+        modules = {inspect.getmodule(klass) for klass in cls.__mro__ if klass is not object}
+        for module in list(modules):
+            for value in vars(module).values():
+                dependency = inspect.getmodule(value)
+                if dependency is not None and dependency.__name__.startswith("back."):
+                    modules.add(dependency)
+        h = hashlib.sha1()
+        for module in sorted(modules, key=lambda module: module.__name__):
+            h.update(module.__name__.encode("utf-8"))
+            h.update(Path(module.__file__).read_bytes())
+        return h.hexdigest()
+
+    @classmethod
+    def fingerprint(cls, main_config: dict) -> dict:
+        """
+        Fingerprint of everything the output is built from.
+        """
+        return {
+            "inputs": {
+                str(path): input_fingerprint(Path(path))
+                for path in cls.get_input_paths(main_config)
+            },
+            "code": cls.code_fingerprint(),
+            "config": cls.get_config_slice(main_config),
+        }
+
+    @classmethod
+    def is_up_to_date(cls, main_config: dict, fingerprint: dict | None = None) -> bool:
+        """
+        True if the output exists and has been built from the current inputs, code and config.
+        """
+        fingerprint_path = cls.get_fingerprint_path(main_config)
+        if not cls.get_output_path(main_config).exists() or not fingerprint_path.exists():
+            return False
+        fingerprint = fingerprint or cls.fingerprint(main_config)
+        # Round trip through JSON so that the config compares as it is stored
+        return json.loads(fingerprint_path.read_text()) == json.loads(
+            json.dumps(fingerprint, default=str)
+        )
+
     @classmethod
     @tracker(ulogger=LOGGER, log_start=True)
-    def enrich(cls, main_config: dict) -> None:
-        if cls.get_output_path(main_config).exists():
-            return
-        inputs = map(pl.read_parquet, cls.get_input_paths(main_config))
+    def enrich(cls, main_config: dict) -> bool:
+        """
+        Build the output, unless it is up to date.
+
+        Returns:
+            True if the output has been built, False if it was up to date.
+        """
+        fingerprint = cls.fingerprint(main_config)
+        if cls.is_up_to_date(main_config, fingerprint):
+            LOGGER.info(f"{cls.get_dataset_name()} is up to date")
+            return False
+
+        # Written back once the output is complete, an interrupted build is never up to date
+        cls.get_fingerprint_path(main_config).unlink(missing_ok=True)
+        inputs = map(pl.scan_parquet, cls.get_input_paths(main_config))
         output = cls._clean_and_enrich(inputs)
-        output.write_parquet(cls.get_output_path(main_config))
+        cls._write(output, cls.get_output_path(main_config))
+        cls.get_fingerprint_path(main_config).write_text(
+            json.dumps(fingerprint, default=str, indent=2)
+        )
+        return True
+
+    @staticmethod
+    def _write(output: pl.LazyFrame | pl.DataFrame, path: Path) -> None:
+        if isinstance(output, pl.DataFrame):
+            output.write_parquet(path)
+        else:
+            output.sink_parquet(path)
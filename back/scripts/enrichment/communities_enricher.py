@@ -1,4 +1,3 @@
-import re
 from datetime import datetime
 from pathlib import Path
 
@@ -10,6 +9,29 @@ from back.scripts.enrichment.base_enricher import BaseEnricher
 from back.scripts.enrichment.marches_enricher import MarchesPublicsEnricher
 from back.scripts.enrichment.subventions_enricher import SubventionsEnricher
 
+# Préfixe uniforme des noms et regex des préfixes à remplacer, par type de collectivité
+PREFIXES_NOMS = {
+    "COM": ("COMMUNE ", r"^VILLE\s+DE\s+"),
+    "DEP": (
+        "DEPARTEMENT ",
+        r"^DEPARTEMENT\s+(DE\s+LA\s+|DE\s+L['’]?\s*|DES\s+|DU\s+|DE\s+)",
+    ),
+    "REG": (
+        "REGION ",
+        "^("
+        + "|".join(
+            [
+                r"CONSEIL\s+REGIONAL\s+DE\s+LA",
+                r"COLLECTIVITE\s+TERRITORIALE\s+DE",
+                r"COLLECTIVITE\s+EUROPEENNE\s+DE",
+                r"COLLECTIVITE\s+DE",
+                r"REGION\s+DES",
+            ]
+        )
+        + ")",
+    ),
+}
+
 
 class CommunitiesEnricher(BaseEnricher):
     @classmethod
@@ -26,7 +48,12 @@ class CommunitiesEnricher(BaseEnricher):
         ]
 
     @classmethod
-    def _clean_and_enrich(cls, inputs: list[pl.DataFrame]) -> pl.DataFrame:
+    def get_config_slice(cls, main_config: dict) -> dict:
+        # Les moyennes portent sur une année relative à l'année en cours
+        return super().get_config_slice(main_config) | {"annee": datetime.now().year}
+
+    @classmethod
+    def _clean_and_enrich(cls, inputs: list[pl.LazyFrame]) -> pl.LazyFrame:
         communities, bareme, subventions, marches_publics = inputs
 
         # Conserve une ligne par marche public et ses attributs
@@ -71,196 +98,120 @@ class CommunitiesEnricher(BaseEnricher):
             .alias("type")
         )
 
-    @classmethod
-    def national_mean(
-        cls,
-        filtered_data: pl.DataFrame,
-        communities: pl.DataFrame,
-        id_join_col: str,
-        type_value: str,
-    ) -> float:
-        """Calcule la moyenne nationale pour un type donné."""
-        return filtered_data.join(
-            communities.filter(pl.col("type") == type_value).select("siren"),
-            left_on=id_join_col,
-            right_on="siren",
-            how="inner",
-        )["montant"].mean()
-
-    @classmethod
-    def group_mean(
-        cls,
-        filtered_data: pl.DataFrame,
-        communities: pl.DataFrame,
-        id_join_col: str,
-        type_value: str,
-        group_col: str,
-        alias: str,
-    ) -> pl.DataFrame:
-        """Calcule la moyenne par groupe (région, département) et retourne un DataFrame prêt à join."""
-        return (
-            filtered_data.join(
-                communities.filter(pl.col("type") == type_value).select(["siren", group_col]),
-                left_on=id_join_col,
-                right_on="siren",
-                how="inner",
-            )
-            .group_by(group_col)
-            .agg(pl.mean("montant").alias(alias))
-        )
-
     @classmethod
     def calculate_averages(
         cls,
-        communities: pl.DataFrame,
-        datas: pl.DataFrame,
+        communities: pl.LazyFrame,
+        datas: pl.LazyFrame,
         id_join_col: str,
         year_col: str,
         year: int,
         suffix: str,
-    ) -> pl.DataFrame:
+    ) -> pl.LazyFrame:
         """
         Calcule et ajoute les moyennes des données (subventions ou marchés publics) pour chaque type :
         - COM : moyennes nationales, régionales, départementales
         - DEP : moyennes nationales, régionales
         - REG : moyenne nationale
-        """
-        # Filtrer sur l’année
-        datas_filtered = datas.filter(pl.col(year_col) == year)
-
-        # ============================================================
-        # COMMUNES
-        moyenne_nat_com = cls.national_mean(datas_filtered, communities, id_join_col, "COM")
-        moyenne_reg_com = cls.group_mean(
-            datas_filtered,
-            communities,
-            id_join_col,
-            "COM",
-            "code_insee_region",
-            f"moyenne_reg_com_{suffix}",
-        )
-        moyenne_dpt_com = cls.group_mean(
-            datas_filtered,
-            communities,
-            id_join_col,
-            "COM",
-            "code_insee_dept",
-            f"moyenne_dpt_com_{suffix}",
-        )
 
-        # ============================================================
-        # DÉPARTEMENTS
-        moyenne_nat_dpt = cls.national_mean(datas_filtered, communities, id_join_col, "DEP")
-        moyenne_reg_dpt = cls.group_mean(
-            datas_filtered,
-            communities,
-            id_join_col,
-            "DEP",
-            "code_insee_region",
-            f"moyenne_reg_dpt_{suffix}",
+        Les données sont jointes une seule fois aux collectivités, puis agrégées par
+        (type, région, département). Les moyennes de chaque niveau sont déduites de ces
+        sommes et effectifs partiels, et ajoutées avec une jointure par niveau.
+        """
+        montant = pl.col("montant")
+        # Une ligne par (type, région, département), avec la somme et le nombre de montants
+        partiels = (
+            datas.filter(pl.col(year_col) == year)
+            .select(id_join_col, "montant")
+            .join(
+                communities.select("siren", "type", "code_insee_region", "code_insee_dept"),
+                left_on=id_join_col,
+                right_on="siren",
+                how="inner",
+            )
+            .group_by("type", "code_insee_region", "code_insee_dept")
+            .agg(montant.sum().alias("somme"), montant.count().alias("nombre"))
         )
 
-        # ============================================================
-        # RÉGIONS
-        moyenne_nat_reg = cls.national_mean(datas_filtered, communities, id_join_col, "REG")
+        def moyennes(types: list[str], keys: list[str], alias: str) -> pl.LazyFrame:
+            nombre = pl.col("nombre").sum()
+            return (
+                partiels.filter(pl.col("type").is_in(types))
+                .group_by("type", *keys)
+                .agg(pl.when(nombre > 0).then(pl.col("somme").sum() / nombre).alias(alias))
+                .drop_nulls(keys)
+            )
 
-        # ============================================================
-        # ASSEMBLAGE FINAL
-        communities = (
-            communities
-            # communes
-            .join(moyenne_reg_com, on="code_insee_region", how="left")
-            .join(moyenne_dpt_com, on="code_insee_dept", how="left")
-            # départements
-            .join(moyenne_reg_dpt, on="code_insee_region", how="left")
-            # moyennes nationales
-            .with_columns(
-                [
-                    pl.when(pl.col("type") == "COM")
-                    .then(pl.lit(moyenne_nat_com))
-                    .alias(f"moyenne_nat_com_{suffix}"),
-                    pl.when(pl.col("type") == "DEP")
-                    .then(pl.lit(moyenne_nat_dpt))
-                    .alias(f"moyenne_nat_dpt_{suffix}"),
-                    pl.when(pl.col("type") == "REG")
-                    .then(pl.lit(moyenne_nat_reg))
-                    .alias(f"moyenne_nat_reg_{suffix}"),
-                ]
+        is_type = {type_: pl.col("type") == type_ for type_ in ["COM", "DEP", "REG"]}
+        return (
+            communities.join(
+                moyennes(["COM", "DEP"], ["code_insee_region"], "moyenne_reg"),
+                on=["type", "code_insee_region"],
+                how="left",
+                maintain_order="left",
+            )
+            .join(
+                moyennes(["COM"], ["code_insee_dept"], "moyenne_dpt"),
+                on=["type", "code_insee_dept"],
+                how="left",
+                maintain_order="left",
+            )
+            .join(
+                moyennes(["COM", "DEP", "REG"], [], "moyenne_nat"),
+                on="type",
+                how="left",
+                maintain_order="left",
             )
-            # Masquer les moyennes non pertinentes
+            # Chaque moyenne n'est renseignée que pour son type de collectivité
             .with_columns(
-                [
-                    pl.when(pl.col("type") != "COM")
-                    .then(None)
-                    .otherwise(pl.col(f"moyenne_reg_com_{suffix}"))
-                    .alias(f"moyenne_reg_com_{suffix}"),
-                    pl.when(pl.col("type") != "COM")
-                    .then(None)
-                    .otherwise(pl.col(f"moyenne_dpt_com_{suffix}"))
-                    .alias(f"moyenne_dpt_com_{suffix}"),
-                    pl.when(pl.col("type") != "DEP")
-                    .then(None)
-                    .otherwise(pl.col(f"moyenne_reg_dpt_{suffix}"))
-                    .alias(f"moyenne_reg_dpt_{suffix}"),
-                ]
+                pl.when(is_type["COM"])
+                .then(pl.col("moyenne_reg"))
+                .alias(f"moyenne_reg_com_{suffix}"),
+                pl.when(is_type["COM"])
+                .then(pl.col("moyenne_dpt"))
+                .alias(f"moyenne_dpt_com_{suffix}"),
+                pl.when(is_type["DEP"])
+                .then(pl.col("moyenne_reg"))
+                .alias(f"moyenne_reg_dpt_{suffix}"),
+                pl.when(is_type["COM"])
+                .then(pl.col("moyenne_nat"))
+                .alias(f"moyenne_nat_com_{suffix}"),
+                pl.when(is_type["DEP"])
+                .then(pl.col("moyenne_nat"))
+                .alias(f"moyenne_nat_dpt_{suffix}"),
+                pl.when(is_type["REG"])
+                .then(pl.col("moyenne_nat"))
+                .alias(f"moyenne_nat_reg_{suffix}"),
             )
+            .drop("moyenne_reg", "moyenne_dpt", "moyenne_nat")
         )
 
-        return communities
-
     @classmethod
-    def uniformiser_noms(cls, communities: pl.DataFrame) -> pl.DataFrame:
+    def uniformiser_noms(cls, communities: pl.LazyFrame) -> pl.LazyFrame:
         """
         Uniformise les noms des collectivités selon leur type :
         - COM -> "COMMUNE X"
         - DEP -> "DEPARTEMENT X"
         - REG -> "REGION X"
+        Les noms sont mis en majuscules, et les noms manquants deviennent vides.
         """
-
-        # Regex Communes et Départements
-        regex_com = re.compile(r"^VILLE\s+DE\s+")
-        regex_dep = re.compile(r"^DEPARTEMENT\s+(DE\s+LA\s+|DE\s+L['’]?\s*|DES\s+|DU\s+|DE\s+)")
-
-        # Pattern pour les régions
-        region_prefixes = [
-            r"CONSEIL\s+REGIONAL\s+DE\s+LA",
-            r"COLLECTIVITE\s+TERRITORIALE\s+DE",
-            r"COLLECTIVITE\s+EUROPEENNE\s+DE",
-            r"COLLECTIVITE\s+DE",
-            r"REGION\s+DES",
-        ]
-        region_pattern = "|".join(region_prefixes)
-        regex_reg = re.compile(f"^({region_pattern})")
-
-        def nettoyer_nom(nom: str, type_: str) -> str:
-            if nom is None:
-                return ""
-            nom = nom.upper().strip()
-
-            prefixes = {
-                "COM": ("COMMUNE ", regex_com),
-                "DEP": ("DEPARTEMENT ", regex_dep),
-                "REG": ("REGION ", regex_reg),
-            }
-
-            if type_ not in prefixes:
-                return nom
-
-            prefix, regex = prefixes[type_]
-            nom = regex.sub("", nom).strip()
-            if not nom.startswith(prefix):
-                return f"{prefix}{nom}"
-            return nom
-
-        communities = communities.with_columns(
-            pl.struct(["nom", "type"])
-            .map_elements(
-                lambda row: nettoyer_nom(row["nom"], row["type"]), return_dtype=pl.String
+        nom = pl.col("nom").str.to_uppercase().str.strip_chars()
+
+        def prefixer(prefix: str, regex: str) -> pl.Expr:
+            # Retire le préfixe existant avant d'ajouter le préfixe uniforme
+            sans_prefixe = nom.str.replace(regex, "").str.strip_chars()
+            return (
+                pl.when(sans_prefixe.str.starts_with(prefix))
+                .then(sans_prefixe)
+                .otherwise(pl.lit(prefix) + sans_prefixe)
             )
-            .alias("nom")
-        )
 
-        return communities
+        nom_uniforme = pl.when(nom.is_null()).then(pl.lit(""))
+        for type_, (prefix, regex) in PREFIXES_NOMS.items():
+            nom_uniforme = nom_uniforme.when(pl.col("type") == type_).then(
+                prefixer(prefix, regex)
+            )
+        return communities.with_columns(nom_uniforme.otherwise(nom).alias("nom"))
 
     @classmethod
     def get_uniques_marches_publics(cls, marches_publics: pl.DataFrame) -> pl.DataFrame:
@@ -21,7 +21,7 @@ class ElectedOfficialsEnricher(BaseEnricher):
         ]
 
     @classmethod
-    def _clean_and_enrich(cls, inputs: list[pl.DataFrame]) -> pl.DataFrame:
+    def _clean_and_enrich(cls, inputs: list[pl.LazyFrame]) -> pl.LazyFrame:
         elected_officials, communities = inputs
         return (
             elected_officials.pipe(cls._add_code_insee)
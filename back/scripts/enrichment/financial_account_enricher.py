@@ -20,7 +20,7 @@ class FinancialEnricher(BaseEnricher):
         ]
 
     @classmethod
-    def _clean_and_enrich(cls, inputs: list[pl.DataFrame]) -> pl.DataFrame:
+    def _clean_and_enrich(cls, inputs: list[pl.LazyFrame]) -> pl.LazyFrame:
         communities, financial = inputs
         financial_filtred = cls._add_financial_type(financial)
 
@@ -74,7 +74,8 @@ class FinancialEnricher(BaseEnricher):
     @classmethod
     def _add_financial_type(cls, financial: pl.DataFrame) -> pl.DataFrame:
         financial_filtred = financial.filter(pl.col("annee") > 2016)
-        if "siren" in financial_filtred.columns:
+        columns = financial_filtred.collect_schema().names()
+        if "siren" in columns:
             financial_filtred = financial_filtred.rename({"siren": "siren_group"})
         else:
             financial_filtred = financial_filtred.with_columns(
@@ -83,7 +84,7 @@ class FinancialEnricher(BaseEnricher):
 
         required_cols = ["region", "dept", "insee_commune"]
         for col in required_cols:
-            if col not in financial_filtred.columns:
+            if col not in columns:
                 financial_filtred = financial_filtred.with_columns(
                     pl.lit(None, dtype=pl.Utf8).alias(col)
                 )
@@ -1,25 +1,66 @@
 import ast
 import json
+import re
 from pathlib import Path
 
-import numpy as np
 import pandas as pd
 import polars as pl
 from inflection import underscore as to_snake_case
 from sqlalchemy.sql import true
-from unidecode import unidecode
 
 from back.scripts.datasets.cpv_labels import CPVLabelsWorkflow
 from back.scripts.datasets.marches import MarchesPublicsWorkflow
 from back.scripts.datasets.sirene import SireneWorkflow
-from back.scripts.enrichment.base_enricher import BaseEnricher
+from back.scripts.enrichment.base_enricher import BaseEnricher, eager
 from back.scripts.enrichment.utils.cpv_utils import CPVUtils
-from back.scripts.utils.dataframe_operation import (
-    IdentifierFormat,
-    normalize_date,
-    normalize_identifiant,
-    normalize_montant,
+from back.scripts.utils.dataframe_operation import IdentifierFormat
+from back.scripts.utils.polars_operation import normalize_identifiant_pl, normalize_montant_pl
+
+# Champs des modifications des DECP (schémas 1.5.0 et 2.0.3), lus comme du texte.
+# Un champ suffixé par "Modification" modifie la colonne sans le suffixe.
+MODIFICATION_FIELDS = [
+    "id",
+    "objetModification",
+    "dateSignatureModification",
+    "dateNotificationModification",
+    "datePublicationDonneesModification",
+    "updated_at",
+    "dureeMois",
+    "dureeMoisModification",
+    "montant",
+    "montantModification",
+]
+_MODIFICATION_DTYPE = {field: pl.String for field in MODIFICATION_FIELDS}
+MODIFICATIONS_DTYPE = pl.List(
+    pl.Struct({"modification": pl.Struct(_MODIFICATION_DTYPE)} | _MODIFICATION_DTYPE)
 )
+# Champs des titulaires, une colonne "titulaire_<champ>" par champ
+TITULAIRE_FIELDS = [
+    "typeIdentifiant",
+    "id",
+    "denominationSociale",
+    "contact.id",
+    "contact.nom",
+    "contact.prenom",
+    "contact.email",
+]
+TITULAIRES_DTYPE = pl.List(pl.Struct({field: pl.String for field in TITULAIRE_FIELDS}))
+# Champs de lieuExecution
+LIEU_EXECUTION_DTYPE = pl.Struct({"code": pl.String, "typeCode": pl.String, "nom": pl.String})
+# Liste JSON ne contenant que des textes
+LISTE_DE_TEXTES_REGEX = r'^\[\s*("(?:[^"\\]|\\.)*"\s*(?:,\s*"(?:[^"\\]|\\.)*"\s*)*)?\]$'
+# Formats des dates des DECP, lus sur les 10 premiers caractères
+FORMATS_DATES = ["%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d", "%d-%m-%Y"]
+# Heure et fuseau pouvant suivre la date
+HEURE_REGEX = r"^[T ](\d{2}):(\d{2})(?::(\d{2}(?:\.\d+)?))?"
+FUSEAU_REGEX = r"([+-])(\d{2}):?(\d{2})$"
+# Champs ordonnant les modifications, par ordre de priorité
+SORT_FIELDS = [
+    "datePublicationDonneesModification",
+    "dateNotificationModification",
+    "dateSignatureModification",
+    "updated_at",
+]
 
 
 class MarchesPublicsEnricher(BaseEnricher):
@@ -32,20 +73,19 @@ class MarchesPublicsEnricher(BaseEnricher):
         return [
             MarchesPublicsWorkflow.get_output_path(main_config),
             CPVLabelsWorkflow.get_output_path(main_config),
-            SireneWorkflow.get_output_path(main_config),
+            SireneWorkflow.get_names_path(main_config),
         ]
 
     @classmethod
-    def _clean_and_enrich(cls, inputs: list[pl.DataFrame]) -> pl.DataFrame:
+    def _clean_and_enrich(cls, inputs: list[pl.LazyFrame]) -> pl.LazyFrame:
         # Data analysts, please add your code here!
         marches, cpv_labels, sirene, *_ = inputs
 
-        marches_pd = (
+        return (
             marches.pipe(cls.set_unique_mp_id_hash)
             .pipe(cls.keep_last_modifications_par_mp)
-            .to_pandas()
-            .apply(cls.appliquer_modifications, axis=1)
-            .drop(columns=["modifications"])
+            .pipe(cls.appliquer_modifications)
+            .drop("modifications")
             .pipe(cls.unnest_titulaires)
             .pipe(
                 cls.correction_types_colonnes_str,
@@ -62,20 +102,17 @@ class MarchesPublicsEnricher(BaseEnricher):
                 ],
             )
             .pipe(cls.correction_types_colonnes_float, ["dureeMois", "offresRecues"])
-            .pipe(normalize_montant, "montant")
-            .pipe(normalize_date, "datePublicationDonnees")
-            .pipe(normalize_date, "dateNotification")
-            .pipe(normalize_identifiant, "acheteur_id", IdentifierFormat.SIREN)
+            .pipe(normalize_montant_pl, "montant")
+            .pipe(cls.normalize_date, "datePublicationDonnees")
+            .pipe(cls.normalize_date, "dateNotification")
+            .pipe(normalize_identifiant_pl, "acheteur_id", IdentifierFormat.SIREN)
             .pipe(cls._add_metadata)
-            .rename(columns={"montant": "montant_du_marche_public"})
-            .assign(
-                montant_du_marche_public_par_titulaire=lambda df: df["montant_du_marche_public"]
-                / df["countTitulaires"].fillna(1)
+            .rename({"montant": "montant_du_marche_public"})
+            .with_columns(
+                (
+                    pl.col("montant_du_marche_public") / pl.col("countTitulaires").fill_null(1)
+                ).alias("montant_du_marche_public_par_titulaire")
             )
-        )
-
-        return (
-            pl.from_pandas(marches_pd)
             .pipe(cls.generate_id_mp_index)
             .pipe(cls.forme_prix_enrich)
             .pipe(cls.type_identifiant_titulaire_enrich)
@@ -187,29 +224,65 @@ class MarchesPublicsEnricher(BaseEnricher):
         return []
 
     @staticmethod
-    def unnest_titulaires(marches: pd.DataFrame) -> pd.DataFrame:
+    @eager
+    def unnest_titulaires(marches: pl.DataFrame) -> pl.DataFrame:
         """
         A partir de la liste des titulaires par MP, créé une ligne par titulaire par MP
         """
-
-        # On s'assure que la colonne contient bien des listes de json
-        marches["titulaires"] = marches["titulaires"].apply(
-            MarchesPublicsEnricher.ensure_list_of_dicts
+        # Structures rencontrées : [...], [[...]], {...} et {"titulaire": ...}
+        titulaires = pl.col("titulaires")
+        titulaire = titulaires.str.json_path_match("$.titulaire")
+        titulaires = pl.when(titulaire.is_not_null()).then(titulaire).otherwise(titulaires)
+        titulaires = (
+            pl.when(titulaires.str.starts_with("[["))
+            .then(titulaires.str.json_path_match("$[0]"))
+            .otherwise(titulaires)
         )
+        titulaires = (
+            pl.when(titulaires.str.starts_with("{"))
+            .then(pl.concat_str(pl.lit("["), titulaires, pl.lit("]")))
+            .otherwise(titulaires)
+        )
+        marches = marches.with_columns(titulaires.alias("titulaires"))
 
-        # 1. Dupliquer la ligne pour chaque dict de titulaire
-        marches_exploded = marches.explode("titulaires", ignore_index=True)
-
-        # 2. Normaliser les dictionnaires en colonnes
-        titulaires_norm = pd.json_normalize(marches_exploded["titulaires"])
-
-        # 3. Préfixer les colonnes
-        titulaires_norm = titulaires_norm.add_prefix("titulaire_")
+        # Les titulaires qui ne sont pas une liste JSON de dicts (ex: repr python des
+        # fichiers normalisés avant le passage au JSON) sont convertis un à un
+        premier = pl.col("titulaires").str.json_path_match("$[0]")
+        decodable = (pl.col("titulaires") == "[]") | premier.str.starts_with("{").fill_null(
+            False
+        )
+        autres = marches.filter(~decodable)["titulaires"].unique()
+        if len(autres):
+            marches = marches.with_columns(
+                pl.col("titulaires").replace(
+                    {x: MarchesPublicsEnricher._titulaires_json(x) for x in autres}
+                )
+            )
 
-        # 4. Fusionner avec le DataFrame original (sans la colonne dict)
-        marches_out = pd.concat([marches_exploded, titulaires_norm], axis=1)
+        return (
+            marches.with_columns(pl.col("titulaires").str.json_decode(TITULAIRES_DTYPE))
+            .explode("titulaires")
+            .with_columns(
+                pl.col("titulaires").struct.rename_fields(
+                    [f"titulaire_{field}" for field in TITULAIRE_FIELDS]
+                )
+            )
+            .unnest("titulaires")
+        )
 
-        return marches_out.drop(columns=["titulaires"])
+    @staticmethod
+    def _titulaires_json(x: str) -> str:
+        """
+        Liste JSON des titulaires, à partir de leur JSON ou de leur repr python.
+        """
+        try:
+            x = json.loads(x)
+        except json.JSONDecodeError:
+            pass
+        titulaires = MarchesPublicsEnricher.ensure_list_of_dicts(x)
+        return json.dumps(
+            [titulaire for titulaire in titulaires if isinstance(titulaire, dict)]
+        )
 
     @staticmethod
     def type_prix_enrich(marches: pl.DataFrame) -> pl.DataFrame:
@@ -291,18 +364,7 @@ class MarchesPublicsEnricher(BaseEnricher):
         )
 
     @staticmethod
-    def safe_json_load(x):
-        """Parse le JSON et retourne {} en cas d'erreur."""
-        try:
-            if isinstance(x, dict):
-                return x
-            if x and isinstance(x, str) and x.strip() != "":
-                return json.loads(x)
-        except json.JSONDecodeError:
-            return {}
-        return {}
-
-    @staticmethod
+    @eager
     def lieu_execution_enrich(marches: pl.DataFrame) -> pl.DataFrame:
         """Parse lieuExecution into code, typeCode and nom columns.
 
@@ -315,53 +377,27 @@ class MarchesPublicsEnricher(BaseEnricher):
             "franche-comte": "code departement",
         }
 
-        df = (
-            marches.with_columns(
-                pl.col("lieuExecution")
-                .map_elements(
-                    MarchesPublicsEnricher.safe_json_load,
-                    return_dtype=pl.Object,
-                )
-                .alias("lieu_execution_parsed")
-            )
-            .with_columns(
-                pl.col("lieu_execution_parsed")
-                .map_elements(
-                    lambda d: str(d.get("code")) if d.get("code") is not None else None,
-                    return_dtype=pl.Utf8,
-                )
-                .str.to_lowercase()
-                .alias("lieu_execution_code"),
-                pl.col("lieu_execution_parsed")
-                .map_elements(
-                    lambda d: str(d.get("typeCode")) if d.get("typeCode") is not None else None,
-                    return_dtype=pl.Utf8,
-                )
-                .str.to_lowercase()
-                .alias("lieu_execution_type_code"),
-                pl.col("lieu_execution_parsed")
-                .map_elements(
-                    lambda d: str(d.get("nom")) if d.get("nom") is not None else None,
-                    return_dtype=pl.Utf8,
-                )
-                .str.to_lowercase()
-                .alias("lieu_execution_nom"),
-            )
-            .with_columns(
+        lieu = pl.col("lieuExecution").cast(pl.String).str.strip_chars()
+        lieu = (
+            pl.when(lieu.str.starts_with("{") & lieu.str.json_path_match("$").is_not_null())
+            .then(lieu)
+            .str.json_decode(LIEU_EXECUTION_DTYPE)
+        )
+        df = marches.with_columns(
+            lieu.struct.field("code").str.to_lowercase().alias("lieu_execution_code"),
+            lieu.struct.field("typeCode")
+            .str.to_lowercase()
+            # Supprime les accents
+            .str.normalize("NFKD")
+            .str.replace_all(r"\p{Mn}", "")
+            .alias("lieu_execution_type_code"),
+            lieu.struct.field("nom").str.to_lowercase().alias("lieu_execution_nom"),
+        ).with_columns(
+            pl.when(pl.col("lieu_execution_type_code").is_not_null()).then(
                 pl.col("lieu_execution_type_code")
-                .map_elements(lambda x: unidecode(x), return_dtype=pl.Utf8)
+                .replace_strict(type_code_mapping, default=pl.col("lieu_execution_type_code"))
                 .alias("lieu_execution_type_code")
             )
-            .with_columns(
-                pl.when(pl.col("lieu_execution_type_code").is_not_null()).then(
-                    pl.col("lieu_execution_type_code")
-                    .replace_strict(
-                        type_code_mapping, default=pl.col("lieu_execution_type_code")
-                    )
-                    .alias("lieu_execution_type_code")
-                )
-            )
-            .drop("lieu_execution_parsed")
         )
 
         # For v2 rows where nom was synthesised from "typeCode code", try to
@@ -432,178 +468,267 @@ class MarchesPublicsEnricher(BaseEnricher):
         return result.drop(cols_to_drop)
 
     @classmethod
-    def _add_metadata(cls, df: pd.DataFrame) -> pd.DataFrame:
-        return df.assign(
-            anneeNotification=df["dateNotification"].dt.year.astype("Int64"),
-            anneePublicationDonnees=df["datePublicationDonnees"].dt.year.astype("Int64"),
-            obligation_publication=pd.cut(
-                df["montant"],
-                bins=[0, 40000, float("inf")],
-                labels=["Optionnel", "Obligatoire"],
-                right=False,
-            ),
-            delaiPublicationJours=(
-                df["datePublicationDonnees"] - df["dateNotification"]
-            ).dt.days,
+    def _add_metadata(cls, df: pl.DataFrame) -> pl.DataFrame:
+        return df.with_columns(
+            pl.col("dateNotification").dt.year().cast(pl.Int64).alias("anneeNotification"),
+            pl.col("datePublicationDonnees")
+            .dt.year()
+            .cast(pl.Int64)
+            .alias("anneePublicationDonnees"),
+            pl.when(pl.col("montant") >= 40000)
+            .then(pl.lit("Obligatoire"))
+            .when(pl.col("montant") >= 0)
+            .then(pl.lit("Optionnel"))
+            .cast(pl.Categorical)
+            .alias("obligation_publication"),
+            (pl.col("datePublicationDonnees") - pl.col("dateNotification"))
+            .dt.total_days()
+            .alias("delaiPublicationJours"),
         )
 
-    @classmethod
-    def concat_list(cls, lst: str):
-        if len(lst) > 0:
-            return " et ".join(sorted(set(lst)))
-        return None
-
-    @classmethod
-    def safe_json_load_of_dict_or_list_or_str(cls, col_value: str, dict_key: str):
-        try:
-            parsed = json.loads(col_value)
-            if isinstance(parsed, list) and parsed:
-                return MarchesPublicsEnricher.concat_list(parsed)
-            elif isinstance(parsed, dict):
-                dct = parsed.get(dict_key)
-                if isinstance(dct, list) and dct:
-                    return MarchesPublicsEnricher.concat_list(dct)
-                if isinstance(dct, str):
-                    return dct
-            return None
-        except (json.JSONDecodeError, TypeError):
-            if isinstance(col_value, str) and (col_value != ""):
-                return col_value
-            return None
+    @staticmethod
+    def normalize_date(marches: pl.DataFrame, column: str) -> pl.DataFrame:
+        """
+        Convertit en datetime UTC une colonne au format AAAA-MM-JJ, JJ/MM/AAAA, AAAA/MM/JJ,
+        JJ-MM-AAAA ou AAAA. La date peut être suivie d'une heure et d'un fuseau, sans
+        fuseau elle est considérée en UTC. Les dates antérieures à 2000 sont ignorées.
+        """
+        if column not in marches.collect_schema().names():
+            return marches
+        value = pl.col(column).cast(pl.String).str.strip_chars()
+        date = pl.coalesce(
+            *(value.str.slice(0, 10).str.to_date(fmt, strict=False) for fmt in FORMATS_DATES),
+            pl.when(value.str.contains(r"^\d{4}$")).then(
+                pl.date(value.cast(pl.Int32, strict=False), 1, 1)
+            ),
+        )
+        suite = value.str.slice(10)
+        heure = suite.str.extract_groups(HEURE_REGEX)
+        fuseau = suite.str.extract_groups(FUSEAU_REGEX)
+
+        def nombre(groupes: pl.Expr, i: int) -> pl.Expr:
+            return groupes.struct[i].cast(pl.Float64).fill_null(0)
+
+        secondes = (nombre(heure, 0) * 60 + nombre(heure, 1)) * 60 + nombre(heure, 2)
+        decalage = (
+            pl.when(fuseau.struct[0] == "-").then(-1).otherwise(1)
+            * (nombre(fuseau, 1) * 60 + nombre(fuseau, 2))
+            * 60
+        )
+        datetime_utc = date.cast(pl.Datetime("us")) + pl.duration(
+            microseconds=((secondes - decalage) * 1_000_000).round().cast(pl.Int64)
+        )
+        return marches.with_columns(
+            pl.when(datetime_utc.dt.year() >= 2000)
+            .then(datetime_utc.dt.replace_time_zone("UTC"))
+            .alias(column)
+        )
 
     @classmethod
     def generic_json_column_enrich(
         cls, marches: pl.DataFrame, col_name: str, dict_key: str
     ) -> pl.DataFrame:
+        """
+        Simplifie une colonne contenant du JSON ou du texte :
+        - une liste de textes, ou un dict dont `dict_key` est une liste de textes, devient
+          la liste de ses valeurs uniques triées, jointes par " et " (nulle si la liste est vide)
+        - un dict dont `dict_key` est un texte devient ce texte
+        - le texte qui n'est pas du JSON est gardé tel quel, comme les listes d'autres valeurs
+        - les autres valeurs JSON deviennent nulles
+        """
+        valeur = pl.col(col_name).cast(pl.String)
+        texte = valeur.str.strip_chars()
+        json_valide = texte.str.json_path_match("$").is_not_null()
+        est_dict = texte.str.starts_with("{") & json_valide
+        valeur_dict = texte.str.json_path_match(f"$.{dict_key}")
+        # json_path_match ne distingue pas un texte d'un nombre ou d'un booléen :
+        # la valeur de `dict_key` est un texte si elle commence par un guillemet
+        cle_texte = est_dict & texte.str.contains(rf'"{re.escape(dict_key)}"\s*:\s*"')
+        liste = (
+            pl.when(texte.str.starts_with("["))
+            .then(texte)
+            .when(est_dict & ~cle_texte & valeur_dict.str.starts_with("["))
+            .then(valeur_dict)
+        )
+        est_liste_de_textes = liste.str.contains(LISTE_DE_TEXTES_REGEX)
+        textes = pl.when(est_liste_de_textes).then(liste).str.json_decode(pl.List(pl.String))
         return marches.with_columns(
-            pl.col(col_name)
-            .map_elements(
-                lambda x: MarchesPublicsEnricher.safe_json_load_of_dict_or_list_or_str(
-                    x, dict_key
-                ),
-                return_dtype=pl.Utf8,
+            pl.when(est_liste_de_textes)
+            .then(
+                pl.when(textes.list.len() > 0).then(
+                    textes.list.unique().list.sort().list.join(" et ")
+                )
             )
+            .when(liste.is_not_null())
+            .then(valeur)
+            .when(cle_texte)
+            .then(valeur_dict)
+            .when(json_valide | texte.is_in(["", "null"]))
+            .then(None)
+            .otherwise(valeur)
             .alias(col_name)
         )
 
-    @staticmethod
-    def tri_modification(mod):
-        # Tri personnalisé sans convertir les id entiers en chaînes
+    @classmethod
+    @eager
+    def appliquer_modifications(cls, marches: pl.DataFrame) -> pl.DataFrame:
+        """
+        Applique à chaque MP ses modifications, de la plus ancienne à la plus récente :
+        chaque colonne modifiée prend la dernière valeur non nulle de ses modifications.
+
+        - les id entiers sont des id techniques de la modification et sont ignorés
+        - les titulaires ne sont modifiés que si au moins un titulaire a un id
+        - les colonnes numériques modifiées sont converties en float
+        - les modifications vides ou mal formées sont ignorées
+        """
+        columns = [
+            column
+            for column in dict.fromkeys(
+                [field.removesuffix("Modification") for field in MODIFICATION_FIELDS]
+                + ["titulaires"]
+            )
+            if column in marches.columns
+        ]
+        numeric = [column for column in columns if marches.schema[column].is_numeric()]
+        updates = (
+            cls._modifications_par_mp(marches)
+            .select(
+                "id_mp",
+                *(
+                    cls._valeur_modifiee(column, marches.schema[column]).alias(column)
+                    for column in columns
+                ),
+            )
+            .group_by("id_mp", maintain_order=True)
+            .agg(pl.col(column).drop_nulls().last() for column in columns)
+        )
         return (
-            mod.get("datePublicationDonneesModification")
-            or mod.get("dateNotificationModification")
-            or mod.get("dateSignatureModification")
-            or mod.get("updated_at")
-            or (mod.get("id") if isinstance(mod.get("id"), str) else "")
+            marches.with_columns(pl.col(numeric).cast(pl.Float64))
+            .join(updates, on="id_mp", how="left", suffix="_modifie", maintain_order="left")
+            .with_columns(
+                pl.coalesce(f"{column}_modifie", column).alias(column) for column in columns
+            )
+            .drop(f"{column}_modifie" for column in columns)
         )
 
     @staticmethod
-    def appliquer_modifications(row):
-        try:
-            modifications_raw = row["modifications"]
-            modifications_list = json.loads(modifications_raw)
-        except (json.JSONDecodeError, TypeError):
-            return row  # on ignore si la valeur est vide ou mal formée
-
-        # Si ce n'est pas une liste (ex: un dict direct ou None), on ignore
-        if not isinstance(modifications_list, list):
-            # modifications_invalides += 1  # 61 lignes invalides !!!  donc potentiellement non traitées mais je ne sais pas vraiment ce qui bloque
-            return row
-
-        # Extraire proprement les dicts de modification (cas [{"modification": {...}}, ...])
-        #  En l'adaptant, potentiellement réutilisable pour l'extraction des listes de dicts des titulaires
-        modifs = [
-            mod["modification"] if isinstance(mod, dict) and "modification" in mod else mod
-            for mod in modifications_list
-        ]
-
-        modifs_sorted = sorted(modifs, key=MarchesPublicsEnricher.tri_modification)
-
-        for modif in modifs_sorted:
-            for key, value in modif.items():
-                # Gestion spéciale de 'id'
-                if key == "id":
-                    if isinstance(value, int):
-                        continue  # On ignore les id techniques
-                    elif isinstance(value, str):
-                        row["id"] = value  # Appliquer le vrai identifiant
-                        continue
-
-                # Gestion spéciale de 'titulaires' qui parfois ne contient pas de bonnes données
-                if (key == "titulaires") & isinstance(value, list):
-                    # Flatten une éventuelle liste de liste
-                    flat = []
-                    for v in value:
-                        if isinstance(v, list):
-                            flat.extend(v)
-                        else:
-                            flat.append(v)
-
-                    # Cas 1 : exemple : "titulaires": []
-                    if len(value) == 0:
-                        continue
-
-                    # Cas 2 : exemple : "titulaires": [[{"typeIdentifiant": null, "denominationSociale": null, "id": null}]]
-                    # Si tous les dicts sont vides ou ne contiennent que des valeurs None ou null
-                    all_empty = all(
-                        isinstance(d, dict) and all(val is None for val in d.values())
-                        for d in flat
-                    )
-                    if all_empty:
-                        continue
-
-                    # Cas 3 : exemple : "titulaires": [{"titulaire": "typeIdentifiant"}, {"titulaire": "id"}]
-                    all_only_titulaire = all(
-                        isinstance(d, dict) and "id" not in set(d.keys()) for d in flat
-                    )
-                    if all_only_titulaire:
-                        continue
-
-                # Normalisation du nom de la clé
-                base_key = (
-                    key.replace("Modification", "") if key.endswith("Modification") else key
-                )
+    def _modifications_par_mp(marches: pl.DataFrame) -> pl.DataFrame:
+        """
+        Une ligne par modification de chaque MP, triées par date de modification.
+        Les modifications sont soit listées directement, soit dans un objet "modification".
+        """
+        marches = marches.filter(
+            pl.col("modifications").str.json_path_match("$[0]").is_not_null()
+        ).select(
+            "id_mp",
+            "modifications",
+            pl.col("modifications").str.json_decode(MODIFICATIONS_DTYPE).alias("modification"),
+        )
+        n_modifications = marches["modification"].list.len().max() or 0
+
+        # Les titulaires sont gardés en JSON, leur structure variant d'une source à l'autre
+        def titulaires(i: int) -> pl.Expr:
+            match = pl.col("modifications").str.json_path_match
+            return (
+                pl.when(match(f"$[{i}].modification").is_not_null())
+                .then(match(f"$[{i}].modification.titulaires"))
+                .otherwise(match(f"$[{i}].titulaires"))
+            )
 
-                if base_key in row:
-                    try:
-                        if isinstance(row[base_key], (float, int)):
-                            row[base_key] = float(value)
-                        else:
-                            row[base_key] = value
-                    except (ValueError, TypeError):
-                        row[base_key] = value
+        modification = pl.col("modification")
+        wrapped = modification.struct.field("modification")
+        return (
+            marches.with_columns(
+                pl.concat_list(titulaires(i) for i in range(max(n_modifications, 1)))
+                .list.head(modification.list.len())
+                .alias("titulaires")
+            )
+            .explode(["modification", "titulaires"])
+            .select(
+                "id_mp",
+                # Typée même sans aucune modification, où la liste construite est vide
+                pl.col("titulaires").cast(pl.String),
+                *(
+                    pl.when(wrapped.is_not_null())
+                    .then(wrapped.struct.field(field))
+                    .otherwise(modification.struct.field(field))
+                    .alias(field)
+                    for field in MODIFICATION_FIELDS
+                ),
+            )
+            .with_columns(
+                pl.when(~pl.col("id").str.contains(r"^\d+$")).then(pl.col("id")).alias("id")
+            )
+            .sort(
+                "id_mp",
+                pl.coalesce(
+                    *(
+                        pl.when(pl.col(field) != "").then(pl.col(field))
+                        for field in SORT_FIELDS
+                    ),
+                    pl.col("id"),
+                    pl.lit(""),
+                ),
+                maintain_order=True,
+            )
+        )
 
-        return row
+    @staticmethod
+    def _valeur_modifiee(column: str, dtype: pl.DataType) -> pl.Expr:
+        """
+        Valeur donnée à la colonne par une modification, nulle si la modification
+        ne change pas la colonne.
+        """
+        if column == "titulaires":
+            # Ignore les titulaires vides, ou sans id (ex: [{"titulaire": ...}])
+            titulaires = pl.col("titulaires")
+            ids = (
+                pl.when(titulaires.str.starts_with("[["))
+                .then(titulaires.str.json_path_match("$[*][*].id"))
+                .otherwise(titulaires.str.json_path_match("$[*].id"))
+            )
+            return pl.when(ids.is_not_null()).then(titulaires)
+        fields = [
+            field
+            for field in MODIFICATION_FIELDS
+            if field.removesuffix("Modification") == column
+        ]
+        value = pl.coalesce(*sorted(fields, key=lambda field: field == column))
+        if dtype.is_numeric():
+            return (
+                value.str.replace_all(r"\s", "")
+                .str.replace(",", ".")
+                .cast(pl.Float64, strict=False)
+            )
+        return value if dtype == pl.Null else value.cast(dtype, strict=False)
 
     @staticmethod
     def correction_types_colonnes_str(
-        marches: pd.DataFrame, colonnes_a_convertir_en_str: list
-    ) -> pd.DataFrame:
+        marches: pl.DataFrame, colonnes_a_convertir_en_str: list
+    ) -> pl.DataFrame:
         colonnes_existantes = [
-            col for col in colonnes_a_convertir_en_str if col in marches.columns
+            col for col in colonnes_a_convertir_en_str if col in marches.collect_schema()
         ]
-
-        # Corrige les types des colonnes avant la conversion en polars
-        marches[colonnes_existantes] = (
-            marches[colonnes_existantes].astype(str).replace("nan", "")
-        )
-        return marches
+        return marches.with_columns(pl.col(colonnes_existantes).cast(pl.String).fill_null(""))
 
     @staticmethod
     def correction_types_colonnes_float(
-        marches: pd.DataFrame, colonnes_a_convertir_en_float: list | str
-    ) -> pd.DataFrame:
+        marches: pl.DataFrame, colonnes_a_convertir_en_float: list
+    ) -> pl.DataFrame:
         # Remplace les NC présents dans les données de type float par des données vides.
-        if False and isinstance(colonnes_a_convertir_en_float, list):
-            for _correction_types_colonnes_float in correction_types_colonnes_float:
-                marches = correction_types_colonnes_float(
-                    marches, _correction_types_colonnes_float
-                )
-        else:
-            marches[colonnes_a_convertir_en_float] = marches[
-                colonnes_a_convertir_en_float
-            ].replace("NC", np.nan)
-        return marches
+        schema = marches.collect_schema()
+        colonnes_texte = [
+            col
+            for col in colonnes_a_convertir_en_float
+            if col in schema and schema[col] == pl.String
+        ]
+        return marches.with_columns(
+            pl.when(pl.col(col) != "NC")
+            .then(pl.col(col))
+            .cast(pl.Float64, strict=False)
+            .alias(col)
+            for col in colonnes_texte
+        )
 
     @staticmethod
     def keep_last_modifications_par_mp(marches: pl.DataFrame) -> pl.DataFrame:
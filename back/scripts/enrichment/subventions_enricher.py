@@ -6,13 +6,12 @@ from polars import col
 
 from back.scripts.datasets.sirene import SireneWorkflow
 from back.scripts.datasets.topic_aggregator import TopicAggregator
-from back.scripts.utils.config import get_project_base_path
-from back.scripts.utils.decorators import tracker
+from back.scripts.enrichment.base_enricher import BaseEnricher
 
 LOGGER = logging.getLogger(__name__)
 
 
-class SubventionsEnricher:
+class SubventionsEnricher(BaseEnricher):
     @classmethod
     def get_dataset_name(cls) -> str:
         return "subventions"
@@ -29,21 +28,6 @@ class SubventionsEnricher:
             SireneWorkflow.get_output_path(main_config),
         ]
 
-    @classmethod
-    def get_output_path(cls, main_config: dict) -> Path:
-        return (
-            get_project_base_path()
-            / main_config["warehouse"]["data_folder"]
-            / f"{cls.get_dataset_name()}.parquet"
-        )
-
-    @classmethod
-    @tracker(ulogger=LOGGER, log_start=True)
-    def enrich(cls, main_config: dict) -> None:
-        inputs = map(pl.scan_parquet, cls.get_input_paths(main_config))
-        output = cls._clean_and_enrich(inputs)
-        output.sink_parquet(cls.get_output_path(main_config))
-
     @classmethod
     def _clean_and_enrich(cls, inputs: list[pl.LazyFrame]) -> pl.LazyFrame:
         """
@@ -31,3 +31,17 @@ class IWorkflowFactory(Protocol):
         Creates and configures a workflow instance from a configuration dictionary.
         """
         ...
+
+    @classmethod
+    def get_output_path(cls, main_config: dict) -> Path:
+        """
+        Returns the primary output path of the created workflow, without creating it.
+        """
+        ...
+
+    @classmethod
+    def get_input_paths(cls, main_config: dict) -> list[Path]:
+        """
+        Returns the output paths of the other workflows the created workflow depends on.
+        """
+        ...
@@ -2,9 +2,10 @@ import logging
 import os
 import re
 from pathlib import Path
-from typing import Pattern, Self
+from typing import BinaryIO, Callable, Pattern, Self
 from urllib.parse import urlparse
 
+import polars as pl
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -13,6 +14,10 @@ from back.scripts.loaders.utils import LOADER_CLASSES
 
 LOGGER = logging.getLogger(__name__)
 
+# Resolution caches, keyed by URL, shared by all loaders
+_MEDIA_TYPES: dict[str, str] = {}
+_LOADER_CLASSES_BY_URL: dict[str, type] = {}
+
 
 def retry_session(
     retries: int | None,
@@ -80,21 +85,37 @@ class BaseLoader:
         else:
             return self._load_from_file()
 
+    def load_lazy(self) -> pl.LazyFrame | None:
+        """
+        Load the file as a polars LazyFrame, so that callers only materialize what they use.
+
+        Loaders able to scan their format natively push down the projection (`columns` kwarg)
+        and the filters applied to the LazyFrame into the reader.
+        By default, the file is loaded with `load` and the result is wrapped.
+        """
+        df = self.load()
+        if df is None:
+            return None
+        return pl.from_pandas(df).lazy()
+
     def _load_from_url(self):
         s = retry_session(self.num_retries, backoff_factor=self.delay_between_retries)
         response = s.get(self.file_url)
         if response.status_code == 200:
+            _MEDIA_TYPES[self.file_url] = response.headers.get("content-type", "")
             return self.process_data(response.content)
 
         raise RuntimeError(f"Failed to load data from {self.file_url}")
 
+    def _local_path(self) -> str:
+        local_path = urlparse(self.file_url).path
+        if local_path.startswith("./"):
+            local_path = os.path.abspath(local_path)
+        return local_path
+
     def _load_from_file(self):
-        parsed_url = urlparse(self.file_url)
         try:
-            local_path = parsed_url.path
-            if local_path.startswith("./"):
-                local_path = os.path.abspath(local_path)
-            with open(local_path, "rb") as file:
+            with open(self._local_path(), "rb") as file:
                 return self.process_data(file.read())
         except FileNotFoundError as e:
             LOGGER.error(f"File not found: {e}")
@@ -105,6 +126,15 @@ class BaseLoader:
     def process_data(self, data):
         raise NotImplementedError("This method should be implemented by subclasses.")
 
+    def load_from_stream(self, open_binary: Callable[[], BinaryIO]):
+        """
+        Load the content of a binary stream, such as an archive member.
+        `open_binary` opens a new stream on each call, so that the content can be read more than once.
+        By default, the content is read in memory and processed as a downloaded file.
+        """
+        with open_binary() as stream:
+            return self.process_data(stream.read())
+
     def get_loader_kwargs(self) -> dict:
         """
         Returns:
@@ -136,30 +166,54 @@ class BaseLoader:
 
     @classmethod
     def get_file_media_type(cls, file_url: str) -> str:
-        if cls.get_file_is_url(file_url):
-            # Get the content type of the file from the headers
-            response = requests.head(file_url)
-            if response.status_code == 200:
-                return response.headers.get("content-type", "")
-            else:
-                raise RuntimeError(f"Failed to load data from {file_url}")
-        return ""
+        """
+        Content type of a remote file, from a HEAD request.
+        The media type of each URL is cached, along with the ones returned by downloads.
+        """
+        if not cls.get_file_is_url(file_url):
+            return ""
+        if file_url in _MEDIA_TYPES:
+            return _MEDIA_TYPES[file_url]
+        # Get the content type of the file from the headers
+        response = requests.head(file_url)
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to load data from {file_url}")
+        _MEDIA_TYPES[file_url] = response.headers.get("content-type", "")
+        return _MEDIA_TYPES[file_url]
+
+    @staticmethod
+    def clear_resolution_cache() -> None:
+        """
+        Forget the media types and loader classes resolved for each URL.
+        """
+        _MEDIA_TYPES.clear()
+        _LOADER_CLASSES_BY_URL.clear()
 
     @classmethod
     def search_loader_class(cls, file_url: str) -> type | None:
         """
         Searches for a loader class based on the file extension and content type.
+        The content type is only fetched if the extension does not identify a loader.
         """
-        file_extension = cls.get_file_extension(file_url)
-        file_media_type = cls.get_file_media_type(file_url)
-
-        for loader_class in set(LOADER_CLASSES.values()):
-            if loader_class.can_load_file(
-                file_extension=file_extension, file_media_type=file_media_type
-            ):
-                return loader_class
+        if file_url in _LOADER_CLASSES_BY_URL:
+            return _LOADER_CLASSES_BY_URL[file_url]
 
-        return None
+        file_extension = cls.get_file_extension(file_url)
+        loader_class = LOADER_CLASSES.get(file_extension)
+        if loader_class is None:
+            file_media_type = cls.get_file_media_type(file_url)
+            loader_class = next(
+                (
+                    candidate
+                    for candidate in set(LOADER_CLASSES.values())
+                    if candidate.can_load_file_media_type(file_media_type)
+                ),
+                None,
+            )
+
+        if loader_class is not None:
+            _LOADER_CLASSES_BY_URL[file_url] = loader_class
+        return loader_class
 
     @classmethod
     def can_load_file(
@@ -168,15 +222,14 @@ class BaseLoader:
         """
         Check if the given file URL, extension or content type can be loaded by the current loader class.
         """
-        if file_url:
-            if not file_extension:
-                file_extension = cls.get_file_extension(file_url)
-            if not file_media_type:
-                file_media_type = cls.get_file_media_type(file_url)
-
-        return cls.can_load_file_extension(file_extension) or cls.can_load_file_media_type(
-            file_media_type
-        )
+        if file_url and not file_extension:
+            file_extension = cls.get_file_extension(file_url)
+        if cls.can_load_file_extension(file_extension):
+            return True
+
+        if file_url and not file_media_type:
+            file_media_type = cls.get_file_media_type(file_url)
+        return cls.can_load_file_media_type(file_media_type)
 
     @classmethod
     def can_load_file_extension(cls, file_extension: str) -> bool:
@@ -1,7 +1,9 @@
+import codecs
 import csv
+import io
 import logging
 import re
-from io import StringIO
+from typing import BinaryIO, Callable, TextIO
 
 import pandas as pd
 
@@ -11,6 +13,9 @@ from back.scripts.loaders.utils import register_loader
 LOGGER = logging.getLogger(__name__)
 STARTING_NEWLINE = re.compile(r"^(\r?\n)+")
 WINDOWS_NEWLINE = re.compile(r"\r\n?")
+# Size of the sample used to check the encoding and detect the delimiter
+SAMPLE_SIZE = 64 * 1024
+SNIFF_SIZE = 4096
 
 
 @register_loader
@@ -19,6 +24,9 @@ class CSVLoader(EncodedDataLoader):
     file_media_type_regex = re.compile(r"csv", flags=re.IGNORECASE)
     """
     Initialize the CSV loader for either URL or local file.
+
+    The content is never decoded as a whole : the encoding and the delimiter are detected
+    from a sample, and the file is transcoded on the fly while pandas parses it.
     """
 
     def get_loader_kwargs(self):
@@ -35,22 +43,67 @@ class CSVLoader(EncodedDataLoader):
 
         return kwargs
 
-    def process_from_decoded(self, decoded_content) -> pd.DataFrame | None:
+    def _load_from_file(self) -> pd.DataFrame | None:
+        local_path = self._local_path()
+        try:
+            return self.load_from_stream(lambda: open(local_path, "rb"))
+        except FileNotFoundError as e:
+            LOGGER.error(f"File not found: {e}")
+        except Exception as e:
+            LOGGER.error(f"Failed to load data from {self.file_url}: {e}")
+        return None
+
+    def process_data(self, data: bytes) -> pd.DataFrame | None:
+        return self.load_from_stream(lambda: io.BytesIO(data))
+
+    def load_from_stream(self, open_binary: Callable[[], BinaryIO]) -> pd.DataFrame | None:
+        """
+        Parse the content with the first accepted encoding able to decode it.
+        """
+        for encoding in self.get_accepted_encodings():
+            with open_binary() as raw:
+                sample = self._decode_sample(raw.read(SAMPLE_SIZE), encoding)
+                if sample is None:
+                    LOGGER.debug(f"Failed to decode using {encoding} encoding")
+                    continue
+                raw.seek(0)
+                # Universal newlines mode converts windows and old mac newlines
+                text = io.TextIOWrapper(raw, encoding=encoding, newline=None)
+                df = self._read_csv(text, sample)
+                text.detach()
+            if df is not None:
+                LOGGER.info(f"Successfully decoded using {encoding} encoding")
+                return df
+
+        LOGGER.error(f"Unable to process content from: {self.file_url}")
+        return None
+
+    @staticmethod
+    def _decode_sample(sample: bytes, encoding: str) -> str | None:
+        """
+        Decode the beginning of a file, which may end in the middle of a character.
+        """
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            decoded = decoder.decode(sample, final=len(sample) < SAMPLE_SIZE)
+        except UnicodeDecodeError:
+            return None
+        return WINDOWS_NEWLINE.sub("\n", STARTING_NEWLINE.sub("", decoded))
+
+    def _read_csv(self, text: TextIO, sample: str) -> pd.DataFrame | None:
         loader_kwargs = self.get_loader_kwargs()
 
         # If the delimiter is not specified, try to detect it
-        decoded_content = STARTING_NEWLINE.sub("", decoded_content)
-        decoded_content = WINDOWS_NEWLINE.sub("\n", decoded_content)
         sniffer = csv.Sniffer()
-        sample = decoded_content[: min(4096, len(decoded_content))]
+        sniff_sample = sample[:SNIFF_SIZE]
 
         try:
-            dialect = sniffer.sniff(sample)
-            loader_kwargs["header"] = 0 if sniffer.has_header(sample) else None
+            dialect = sniffer.sniff(sniff_sample)
+            loader_kwargs["header"] = 0 if sniffer.has_header(sniff_sample) else None
         except csv.Error as e:
             LOGGER.warning(f"CSV Sniffer error: {e}")
             # Try to find the most common delimiter
-            counts = {sep: decoded_content.count(sep) for sep in (",", ";", "\t")}
+            counts = {sep: sample.count(sep) for sep in (",", ";", "\t")}
             delimiter = max(counts, key=counts.get)
         else:
             delimiter = dialect.delimiter
@@ -59,7 +112,8 @@ class CSVLoader(EncodedDataLoader):
         LOGGER.debug(f"Detected delimiter: '{delimiter}'")
 
         try:
-            df = pd.read_csv(StringIO(decoded_content), **loader_kwargs)
+            # Leading blank lines are skipped by pandas
+            df = pd.read_csv(text, **loader_kwargs)
         except Exception as e:
             LOGGER.warning(f"Error while reading CSV: {e}")
             return
@@ -1,14 +1,19 @@
 import logging
+import shutil
 import tempfile
 import urllib.request
 from pathlib import Path
+from typing import BinaryIO, Callable
 
 import pandas as pd
+import polars as pl
 
 from back.scripts.loaders.base_loader import BaseLoader
 from back.scripts.loaders.utils import register_loader
 
 LOGGER = logging.getLogger(__name__)
+# Streams larger than this are spooled to disk
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
 
 
 @register_loader
@@ -23,3 +28,24 @@ class ParquetLoader(BaseLoader):
 
     def _load_from_file(self) -> pd.DataFrame:
         return pd.read_parquet(self.file_url, **self.get_loader_kwargs())
+
+    def load_from_stream(self, open_binary: Callable[[], BinaryIO]) -> pd.DataFrame:
+        """
+        The parquet footer is at the end of the file, so the stream is copied
+        to a seekable spooled file before being read.
+        """
+        with open_binary() as stream, tempfile.SpooledTemporaryFile(SPOOL_MAX_SIZE) as f:
+            shutil.copyfileobj(stream, f)
+            f.seek(0)
+            return pd.read_parquet(f, **self.get_loader_kwargs())
+
+    def load_lazy(self) -> pl.LazyFrame | None:
+        """
+        Scan local files, pushing down the selected columns and the filters
+        into the parquet reader. Remote files are downloaded first.
+        """
+        if self.get_file_is_url(self.file_url):
+            return super().load_lazy()
+        frame = pl.scan_parquet(self._local_path())
+        columns = self.get_loader_kwargs().get("columns")
+        return frame.select(columns) if columns else frame
@@ -4,7 +4,7 @@ import tempfile
 import urllib.request
 import zipfile
 from pathlib import Path
-from typing import Type
+from typing import BinaryIO, Callable, Type
 from urllib.parse import urlparse
 
 from back.scripts.loaders import BaseLoader
@@ -23,17 +23,19 @@ class ZipLoader(BaseLoader):
         self.archived_file_loader_class = archived_file_loader_class
         self.output_file_path = ""
 
-    def process_data(self, *args, **kwargs):
+    def process_data(self, open_member: Callable[[], BinaryIO]):
+        """
+        Load the selected member of the archive, streamed from the archive without extraction.
+        """
         if self.archived_file_loader_class is None:
-            # TODO?: add a raw parameter in addition to the file_url
-            loader_class = BaseLoader.loader_factory(
+            loader = BaseLoader.loader_factory(
                 self.output_file_path, **self.get_loader_kwargs()
             )
         else:
-            loader_class = self.archived_file_loader_class(
+            loader = self.archived_file_loader_class(
                 self.output_file_path, **self.get_loader_kwargs()
             )
-        return loader_class.load()
+        return loader.load_from_stream(open_member)
 
     def _load_from_url(self):
         with tempfile.TemporaryDirectory() as tempdir:
@@ -45,7 +47,7 @@ class ZipLoader(BaseLoader):
             return self._load_from_file()
 
     def _load_from_file(self):
-        with tempfile.TemporaryDirectory() as tmpdir, zipfile.ZipFile(self.file_url) as zip_ref:
+        with zipfile.ZipFile(self.file_url) as zip_ref:
             if self.archived_file_loader_class is None:
                 can_be_loaded_filenames = zip_ref.namelist()
             else:
@@ -73,9 +75,8 @@ class ZipLoader(BaseLoader):
                     else:
                         raise RuntimeError(f"Too many files to load from {self.file_url}.")
 
-            zip_ref.extract(filename, tmpdir)
-            self.output_file_path = Path(tmpdir) / filename
-            return self.process_data()
+            self.output_file_path = filename
+            return self.process_data(lambda: zip_ref.open(filename))
 
     def get_archive_prefix(self) -> str:
         """
@@ -0,0 +1,264 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Mapping
+from urllib.error import HTTPError
+from urllib.parse import urlparse
+
+LOGGER = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class HostThrottle:
+    """
+    Politeness rules shared by concurrent downloads.
+
+    Limits the number of simultaneous requests to a given host,
+    and enforces a minimum delay between two requests starting on the same host.
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = 2,
+        delay: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Args:
+            max_per_host: maximum number of concurrent requests to the same host
+            delay: minimum delay in seconds between the start of two requests to the same host
+            clock, sleep: time functions, overridable for tests
+        """
+        self.max_per_host = max(1, max_per_host)
+        self.delay = delay
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: dict[str, float] = {}
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        """
+        Block until a request to the host of `url` is allowed, and hold the slot while in context.
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(
+                host, threading.BoundedSemaphore(self.max_per_host)
+            )
+        with semaphore:
+            self._wait_turn(host)
+            yield
+
+    def _wait_turn(self, host: str) -> None:
+        with self._lock:
+            now = self._clock()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.delay
+        if start > now:
+            self._sleep(start - now)
+
+
+def validators_path(path: Path) -> Path:
+    """
+    Sidecar file storing the HTTP validators of a downloaded file.
+    """
+    return path.with_name(path.name + ".meta.json")
+
+
+def conditional_headers(path: Path) -> dict[str, str]:
+    """
+    Headers of a conditional GET revalidating the local copy of a file.
+    Empty if the file or its validators are missing, in which case the file is fully downloaded.
+    """
+    meta_path = validators_path(path)
+    if not path.exists() or not meta_path.exists():
+        return {}
+    validators = json.loads(meta_path.read_text())
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+class IntegrityError(IOError):
+    """
+    Raised when a downloaded file does not match its expected size or checksum.
+    """
+
+
+# Algorithm of a hexadecimal checksum, guessed from its length
+CHECKSUM_ALGORITHMS = {32: "md5", 40: "sha1", 64: "sha256", 128: "sha512"}
+
+
+def save_validators(path: Path, url: str, headers: Mapping[str, str]) -> None:
+    """
+    Store the validators returned by the server along with a downloaded file.
+    """
+    validators = {
+        "url": url,
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "content_length": headers.get("Content-Length"),
+    }
+    validators_path(path).write_text(json.dumps(validators))
+
+
+def _resume_headers(part_path: Path) -> dict[str, str]:
+    """
+    Headers requesting the remainder of a partial download.
+    The server only sends the remainder if the resource has not changed since the partial
+    download started (`If-Range`), otherwise it sends the complete file.
+    """
+    meta_path = validators_path(part_path)
+    if not part_path.exists() or not meta_path.exists():
+        return {}
+    validators = json.loads(meta_path.read_text())
+    validator = validators.get("etag") or validators.get("last_modified")
+    if not validator or (validators.get("etag") or "").startswith("W/"):
+        # Weak ETags cannot be used for range requests
+        return {}
+    return {"Range": f"bytes={part_path.stat().st_size}-", "If-Range": validator}
+
+
+def _expected_size(response) -> int | None:
+    """
+    Total size of the file being downloaded, as announced by the server.
+    """
+    if response.status == 206:
+        total = response.headers.get("Content-Range", "").rpartition("/")[2]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+
+def _resumed_offset(response, offset: int) -> int:
+    """
+    Offset at which the response body starts. 0 if the server sent the complete file.
+    """
+    if response.status != 206:
+        return 0
+    content_range = response.headers.get("Content-Range", "")
+    start = content_range.removeprefix("bytes ").partition("-")[0]
+    if not start.isdigit() or int(start) != offset:
+        raise IntegrityError(f"Unexpected range {content_range!r}, expected offset {offset}")
+    return offset
+
+
+def file_checksum(path: Path, algorithm: str) -> str:
+    """
+    Hexadecimal digest of a file, read by chunks.
+    """
+    h = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def verify(path: Path, size: int | None = None, checksum: str | None = None) -> None:
+    """
+    Check a file against its expected size and checksum, when known.
+    The checksum algorithm (md5, sha1, sha256, sha512) is guessed from the length of the checksum.
+
+    Raises:
+        IntegrityError: if the file does not match.
+    """
+    actual_size = path.stat().st_size
+    if size is not None and actual_size != size:
+        raise IntegrityError(f"Incomplete download: {actual_size} bytes out of {size}")
+    if not checksum:
+        return
+    algorithm = CHECKSUM_ALGORITHMS.get(len(checksum))
+    if algorithm is None:
+        LOGGER.warning(f"Unknown checksum format {checksum!r}, skipping verification")
+        return
+    actual = file_checksum(path, algorithm)
+    if actual != checksum.lower():
+        raise IntegrityError(f"Checksum mismatch: {algorithm} {actual}, expected {checksum}")
+
+
+def download(
+    url: str,
+    path: Path,
+    refresh: bool = False,
+    headers: dict[str, str] | None = None,
+    checksum: str | None = None,
+) -> bool:
+    """
+    Download the content of an URL into a local file.
+
+    An existing local file is kept as is, unless `refresh` is set: the file is then revalidated
+    with a conditional GET based on the ETag / Last-Modified returned by the previous download,
+    and only downloaded again if the server reports a change.
+
+    The content is streamed to a `.part` file, moved into place once verified against the size
+    announced by the server and the expected `checksum` if any.
+    If a previous download has been interrupted, it is resumed with a range request.
+    A corrupted file is deleted so that the next attempt starts from scratch.
+
+    Returns:
+        True if the file has been downloaded, False if the local copy has been kept.
+    Raises:
+        urllib.error.URLError: if the download fails.
+        IntegrityError: if the downloaded file is incomplete or does not match `checksum`.
+    """
+    if path.exists() and not refresh:
+        return False
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    part_path = path.with_name(path.name + ".part")
+    request_headers = dict(headers or {})
+    if urlparse(url).scheme in ("http", "https"):
+        request_headers |= conditional_headers(path) | _resume_headers(part_path)
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=request_headers)) as r:
+            offset = part_path.stat().st_size if "Range" in request_headers else 0
+            offset = _resumed_offset(r, offset)
+            size = _expected_size(r)
+            if offset:
+                LOGGER.info(f"Resuming download of {url} at byte {offset}")
+            else:
+                save_validators(part_path, url, r.headers)
+            with open(part_path, "ab" if offset else "wb") as f:
+                shutil.copyfileobj(r, f, CHUNK_SIZE)
+    except HTTPError as error:
+        if error.code == 304:
+            LOGGER.debug(f"{url} not modified since last download")
+            return False
+        if error.code == 416 and "Range" in request_headers:
+            # The partial file does not match the resource anymore
+            _discard(part_path)
+            return download(url, path, refresh=refresh, headers=headers, checksum=checksum)
+        raise
+    except IntegrityError:
+        _discard(part_path)
+        raise
+
+    try:
+        verify(part_path, size=size, checksum=checksum)
+    except IntegrityError:
+        if checksum and (size is None or part_path.stat().st_size == size):
+            # Complete but corrupted: resuming would not help
+            _discard(part_path)
+        raise
+    os.replace(part_path, path)
+    validators_path(part_path).replace(validators_path(path))
+    return True
+
+
+def _discard(part_path: Path) -> None:
+    part_path.unlink(missing_ok=True)
+    validators_path(part_path).unlink(missing_ok=True)
@@ -0,0 +1,191 @@
+import hashlib
+import logging
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import NamedTuple
+
+import pyarrow.parquet as pq
+
+LOGGER = logging.getLogger(__name__)
+
+NORMALIZED = "normalized"
+FAILED = "failed"
+
+
+class NormalizedFile(NamedTuple):
+    path: Path
+    schema_fingerprint: str | None
+
+
+class NormManifest:
+    """
+    Index of the normalized files of a data folder.
+
+    Data folders contain one sub folder per url hash, with the raw and normalized versions
+    of the file. Listing the normalized files by scanning the folder is slow once it contains
+    thousands of sub folders, so each normalization is recorded in a SQLite database
+    stored in the data folder, with its status, row count, schema fingerprint, duration
+    and error if any.
+
+    The database is created on first use. If the data folder already contains normalized files,
+    they are indexed once from a scan of the folder.
+    Entries whose normalized file has been deleted (e.g. to force a file to be normalized again)
+    are dropped when the normalized files are listed.
+    """
+
+    FILENAME = "manifest.sqlite"
+
+    def __init__(self, data_folder: Path):
+        self.data_folder = Path(data_folder)
+        self.path = self.data_folder / self.FILENAME
+
+    def _connect(self) -> sqlite3.Connection:
+        self.data_folder.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=60)
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'files'"
+        ).fetchone()
+        if not exists:
+            self._bootstrap(conn)
+        return conn
+
+    def _bootstrap(self, conn: sqlite3.Connection) -> None:
+        existing = sorted(self.data_folder.glob("*/norm.parquet"))
+        if existing:
+            LOGGER.info(f"Indexing {len(existing)} normalized files of {self.data_folder}")
+        records = [self._normalized_record(path.parent.name, path, None) for path in existing]
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS files (
+                    url_hash TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    path TEXT,
+                    n_rows INTEGER,
+                    schema_fingerprint TEXT,
+                    duration REAL,
+                    error TEXT,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)", records
+            )
+
+    def _normalized_record(self, url_hash: str, path: Path, duration: float | None) -> tuple:
+        # Only the parquet footer is read
+        metadata = pq.read_metadata(path)
+        schema = metadata.schema.to_arrow_schema()
+        fingerprint = hashlib.sha1(
+            repr([(field.name, str(field.type)) for field in schema]).encode("utf-8")
+        ).hexdigest()
+        return (
+            url_hash,
+            NORMALIZED,
+            str(path.relative_to(self.data_folder)),
+            metadata.num_rows,
+            fingerprint,
+            duration,
+            None,
+            datetime.now(timezone.utc).isoformat(),
+        )
+
+    def record_normalized(
+        self, url_hash: str, path: Path, duration: float | None = None
+    ) -> None:
+        """
+        Record the successful normalization of a file, written at `path`.
+        """
+        record = self._normalized_record(url_hash, Path(path), duration)
+        self._write("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)", record)
+
+    def record_failed(
+        self, url_hash: str, error: str | None = None, duration: float | None = None
+    ) -> None:
+        """
+        Record a failed normalization. Failed files are retried on the next run.
+        """
+        self._write(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, NULL, NULL, NULL, ?, ?, ?)",
+            (url_hash, FAILED, duration, error, datetime.now(timezone.utc).isoformat()),
+        )
+
+    def normalized_files(self) -> dict[str, NormalizedFile]:
+        """
+        Normalized files by url hash, sorted by url hash.
+
+        Entries whose file no longer exists are dropped: each call checks all the files,
+        so callers needing several views of the manifest should derive them from one call.
+        """
+        return self._normalized()
+
+    def normalized_hashes(self) -> set[str]:
+        """
+        Url hashes of the files already normalized.
+        """
+        return set(self._normalized())
+
+    def normalized_paths(self) -> list[Path]:
+        """
+        Paths of the normalized files, sorted by url hash.
+        """
+        return [file.path for file in self._normalized().values()]
+
+    def schema_fingerprints(self) -> set[str]:
+        """
+        Distinct schemas of the normalized files.
+        """
+        return {file.schema_fingerprint for file in self._normalized().values()}
+
+    def failures(self) -> dict[str, str | None]:
+        """
+        Error of each file which failed to be normalized, by url hash.
+        """
+        conn = self._connect()
+        try:
+            return dict(
+                conn.execute(
+                    "SELECT url_hash, error FROM files WHERE status = ? ORDER BY url_hash",
+                    (FAILED,),
+                ).fetchall()
+            )
+        finally:
+            conn.close()
+
+    def _normalized(self) -> dict[str, NormalizedFile]:
+        """
+        Normalized files by url hash, after dropping the entries whose file no longer exists.
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT url_hash, path, schema_fingerprint FROM files WHERE status = ? "
+                "ORDER BY url_hash",
+                (NORMALIZED,),
+            ).fetchall()
+            normalized = {
+                url_hash: NormalizedFile(self.data_folder / path, fingerprint)
+                for url_hash, path, fingerprint in rows
+            }
+            missing = [
+                url_hash for url_hash, file in normalized.items() if not file.path.exists()
+            ]
+            if missing:
+                LOGGER.info(f"Dropping {len(missing)} deleted files from the manifest")
+                with conn:
+                    conn.executemany(
+                        "DELETE FROM files WHERE url_hash = ?", [(h,) for h in missing]
+                    )
+            return {h: file for h, file in normalized.items() if h not in missing}
+        finally:
+            conn.close()
+
+    def _write(self, query: str, params: tuple) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(query, params)
+        finally:
+            conn.close()
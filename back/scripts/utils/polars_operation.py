@@ -32,29 +32,52 @@ def normalize_identifiant_pl(
         return frame
 
     target_len = 14 if format == IdentifierFormat.SIRET else 9
-
-    return frame.with_columns(
+    identifier = (
         pl.col(id_col)
         .cast(pl.Utf8)
         .str.strip_chars()
         .str.replace_all(r"\.0$", "")
         .str.replace_all(r"[\s\xa0]", "")
-        .map_elements(lambda x: _format_identifier(x, target_len), return_dtype=pl.Utf8)
-        .alias(id_col)
     )
+    length = identifier.str.len_chars()
 
+    return frame.with_columns(
+        # SIREN (9 digits) or SIRET (14 digits), other lengths are invalid
+        pl.when(length == 9)
+        .then(identifier.str.pad_end(target_len, "0"))
+        .when(length == 14)
+        .then(identifier.str.slice(0, target_len))
+        .alias(id_col)
+    )
 
-def _format_identifier(identifier: str | None, target_len: int) -> str | None:
-    if not identifier:
-        return None
-
-    if len(identifier) == 9:  # It's a SIREN
-        return identifier.ljust(target_len, "0") if target_len == 14 else identifier
 
-    if len(identifier) == 14:  # It's a SIRET
-        return identifier[:9] if target_len == 9 else identifier
+def normalize_montant_pl(frame: pl.LazyFrame, id_col: str) -> pl.LazyFrame:
+    """
+    Transforms the selected column to be a positive float.
+    Amounts in text are read with one or two decimals, whatever the decimal separator.
+    """
+    schema = frame.collect_schema()
+    if id_col not in schema.names():
+        return frame
+    if schema[id_col].is_numeric():
+        return frame.with_columns(pl.col(id_col).cast(pl.Float64).abs())
 
-    return None  # Invalid length, return null
+    montant = (
+        pl.col(id_col)
+        .cast(pl.Utf8)
+        .str.replace_all(r"[\u20ac\xa0 ]", "")
+        .str.replace_all("euros", "", literal=True)
+        .str.strip_chars()
+    )
+    decimals = montant.str.extract(r"[.,](\d{1,2})$").str.len_chars().fill_null(0)
+    return frame.with_columns(
+        (
+            montant.str.replace_all(r"[,.]", "").cast(pl.Float64, strict=False)
+            / pl.lit(10.0).pow(decimals)
+        )
+        .abs()
+        .alias(id_col)
+    )
 
 
 def normalize_date_pl(
@@ -21,6 +21,18 @@ LOGGER = logging.getLogger(__name__)
 INDEX_SQL_PATH = Path(__file__).resolve().parent.parent / "migrations" / "add_indexes.sql"
 WRITE_CHUNK_SIZE = 50_000
 
+# Enrichers in dependency order: each one only uses the outputs of the enrichers before it.
+# An enricher is rebuilt when its inputs change, so rebuilding one of them cascades to
+# the enrichers using its output (e.g. Bareme → Communities), and only to them.
+ENRICHERS = [
+    ElectedOfficialsEnricher,
+    FinancialEnricher,
+    SubventionsEnricher,
+    MarchesPublicsEnricher,
+    BaremeEnricher,
+    CommunitiesEnricher,
+]
+
 
 class DataWarehouseWorkflow:
     def __init__(self, config: dict):
@@ -40,16 +52,24 @@ class DataWarehouseWorkflow:
         }
 
     def run(self) -> None:
-        ElectedOfficialsEnricher.enrich(self.config)
-        FinancialEnricher.enrich(self.config)
-        SubventionsEnricher.enrich(self.config)
-        MarchesPublicsEnricher.enrich(self.config)
-        BaremeEnricher.enrich(self.config)
-        CommunitiesEnricher.enrich(self.config)
+        self._enrich()
         self._send_to_postgres()
         self._create_indexes()
         self._generate_audit_report()
 
+    def _enrich(self) -> list[str]:
+        """
+        Rebuild the enrichers whose inputs, code or config changed since their last build.
+        Returns the names of the rebuilt datasets.
+        """
+        rebuilt = [
+            enricher.get_dataset_name()
+            for enricher in ENRICHERS
+            if enricher.enrich(self.config)
+        ]
+        LOGGER.info(f"Rebuilt enrichers: {', '.join(rebuilt) or 'none'}")
+        return rebuilt
+
     def _generate_audit_report(self) -> None:
         """Generate an audit report and compare with the previous run."""
         LOGGER.info("Generating audit report...")
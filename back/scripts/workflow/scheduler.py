@@ -0,0 +1,161 @@
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from copy import deepcopy
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from back.scripts.interfaces.workflow import IWorkflow
+from back.scripts.utils.config import project_config
+from back.scripts.utils.logger_manager import LoggerManager
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkflowNode:
+    """
+    A workflow of the scheduler graph, identified by the paths it reads and writes.
+
+    `workflow` is either a workflow class or a factory (e.g. `from_config`) which,
+    given the main configuration, returns an object with a `run` method.
+    `extra_output_paths` are the files written by the workflow besides its main output.
+    """
+
+    name: str
+    workflow: Callable[[dict], IWorkflow]
+    output_path: Path
+    input_paths: list[Path] = field(default_factory=list)
+    extra_output_paths: list[Path] = field(default_factory=list)
+
+    @classmethod
+    def from_workflow(cls, workflow: Callable[[dict], IWorkflow], main_config: dict):
+        """
+        Build a node from a workflow class or a workflow factory classmethod.
+        The class owning the workflow must expose `get_input_paths` and `get_output_path`,
+        and may list all the files it writes with `get_output_paths`.
+        """
+        owner = getattr(workflow, "__self__", workflow)
+        output_path = Path(owner.get_output_path(main_config))
+        output_paths = getattr(owner, "get_output_paths", lambda config: [output_path])
+        return cls(
+            name=getattr(workflow, "__qualname__", str(workflow)),
+            workflow=workflow,
+            output_path=output_path,
+            input_paths=[Path(p) for p in owner.get_input_paths(main_config)],
+            extra_output_paths=[
+                Path(p) for p in output_paths(main_config) if Path(p) != output_path
+            ],
+        )
+
+
+def _run_node(workflow: Callable[[dict], IWorkflow], main_config: dict) -> None:
+    workflow(deepcopy(main_config)).run()
+
+
+def _init_worker(main_config: dict) -> None:
+    """
+    Make the project configuration available in a worker process.
+    With the `fork` start method, the configuration is inherited from the parent.
+    """
+    try:
+        project_config.load(main_config)
+    except RuntimeError:
+        return
+    if "logging" in main_config:
+        LoggerManager.configure_logger(main_config)
+
+
+class WorkflowScheduler:
+    """
+    Run a set of workflows according to the dependencies between their input and output paths.
+
+    A node is ready as soon as all the nodes producing its inputs are finished.
+    Inputs that are not produced by any node are considered as external and do not block.
+    Independent nodes are run concurrently in a process pool of `max_workers` processes.
+    With `max_workers <= 1`, the nodes are run sequentially in the current process,
+    following the declaration order whenever the dependencies allow it.
+
+    A failing node is logged and does not stop the others, including its dependents,
+    as each workflow is responsible for checking the presence of its inputs.
+    """
+
+    def __init__(self, nodes: list[WorkflowNode], max_workers: int = 1):
+        self.nodes = {node.name: node for node in nodes}
+        self.max_workers = max_workers
+        self.dependencies = self._build_dependencies()
+        self.errors: dict[str, str] = {}
+
+    def _build_dependencies(self) -> dict[str, set[str]]:
+        producers = {
+            path.resolve(): name
+            for name, node in self.nodes.items()
+            for path in [node.output_path, *node.extra_output_paths]
+        }
+        dependencies = {}
+        for name, node in self.nodes.items():
+            dependencies[name] = {
+                producers[path.resolve()]
+                for path in node.input_paths
+                if path.resolve() in producers and producers[path.resolve()] != name
+            }
+        return dependencies
+
+    def topological_order(self) -> list[str]:
+        """
+        Order of execution of the nodes in sequential mode.
+
+        Raises:
+            RuntimeError: if the dependencies contain a cycle.
+        """
+        done: list[str] = []
+        remaining = list(self.nodes)
+        while remaining:
+            ready = [name for name in remaining if self.dependencies[name].issubset(done)]
+            if not ready:
+                raise RuntimeError(f"Cyclic dependencies between workflows: {remaining}")
+            done.append(ready[0])
+            remaining.remove(ready[0])
+        return done
+
+    def run(self, main_config: dict) -> None:
+        if self.max_workers <= 1:
+            for name in self.topological_order():
+                try:
+                    _run_node(self.nodes[name].workflow, main_config)
+                except Exception as e:
+                    self._log_error(name, e)
+            return
+        self._run_parallel(main_config)
+
+    def _run_parallel(self, main_config: dict) -> None:
+        # Fail early on cycles rather than waiting forever on the pool
+        self.topological_order()
+
+        pending = list(self.nodes)
+        finished: set[str] = set()
+        running: dict[Future, str] = {}
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(main_config,),
+        ) as executor:
+            while pending or running:
+                for name in [n for n in pending if self.dependencies[n].issubset(finished)]:
+                    LOGGER.info(f"Starting workflow {name}")
+                    pending.remove(name)
+                    future = executor.submit(_run_node, self.nodes[name].workflow, main_config)
+                    running[future] = name
+
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    name = running.pop(future)
+                    finished.add(name)
+                    if future.exception() is not None:
+                        self._log_error(name, future.exception())
+                    else:
+                        LOGGER.info(f"Workflow {name} completed")
+
+    def _log_error(self, name: str, error: BaseException) -> None:
+        self.errors[name] = str(error)
+        LOGGER.error(f"An error occurred while running the workflow {name}: {error}")
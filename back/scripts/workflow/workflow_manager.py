@@ -1,5 +1,4 @@
 import logging
-from copy import deepcopy
 from datetime import datetime
 from pathlib import Path
 
@@ -28,6 +27,7 @@ from back.scripts.utils.dataframe_operation import (
     sort_by_format_priorities,
 )
 from back.scripts.utils.datagouv_api import select_implemented_formats
+from back.scripts.workflow.scheduler import WorkflowNode, WorkflowScheduler
 
 
 class WorkflowManager:
@@ -37,7 +37,9 @@ class WorkflowManager:
     This final output may be a composite of multiple input files.
 
     A concept workflow may be dependent on another one.
-    This dependency is only visible within the worflow by using the output file name method from the classes the worflow depends on.
+    This dependency is declared by each workflow through `get_input_paths`, using the output file name method
+    from the classes the worflow depends on.
+    Independent workflows are run concurrently, up to `workflow.max_workers` processes.
     """
 
     def __init__(self, args, config):
@@ -63,17 +65,18 @@ class WorkflowManager:
             CommunitiesContact,
         ]
 
+    def get_scheduler(self) -> WorkflowScheduler:
+        nodes = [
+            WorkflowNode.from_workflow(workflow, self.config)
+            for workflow in self.get_workflows()
+        ]
+        max_workers = self.config["workflow"].get("max_workers", 1)
+        return WorkflowScheduler(nodes, max_workers=max_workers)
+
     def run_workflow(self) -> None:
         self.logger.info("Workflow started.")
 
-        for workflow in self.get_workflows():
-            try:
-                workflow(deepcopy(self.config)).run()
-            except Exception as e:
-                self.logger.error(
-                    f"An error occurred while running the workflow {workflow.__name__}: {e}"
-                )
-                continue
+        self.get_scheduler().run(self.config)
 
         self.process_subvention("subventions", self.config["search"]["subventions"])
 
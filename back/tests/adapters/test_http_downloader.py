@@ -124,3 +124,25 @@ class TestHttpFileDownloader:
 
         # Then: The download fails and None is returned
         assert result_path is None
+
+    @responses.activate
+    def test_refresh_not_modified(self, file_metadata: FileMetadata, base_data_folder: Path):
+        # Given: A file downloaded with an ETag, and a server answering 304 to its revalidation
+        url = file_metadata.url
+        responses.add(responses.GET, url, body=b"v1", headers={"ETag": '"v1"'})
+        responses.add(
+            responses.GET,
+            url,
+            status=304,
+            match=[responses.matchers.header_matcher({"If-None-Match": '"v1"'})],
+        )
+        downloader = HttpFileDownloader(base_data_folder, refresh=True)
+        downloader.download(file_metadata)
+
+        # When: The file is downloaded again with refresh
+        result_path = downloader.download(file_metadata)
+
+        # Then: The local copy is kept after a conditional request
+        assert result_path.read_bytes() == b"v1"
+        assert len(responses.calls) == 2
+        assert responses.calls[1].request.headers["If-None-Match"] == '"v1"'
@@ -1,6 +1,10 @@
 import math
+import random
+from datetime import datetime
 
+import polars as pl
 import pytest
+from polars.testing import assert_frame_equal
 
 from back.scripts.enrichment.bareme_enricher import BaremeEnricher
 
@@ -76,3 +80,85 @@ class TestGetScoreFromTp:
         assert BaremeEnricher.get_score_from_tp(105) == "A"
         # 105.01 -> B (sur-déclaration : effort de transparence réel)
         assert BaremeEnricher.get_score_from_tp(105.01) == "B"
+
+
+class TestBuildBaremeTable:
+    """Tests pour la construction de la table collectivités × années."""
+
+    def test_une_ligne_par_siren_et_annee(self):
+        communities = pl.DataFrame({"siren": ["1", "null", "2"], "nom": ["A", "B", "C"]})
+        annees = list(range(2016, datetime.now().year + 1))
+
+        result = BaremeEnricher.build_bareme_table(communities)
+
+        assert result.columns == ["siren", "annee"]
+        assert result["siren"].to_list() == ["1"] * len(annees) + ["2"] * len(annees)
+        assert result["annee"].to_list() == annees * 2
+
+    def test_lazy_identique(self):
+        communities = pl.DataFrame({"siren": ["1", "2"]})
+
+        result = BaremeEnricher.build_bareme_table(communities.lazy())
+
+        assert isinstance(result, pl.LazyFrame)
+        assert_frame_equal(result.collect(), BaremeEnricher.build_bareme_table(communities))
+
+
+BORNES_SCORES = [0.0, 25.0, 50.0, 95.0, 105.0]
+
+
+def taux_subventions(n: int) -> pl.DataFrame:
+    """
+    Taux de publication synthétiques, en pourcentage, couvrant les bornes des scores,
+    NaN et les valeurs nulles.
+    """
+    rng = random.Random(0)
+    speciaux = [math.nan, None, -1.0] + [
+        borne + delta for borne in BORNES_SCORES for delta in (-1e-9, 0.0, 1e-9)
+    ]
+    valeurs = [
+        speciaux[i % len(speciaux)] if i % 10 == 0 else rng.uniform(-10, 200) for i in range(n)
+    ]
+    return pl.DataFrame({"taux_subventions": valeurs}, schema={"taux_subventions": pl.Float64})
+
+
+def scores_par_ligne(frame: pl.DataFrame) -> pl.Series:
+    """
+    Scoring ligne à ligne avec get_score_from_tp, tel qu'il était fait auparavant.
+    """
+    return frame.select(
+        pl.col("taux_subventions").map_elements(
+            BaremeEnricher.get_score_from_tp, return_dtype=pl.String
+        )
+    ).to_series()
+
+
+def scores_vectorises(frame: pl.DataFrame) -> pl.Series:
+    return frame.select(BaremeEnricher.score_from_tp("taux_subventions")).to_series()
+
+
+class TestScoreFromTp:
+    """Tests pour la version vectorisée du scoring des subventions."""
+
+    @pytest.mark.parametrize(
+        "tp",
+        [math.nan, -100, -0.001, 0, 0.001, 25, 25.01, 50, 50.01, 95, 95.01, 105, 105.01, 1e9],
+    )
+    def test_identique_a_get_score_from_tp(self, tp):
+        frame = pl.DataFrame({"tp": [float(tp)]})
+
+        result = frame.select(BaremeEnricher.score_from_tp("tp")).item()
+
+        assert result == BaremeEnricher.get_score_from_tp(tp)
+
+    def test_identique_au_scoring_par_ligne(self):
+        frame = taux_subventions(10_000)
+
+        assert scores_vectorises(frame).equals(scores_par_ligne(frame))
+
+    def test_taux_nul(self):
+        frame = pl.DataFrame({"tp": [None, 100.0]}, schema={"tp": pl.Float64})
+
+        result = frame.select(BaremeEnricher.score_from_tp("tp")).to_series().to_list()
+
+        assert result == [None, "A"]
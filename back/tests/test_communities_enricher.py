@@ -0,0 +1,154 @@
+import random
+import re
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from back.scripts.enrichment.communities_enricher import CommunitiesEnricher
+
+COMMUNITIES = Path(__file__).parent / "data" / "communities" / "communities.parquet"
+
+
+class TestCalculateAverages:
+    communities = pl.LazyFrame(
+        {
+            "siren": ["c1", "c2", "c3", "d1", "d2", "r1", "m1"],
+            "type": ["COM", "COM", "COM", "DEP", "DEP", "REG", "MET"],
+            "code_insee_region": ["11", "11", "24", "11", "24", "11", "11"],
+            "code_insee_dept": ["75", "77", "18", "75", "18", None, "75"],
+        }
+    )
+    datas = pl.LazyFrame(
+        {
+            "id": ["c1", "c1", "c2", "c3", "d1", "d2", "d2", "r1", "m1", "c3", "inconnu"],
+            "annee": [2024, 2024, 2024, 2024, 2024, 2024, 2024, 2024, 2024, 2023, 2024],
+            "montant": [10.0, 20.0, 60.0, 100.0, 5.0, 1.0, None, 7.0, 1000.0, 1e6, 1e6],
+        }
+    )
+
+    def _averages(self) -> dict[str, list]:
+        return (
+            CommunitiesEnricher.calculate_averages(
+                self.communities,
+                self.datas,
+                id_join_col="id",
+                year_col="annee",
+                year=2024,
+                suffix="sub",
+            )
+            .collect()
+            .to_dict(as_series=False)
+        )
+
+    def test_moyennes_nationales(self):
+        result = self._averages()
+
+        assert result["moyenne_nat_com_sub"] == [47.5] * 3 + [None] * 4
+        assert result["moyenne_nat_dpt_sub"] == [None] * 3 + [3.0] * 2 + [None] * 2
+        assert result["moyenne_nat_reg_sub"] == [None] * 5 + [7.0, None]
+
+    def test_moyennes_regionales_et_departementales(self):
+        result = self._averages()
+
+        assert result["moyenne_reg_com_sub"] == [30.0, 30.0, 100.0] + [None] * 4
+        assert result["moyenne_dpt_com_sub"] == [15.0, 60.0, 100.0] + [None] * 4
+        assert result["moyenne_reg_dpt_sub"] == [None] * 3 + [5.0, 1.0] + [None] * 2
+
+    def test_colonnes_conservees(self):
+        result = self._averages()
+
+        assert list(result)[:4] == ["siren", "type", "code_insee_region", "code_insee_dept"]
+        assert len(result["siren"]) == 7
+
+
+def nettoyer_nom(nom: str, type_: str) -> str:
+    """
+    Previous row-wise implementation of uniformiser_noms, used as reference.
+    """
+    regex_com = re.compile(r"^VILLE\s+DE\s+")
+    regex_dep = re.compile(r"^DEPARTEMENT\s+(DE\s+LA\s+|DE\s+L['’]?\s*|DES\s+|DU\s+|DE\s+)")
+    region_prefixes = [
+        r"CONSEIL\s+REGIONAL\s+DE\s+LA",
+        r"COLLECTIVITE\s+TERRITORIALE\s+DE",
+        r"COLLECTIVITE\s+EUROPEENNE\s+DE",
+        r"COLLECTIVITE\s+DE",
+        r"REGION\s+DES",
+    ]
+    regex_reg = re.compile(f"^({'|'.join(region_prefixes)})")
+
+    if nom is None:
+        return ""
+    nom = nom.upper().strip()
+    prefixes = {
+        "COM": ("COMMUNE ", regex_com),
+        "DEP": ("DEPARTEMENT ", regex_dep),
+        "REG": ("REGION ", regex_reg),
+    }
+    if type_ not in prefixes:
+        return nom
+    prefix, regex = prefixes[type_]
+    nom = regex.sub("", nom).strip()
+    if not nom.startswith(prefix):
+        return f"{prefix}{nom}"
+    return nom
+
+
+def noms_aleatoires(n: int) -> pl.DataFrame:
+    """
+    Noms combinant les préfixes rencontrés, avec des variations de casse et d'espaces.
+    """
+    rng = random.Random(0)
+    prefixes = [
+        "",
+        "Ville de ",
+        "VILLE  DE\t",
+        "commune ",
+        "Commune de ",
+        "Département de la ",
+        "DEPARTEMENT DE L'",
+        "Departement de l’ ",
+        "département des ",
+        "DEPARTEMENT DU ",
+        "Departement de ",
+        "DEPARTEMENT ",
+        "Conseil régional de la ",
+        "CONSEIL REGIONAL DE LA ",
+        "Collectivité territoriale de ",
+        "COLLECTIVITE EUROPEENNE DE ",
+        "collectivite de ",
+        "REGION DES ",
+        "Région ",
+        "region ",
+    ]
+    noms = ["Lyon", "Loire", "Ain", "Île-de-France", "Corse", "Alsace", "Pays de la Loire", ""]
+    types = ["COM", "DEP", "REG", "MET", "GRP", None]
+    return pl.DataFrame(
+        {
+            "nom": [
+                None
+                if rng.random() < 0.05
+                else rng.choice([" ", ""]) + rng.choice(prefixes) + rng.choice(noms)
+                for _ in range(n)
+            ],
+            "type": [rng.choice(types) for _ in range(n)],
+        },
+        schema={"nom": pl.String, "type": pl.String},
+    )
+
+
+@pytest.mark.parametrize(
+    "communities",
+    [
+        pl.read_parquet(COMMUNITIES).select("nom", "type"),
+        noms_aleatoires(5_000),
+    ],
+    ids=["communities", "aleatoires"],
+)
+def test_uniformiser_noms_identique_a_python(communities):
+    expected = [nettoyer_nom(nom, type_) for nom, type_ in communities.iter_rows()]
+
+    result = CommunitiesEnricher.uniformiser_noms(communities)
+
+    assert result["nom"].to_list() == expected
+    assert result.lazy().collect_schema() == communities.collect_schema()
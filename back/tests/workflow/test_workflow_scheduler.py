@@ -0,0 +1,106 @@
+from pathlib import Path
+
+import pytest
+
+from back.scripts.utils.config_manager import ConfigManager
+from back.scripts.workflow.scheduler import WorkflowNode, WorkflowScheduler
+from back.scripts.workflow.workflow_manager import WorkflowManager
+
+CONFIG_TEST_FILEPATH = "back/config-test.yaml"
+
+
+class NamedWorkflow:
+    """Picklable workflow factory bound to a node name."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __call__(self, main_config: dict) -> "NamedWorkflow":
+        self.main_config = main_config
+        return self
+
+    def run(self) -> None:
+        Path(self.main_config["paths"][self.name]).write_text(self.name)
+
+
+class FailingWorkflow:
+    def __init__(self, main_config: dict):
+        pass
+
+    def run(self) -> None:
+        raise RuntimeError("boom")
+
+
+class TestWorkflowScheduler:
+    @pytest.fixture
+    def paths(self, tmp_path: Path) -> dict[str, Path]:
+        return {name: tmp_path / f"{name}.txt" for name in ["a", "b", "c", "d"]}
+
+    def _nodes(self, paths: dict[str, Path]) -> list[WorkflowNode]:
+        inputs = {"a": [], "b": [], "c": [paths["a"], paths["b"]], "d": [paths["c"]]}
+        return [
+            WorkflowNode(
+                name=name,
+                workflow=NamedWorkflow(name),
+                output_path=paths[name],
+                input_paths=inputs[name],
+            )
+            for name in ["d", "c", "b", "a"]
+        ]
+
+    def test_topological_order(self, paths):
+        scheduler = WorkflowScheduler(self._nodes(paths))
+        assert scheduler.topological_order() == ["b", "a", "c", "d"]
+
+    def test_dependencies_ignore_external_inputs(self, paths, tmp_path):
+        nodes = self._nodes(paths)
+        nodes[-1].input_paths = [tmp_path / "external.parquet"]
+        scheduler = WorkflowScheduler(nodes)
+        assert scheduler.dependencies["a"] == set()
+        assert scheduler.dependencies["c"] == {"a", "b"}
+
+    def test_dependencies_on_extra_outputs(self, paths, tmp_path):
+        nodes = self._nodes(paths)
+        nodes[-1].extra_output_paths = [tmp_path / "a_subset.txt"]
+        nodes[0].input_paths = [tmp_path / "a_subset.txt"]
+        scheduler = WorkflowScheduler(nodes)
+        assert scheduler.dependencies["d"] == {"a"}
+
+    def test_cycle_raises(self, paths):
+        nodes = self._nodes(paths)
+        nodes[-1].input_paths = [paths["d"]]
+        with pytest.raises(RuntimeError):
+            WorkflowScheduler(nodes).topological_order()
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_run(self, paths, max_workers):
+        scheduler = WorkflowScheduler(self._nodes(paths), max_workers=max_workers)
+        scheduler.run({"paths": {k: str(v) for k, v in paths.items()}})
+        assert scheduler.errors == {}
+        assert all(path.read_text() for path in paths.values())
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_failure_does_not_stop_other_nodes(self, paths, max_workers):
+        nodes = self._nodes(paths)
+        nodes[2].workflow = FailingWorkflow
+        scheduler = WorkflowScheduler(nodes, max_workers=max_workers)
+        scheduler.run({"paths": {k: str(v) for k, v in paths.items()}})
+        assert list(scheduler.errors) == ["b"]
+        assert paths["a"].exists()
+        assert not paths["b"].exists()
+
+
+def test_workflow_manager_dependencies():
+    config = ConfigManager.load_config(CONFIG_TEST_FILEPATH)
+    scheduler = WorkflowManager(None, config).get_scheduler()
+    dependencies = scheduler.dependencies
+
+    assert dependencies["CPVLabelsWorkflow"] == set()
+    assert dependencies["SireneWorkflow"] == set()
+    assert dependencies["CommunitiesSelector"] == {
+        "OfglWorkflowFactory.from_config",
+        "SireneWorkflow",
+    }
+    assert dependencies["DataGouvCatalog"] == {"CommunitiesSelector"}
+    assert dependencies["MarchesPublicsWorkflow.from_config"] == {"DataGouvCatalog"}
+    assert dependencies["CommunitiesContact"] == {"DataGouvCatalog"}
@@ -0,0 +1,51 @@
+"""Benchmark the subventions scoring of the bareme against the former implementation.
+
+Usage:
+    poetry run python -m benchmarks.benchmark_bareme_score [n_rows]
+
+The former implementation called `get_score_from_tp` on each rate with `map_elements`.
+Both implementations are timed on the same synthetic rates; their equivalence is checked
+by the tests of the bareme.
+"""
+
+import sys
+import time
+
+import polars as pl
+
+from back.tests.test_bareme_enricher import (
+    scores_par_ligne,
+    scores_vectorises,
+    taux_subventions,
+)
+
+# About 35k collectivités × 10 years
+DEFAULT_ROWS = 350_000
+
+
+def timed(func, frame: pl.DataFrame, repeat: int = 3) -> float:
+    """
+    Best duration of `func` over `repeat` runs.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(frame)
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def benchmark(n: int = DEFAULT_ROWS) -> None:
+    frame = taux_subventions(n)
+    print(f"Scoring {n} rates\n")
+    print(f"{'Implementation':<20} {'Seconds':>10}")
+    print("-" * 31)
+    legacy = timed(scores_par_ligne, frame)
+    print(f"{'map_elements':<20} {legacy:>10.4f}")
+    current = timed(scores_vectorises, frame)
+    print(f"{'score_from_tp':<20} {current:>10.4f}")
+    print(f"\nSpeed-up: x{legacy / current:.0f}")
+
+
+if __name__ == "__main__":
+    benchmark(*map(int, sys.argv[1:]))
@@ -0,0 +1,106 @@
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from back.scripts.datasets.dataset_aggregator import DatasetAggregator
+from back.scripts.utils.norm_manifest import NormManifest
+
+
+class DummyAggregator(DatasetAggregator):
+    @classmethod
+    def get_config_key(cls):
+        return "dummy_aggregator"
+
+    def _normalize_frame(self, df: pd.DataFrame, file_metadata):
+        return df.assign(url=file_metadata.url)
+
+
+class TestDatasetAggregator:
+    def setup_method(self):
+        self.path = tempfile.TemporaryDirectory()
+        self.config = {
+            "dummy_aggregator": {
+                "data_folder": self.path.name,
+                "combined_filename": str(Path(self.path.name) / "final.parquet"),
+                "download_workers": 4,
+                "download_workers_per_host": 2,
+            }
+        }
+
+    def teardown_method(self):
+        self.path.cleanup()
+
+    def _write_sources(self, n: int) -> list[str]:
+        urls = []
+        for i in range(n):
+            source = Path(self.path.name) / f"source_{i}.csv"
+            pd.DataFrame({"value": [str(i)]}).to_csv(source, index=False)
+            urls.append("file:" + str(source))
+        return urls
+
+    def test_concurrent_downloads(self):
+        # Given
+        urls = self._write_sources(5)
+        files = pd.DataFrame({"url": urls, "format": "csv", "title": "t"})
+
+        # When
+        DummyAggregator(files, self.config).run()
+
+        # Then
+        out = pd.read_parquet(self.config["dummy_aggregator"]["combined_filename"])
+        assert sorted(out["value"]) == ["0", "1", "2", "3", "4"]
+        assert sorted(out["url"]) == sorted(urls)
+
+    def test_download_errors_are_recorded(self):
+        # Given
+        missing = ["file:" + str(Path(self.path.name) / f"missing_{i}.csv") for i in range(4)]
+        urls = missing[:2] + self._write_sources(2) + missing[2:]
+        files = pd.DataFrame({"url": urls, "format": "csv", "title": "t"})
+        aggregator = DummyAggregator(files, self.config)
+
+        # When
+        aggregator.run()
+
+        # Then
+        out = pd.read_parquet(self.config["dummy_aggregator"]["combined_filename"])
+        assert sorted(out["value"]) == ["0", "1"]
+        # Errors are recorded in the order of the input files
+        assert [url for urls in aggregator.errors.values() for url in urls] == missing
+
+    def test_manifest(self):
+        # Given
+        missing = "file:" + str(Path(self.path.name) / "missing.csv")
+        urls = self._write_sources(2) + [missing]
+        files = pd.DataFrame({"url": urls, "format": "csv", "title": "t"})
+        aggregator = DummyAggregator(files, self.config)
+
+        # When
+        aggregator.run()
+
+        # Then
+        manifest = NormManifest(Path(self.path.name))
+        hashes = aggregator.files_in_scope["url_hash"].tolist()
+        assert manifest.normalized_hashes() == set(hashes[:2])
+        assert list(manifest.failures()) == [hashes[2]]
+        assert "missing.csv" in manifest.failures()[hashes[2]]
+
+    def test_deleted_norm_file_is_normalized_again(self):
+        # Given
+        urls = self._write_sources(2)
+        files = pd.DataFrame({"url": urls, "format": "csv", "title": "t"})
+        output = Path(self.config["dummy_aggregator"]["combined_filename"])
+        aggregator = DummyAggregator(files, self.config)
+        aggregator.run()
+        output.unlink()
+        deleted = aggregator._dataset_filename(
+            next(aggregator.files_in_scope.itertuples()), "norm"
+        )
+        deleted.unlink()
+
+        # When
+        DummyAggregator(files, self.config).run()
+
+        # Then
+        assert deleted.exists()
+        assert sorted(pd.read_parquet(output)["value"]) == ["0", "1"]
@@ -1,10 +1,21 @@
+import copy
+import decimal
+import json
 import os
+import shutil
 from pathlib import Path
 
 import pandas as pd
 import pandas.testing as pdtesting
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
 
-from back.scripts.datasets.marches import MarchesPublicsWorkflow
+from back.scripts.datasets.marches import (
+    DeclarationsWriter,
+    MarchesPublicsWorkflow,
+    dumps_json,
+)
 from back.scripts.utils.config_manager import ConfigManager
 
 FIXTURES_DIRECTORY = Path(__file__).parent / "fixtures"
@@ -12,6 +23,110 @@ CONFIG_TEST_FILEPATH = "back/config-test.yaml"
 
 config = ConfigManager.load_config(CONFIG_TEST_FILEPATH)
 
+DECLARATION_V1 = {
+    "id": "2019-0042",
+    "uid": "21910059500027201900042",
+    "acheteur": {"id": "21910059500027"},
+    "nature": "Marché",
+    "objet": "Entretien des terrains sportifs",
+    "codeCPV": "77320000",
+    "procedure": "Appel d'offres ouvert",
+    "lieuExecution": {"code": "91", "typeCode": "Code département", "nom": "Essonne"},
+    "dureeMois": 48,
+    "dateNotification": "2019-09-02",
+    "datePublicationDonnees": "2019-12-10",
+    "montant": 60000.0,
+    "formePrix": "Ferme et actualisable",
+    "titulaires": [
+        {"typeIdentifiant": "SIRET", "id": "34990907700027", "denominationSociale": "A"},
+        {"typeIdentifiant": "SIRET", "id": "12345678900011", "denominationSociale": "B"},
+    ],
+    "modifications": [
+        {
+            "modification": {
+                "id": 1,
+                "montant": 65000.0,
+                "dateNotificationModification": "2020-01-01",
+                "titulaires": [{"titulaire": {"typeIdentifiant": "SIRET", "id": "1"}}],
+            }
+        }
+    ],
+    "considerationsSociales": ["Pas de considération sociale"],
+    "considerationsEnvironnementales": ["Pas de considération environnementale"],
+}
+
+DECLARATION_V2 = DECLARATION_V1 | {
+    "acheteur": {"id": "21910059500027"},
+    "lieuExecution": {"code": "91000", "typeCode": "Code postal"},
+    "titulaires": [{"titulaire": {"typeIdentifiant": "SIRET", "id": "34990907700027"}}],
+    "ccag": "Travaux",
+    "marcheInnovant": False,
+    "sousTraitanceDeclaree": True,
+    "techniques": {"technique": ["Accord-cadre"]},
+    "modalitesExecution": {"modaliteExecution": ["Tranches"]},
+}
+
+
+def legacy_clean_row(declaration: dict) -> dict:
+    """
+    `clean_row` as it was before the copy-free rewrite, kept as a reference.
+    """
+    local_decla = copy.deepcopy(declaration)
+
+    schema_version = MarchesPublicsWorkflow.detect_schema_version(local_decla)
+
+    if schema_version == "v2":
+        lieu = local_decla.get("lieuExecution")
+        if lieu and isinstance(lieu, dict):
+            if "nom" not in lieu or lieu.get("nom") is None:
+                code = lieu.get("code", "")
+                type_code = lieu.get("typeCode", "")
+                if code:
+                    lieu["nom"] = f"{type_code} {code}".strip()
+
+    cleaned_row = {}
+    for k, v in local_decla.items():
+        if k == "acheteur":
+            try:
+                raw_id = str(v["id"])
+                cleaned_row["acheteur.id"] = (
+                    MarchesPublicsWorkflow._normalize_acheteur_id(raw_id)
+                    if schema_version == "v2"
+                    else raw_id
+                )
+            except TypeError:
+                cleaned_row["acheteur.id"] = ""
+        elif k == "montant":
+            cleaned_row["montant"] = v
+        elif k == "titulaires":
+            titulaires = v or [{"id": None}]
+            if isinstance(titulaires, dict):
+                titulaires = [titulaires]
+            titulaires = [t for t in titulaires if t]
+            if titulaires and "titulaire" in titulaires[0].keys():
+                titulaires = [titu["titulaire"] for titu in titulaires]
+            titulaires = [
+                {
+                    **titu,
+                    "id": str(titu["id"])
+                    if isinstance(titu.get("id"), int)
+                    else titu.get("id"),
+                }
+                for titu in titulaires
+            ]
+            titulaires = sorted(titulaires, key=lambda x: x["id"] or "")
+            cleaned_row["titulaires"] = titulaires
+            cleaned_row["countTitulaires"] = len(titulaires)
+        else:
+            if isinstance(v, (list, dict)):
+                v = json.dumps(v)
+            elif isinstance(v, decimal.Decimal):
+                v = float(v)
+            cleaned_row[k] = v
+
+    cleaned_row["_schema_version"] = schema_version
+    return cleaned_row
+
 
 def test_direct_json_structure():
     assert (
@@ -35,30 +150,159 @@ def test_marches_public_dataframes():
         file_metadata=None, raw_filename=FIXTURES_DIRECTORY / "marche_direct.json"
     )
 
-    assert direct_df.shape == (2, 6)
+    assert direct_df.shape[0] == 2
     assert "acheteur_id" in direct_df.columns
     assert "a_02" in direct_df["acheteur_id"].tolist()
     assert "titulaires" in direct_df.columns
-    assert "[{'typeIdentifiant': 'SIRET', 'id': 'id_1'}]" in direct_df["titulaires"].to_list()
-    pdtesting.assert_series_equal(direct_df["montant"], pd.Series([500, 40], name="montant"))
+    assert [{"typeIdentifiant": "SIRET", "id": "id_1"}] in [
+        json.loads(titulaires) for titulaires in direct_df["titulaires"]
+    ]
+    pdtesting.assert_series_equal(
+        direct_df["montant"], pd.Series([500.0, 40.0], name="montant")
+    )
     pdtesting.assert_series_equal(
         direct_df["countTitulaires"], pd.Series([1, 2], name="countTitulaires")
     )
-    # Remove the interim.json file created by mp workflow
-    os.remove(FIXTURES_DIRECTORY / "interim.json")
+    # Remove the norm.parquet file created by mp workflow
+    os.remove(FIXTURES_DIRECTORY / "norm.parquet")
 
     # Nested marche test
     nested_df = mp._read_parse_file(
         file_metadata=None, raw_filename=FIXTURES_DIRECTORY / "marche_nested.json"
     )
-    assert nested_df.shape == (2, 6)
+    assert nested_df.shape[0] == 2
     assert "acheteur_id" in nested_df.columns
     assert "a_02" in nested_df["acheteur_id"].tolist()
     assert "titulaires" in nested_df.columns
-    assert "[{'typeIdentifiant': 'SIRET', 'id': 'id_1'}]" in nested_df["titulaires"].to_list()
-    pdtesting.assert_series_equal(nested_df["montant"], pd.Series([200, 20], name="montant"))
+    assert [{"typeIdentifiant": "SIRET", "id": "id_1"}] in [
+        json.loads(titulaires) for titulaires in nested_df["titulaires"]
+    ]
+    pdtesting.assert_series_equal(
+        nested_df["montant"], pd.Series([200.0, 20.0], name="montant")
+    )
     pdtesting.assert_series_equal(
         nested_df["countTitulaires"], pd.Series([1, 2], name="countTitulaires")
     )
-    # Remove the interim.json file created by mp workflow
-    os.remove(FIXTURES_DIRECTORY / "interim.json")
+    # Remove the norm.parquet file created by mp workflow
+    os.remove(FIXTURES_DIRECTORY / "norm.parquet")
+
+
+@pytest.fixture
+def offline_workflow(tmp_path):
+    """
+    Workflow using a cached official schema, so that no download is needed.
+    """
+    local_config = copy.deepcopy(config)
+    local_config["marches_publics"]["data_folder"] = str(tmp_path)
+    local_config["marches_publics"]["combined_filename"] = str(tmp_path / "out.parquet")
+    local_config["marches_publics"]["declarations_per_row_group"] = 1
+    pd.DataFrame(
+        {
+            "property": ["id", "acheteur.id", "montant", "titulaires.id", "dureeMois"],
+            "type": ["string", "string", "number", "string", "integer"],
+        }
+    ).to_parquet(tmp_path / "official_schema.parquet")
+    return MarchesPublicsWorkflow.from_config(local_config)
+
+
+@pytest.mark.parametrize(
+    "fixture_name, montants",
+    [("marche_direct.json", [500, 40]), ("marche_nested.json", [200, 20])],
+)
+def test_streamed_normalization(offline_workflow, tmp_path, fixture_name, montants):
+    raw_filename = tmp_path / "raw.json"
+    shutil.copy(FIXTURES_DIRECTORY / fixture_name, raw_filename)
+
+    df = offline_workflow._read_parse_file(file_metadata=None, raw_filename=raw_filename)
+
+    assert df["montant"].tolist() == montants
+    assert df["countTitulaires"].tolist() == [1, 2]
+    assert [{"typeIdentifiant": "SIRET", "id": "id_1"}] in [
+        json.loads(titulaires) for titulaires in df["titulaires"]
+    ]
+    assert not (tmp_path / "norm.parquet.part").exists()
+    # One row group per declaration, with the types of the official schema
+    metadata = pq.read_metadata(tmp_path / "norm.parquet")
+    assert metadata.num_row_groups == 2
+    assert metadata.schema.to_arrow_schema() == pa.schema(
+        [
+            ("id", pa.string()),
+            ("montant", pa.float64()),
+            ("titulaires", pa.string()),
+            ("dureeMois", pa.int64()),
+            ("uid", pa.string()),
+            ("uuid", pa.string()),
+            ("source", pa.string()),
+            ("acheteur_id", pa.string()),
+            ("countTitulaires", pa.int64()),
+            ("_schema_version", pa.string()),
+        ]
+    )
+
+
+def test_cast_to_schema_types():
+    cast = DeclarationsWriter._cast
+    assert cast("12,5", pa.float64()) == 12.5
+    assert cast("n/a", pa.float64()) is None
+    assert cast(3.0, pa.int64()) == 3
+    assert cast(3.5, pa.int64()) is None
+    assert cast("oui", pa.bool_()) is True
+    assert json.loads(cast([{"id": 1}], pa.string())) == [{"id": 1}]
+
+
+@pytest.mark.parametrize("normalize_workers", [1, 2])
+def test_run_shared_schema(offline_workflow, tmp_path, normalize_workers):
+    files = pd.DataFrame(
+        {
+            "url": [
+                "file:" + str(FIXTURES_DIRECTORY / name)
+                for name in ["marche_direct.json", "marche_nested.json"]
+            ],
+            "format": "json",
+            "title": ["direct", "nested"],
+        }
+    )
+    local_config = copy.deepcopy(offline_workflow.main_config)
+    local_config["marches_publics"]["normalize_workers"] = normalize_workers
+    workflow = MarchesPublicsWorkflow(files, local_config)
+
+    workflow.run()
+
+    assert len(workflow.manifest.schema_fingerprints()) == 1
+    out = pd.read_parquet(tmp_path / "out.parquet")
+    assert sorted(out["montant"]) == [20, 40, 200, 500]
+
+
+def _decoded(row: dict) -> dict:
+    """
+    Nested fields decoded, as their serialization depends on the JSON encoder.
+    """
+    return {
+        k: json.loads(v) if isinstance(v, str) and v[:1] in ("[", "{") else v
+        for k, v in row.items()
+    }
+
+
+@pytest.mark.parametrize(
+    "declaration",
+    [DECLARATION_V1, DECLARATION_V2, {"titulaires": None, "acheteur": None, "montant": 1}],
+    ids=["v1", "v2", "empty"],
+)
+def test_clean_row_same_as_legacy(declaration):
+    original = copy.deepcopy(declaration)
+
+    cleaned = MarchesPublicsWorkflow.clean_row(declaration)
+
+    assert _decoded(cleaned) == _decoded(legacy_clean_row(declaration))
+    assert list(cleaned) == list(legacy_clean_row(declaration))
+    # The declaration is not modified
+    assert declaration == original
+
+
+def test_dumps_json():
+    value = [{"id": "1", "denominationSociale": "Société", "montant": 1.5, "liste": [1, None]}]
+
+    assert (
+        dumps_json(value)
+        == '[{"id":"1","denominationSociale":"Société","montant":1.5,"liste":[1,null]}]'
+    )
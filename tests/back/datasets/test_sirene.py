@@ -0,0 +1,275 @@
+from datetime import timedelta
+from pathlib import Path
+
+import polars as pl
+import pyarrow.parquet as pq
+import pytest
+from polars import col
+from polars.testing import assert_frame_equal
+
+from back.scripts.datasets import sirene
+from back.scripts.datasets.sirene import SireneWorkflow
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture
+def workflow(tmp_path, monkeypatch):
+    monkeypatch.setattr(sirene, "SUBSET_ROW_GROUP_SIZE", 2)
+    config = {
+        "sirene": {
+            "data_folder": str(tmp_path),
+            "combined_filename": str(tmp_path / "sirene.parquet"),
+        }
+    }
+    pl.DataFrame(
+        {
+            "siren": ["300000000", "100000000", "500000000", "200000000", "400000000"],
+            "raison_sociale": ["C", "COMMUNE A", "E", "DEPARTEMENT B", "COMMUNE D"],
+            "naf8": ["6201Z", "8411Z", "4711D", "8411Z", "8413Z"],
+            "is_active": [True, True, False, True, False],
+        }
+    ).write_parquet(tmp_path / "sirene.parquet")
+    return SireneWorkflow(config)
+
+
+def test_subsets_written_when_missing(workflow):
+    workflow.run()
+
+    names = pl.read_parquet(SireneWorkflow.get_names_path(workflow.main_config))
+    assert names.columns == ["siren", "raison_sociale"]
+    assert names["siren"].to_list() == [f"{i}00000000" for i in range(1, 6)]
+    assert names["raison_sociale"].to_list() == [
+        "COMMUNE A",
+        "DEPARTEMENT B",
+        "C",
+        "COMMUNE D",
+        "E",
+    ]
+
+    public = pl.read_parquet(SireneWorkflow.get_public_sector_path(workflow.main_config))
+    assert public.columns == ["siren", "raison_sociale", "naf8", "is_active"]
+    assert public["siren"].to_list() == ["100000000", "200000000", "400000000"]
+
+
+def test_subsets_have_siren_statistics(workflow):
+    workflow._write_subsets()
+
+    metadata = pq.read_metadata(SireneWorkflow.get_names_path(workflow.main_config))
+    bounds = [
+        (stats.min, stats.max)
+        for stats in (
+            metadata.row_group(i).column(0).statistics for i in range(metadata.num_row_groups)
+        )
+    ]
+    assert bounds == [
+        ("100000000", "200000000"),
+        ("300000000", "400000000"),
+        ("500000000",) * 2,
+    ]
+
+
+NAF_LABELS = {
+    1: {"Code": ["Z", "D"], "Libellé": ["Lettre Z", "Lettre D"]},
+    2: {"Code": ["84", "47"], "Libellé": ["Division 84", "Division 47"]},
+    3: {"Code": ["84.1", "47.1"], "Libellé": ["Groupe 84.1", "Groupe 47.1"]},
+    4: {"Code": ["84.11"], "Libellé": ["Classe 84.11"]},
+    5: {"Code": ["84.11Z", "32.12Z"], "Libellé": ["Sous-classe 84.11Z", "Sous-classe 32.12Z"]},
+}
+JURIDICAL_LABELS = {
+    "Niveau I": {"Code": [1, 7], "Libellé": ["Entrepreneur individuel", "Personne morale"]},
+    "Niveau II": {"Code": [10, 72], "Libellé": ["Entrepreneur", "Collectivité territoriale"]},
+    "Niveau III": {"Code": [1000, 7210], "Libellé": ["Entrepreneur", "Commune"]},
+}
+
+
+def read_labels(path, sheet_name=None, read_options=None):
+    if sheet_name is not None:
+        return pl.DataFrame(JURIDICAL_LABELS[sheet_name])
+    level = int(path.stem.removeprefix("naf2008_liste_n"))
+    return pl.DataFrame(NAF_LABELS[level])
+
+
+def test_format_to_parquet(workflow, monkeypatch):
+    monkeypatch.setattr(sirene.pl, "read_excel", read_labels)
+    raw = pl.read_parquet(FIXTURES / "sirene_raw.parquet")
+    raw = raw.with_columns(
+        activitePrincipaleUniteLegale=pl.when(pl.int_range(pl.len()) < 3)
+        .then(pl.lit("84.11Z"))
+        .otherwise(col("activitePrincipaleUniteLegale")),
+        categorieJuridiqueUniteLegale=pl.when(pl.int_range(pl.len()) == 0)
+        .then(pl.lit(7210))
+        .when(pl.int_range(pl.len()) == 1)
+        .then(None)
+        .otherwise(col("categorieJuridiqueUniteLegale")),
+        nomenclatureActivitePrincipaleUniteLegale=pl.when(pl.int_range(pl.len()) == 2)
+        .then(None)
+        .otherwise(col("nomenclatureActivitePrincipaleUniteLegale")),
+    )
+    raw.write_parquet(workflow.input_filename)
+
+    workflow._format_to_parquet()
+
+    actual = pl.read_parquet(workflow.output_filename)
+    assert actual.height == raw.height
+    assert actual["siren"].to_list() == raw["siren"].to_list()
+    assert actual.select(pl.selectors.contains("Libellé", "categorie")).row(0) == (
+        "Lettre Z",
+        "Division 84",
+        "Groupe 84.1",
+        "Classe 84.11",
+        "Sous-classe 84.11Z",
+        "Personne morale",
+        "Collectivité territoriale",
+        "Commune",
+    )
+
+    # Same as joining each level to the whole dataset
+    expected = (
+        pl.scan_parquet(workflow.input_filename)
+        .select(
+            col("siren"),
+            col("activitePrincipaleUniteLegale")
+            .str.replace_all(".", "", literal=True)
+            .alias("naf8"),
+            col("categorieJuridiqueUniteLegale").alias("code_ju"),
+            col("nomenclatureActivitePrincipaleUniteLegale").alias("nomenclature_naf"),
+        )
+        .collect()
+    )
+    for level in range(1, 6):
+        expected = workflow.join_naf_level(expected, level)
+    categories_ju_data = [pl.DataFrame(labels) for labels in JURIDICAL_LABELS.values()]
+    for level in range(1, 4):
+        expected = workflow.join_juridical_level(expected, level, categories_ju_data)
+    assert_frame_equal(actual.select(expected.columns), expected)
+
+
+@pytest.fixture
+def formatted(workflow, monkeypatch):
+    monkeypatch.setattr(sirene.pl, "read_excel", read_labels)
+    raw = pl.read_parquet(FIXTURES / "sirene_raw.parquet")
+    raw.write_parquet(workflow.input_filename)
+    workflow._format_to_parquet()
+    return raw
+
+
+def _update(raw: pl.DataFrame, siren: str, **changes) -> pl.DataFrame:
+    unit = raw.filter(col("siren") == siren) if siren in raw["siren"] else raw.head(1)
+    return unit.with_columns(
+        siren=pl.lit(siren), **{k: pl.lit(v, dtype=raw.schema[k]) for k, v in changes.items()}
+    )
+
+
+def test_apply_updates(workflow, formatted):
+    stock_date = formatted["dateDernierTraitementUniteLegale"].max()
+    later = stock_date + timedelta(days=1)
+    pl.concat(
+        [
+            _update(
+                formatted,
+                "000325175",
+                denominationUniteLegale="COMMUNE",
+                nomUsageUniteLegale=None,
+                nomUniteLegale=None,
+                activitePrincipaleUniteLegale="84.11Z",
+                nomenclatureActivitePrincipaleUniteLegale="NAFRev2",
+                categorieJuridiqueUniteLegale=7210,
+                dateDernierTraitementUniteLegale=later,
+            ),
+            _update(
+                formatted,
+                "001807254",
+                etatAdministratifUniteLegale="A",
+                dateDernierTraitementUniteLegale=stock_date,
+            ),
+            _update(formatted, "999999999", dateDernierTraitementUniteLegale=later),
+        ]
+    ).write_parquet(workflow.updates_folder / "day_1.parquet", mkdir=True)
+    _update(
+        formatted,
+        "999999999",
+        denominationUniteLegale="NOUVELLE",
+        nomUsageUniteLegale=None,
+        nomUniteLegale=None,
+        dateDernierTraitementUniteLegale=later + timedelta(days=1),
+    ).write_parquet(workflow.updates_folder / "day_2.parquet")
+    workflow.config["update_urls"] = [
+        "https://example.com/day_2.parquet",
+        "https://example.com/day_1.parquet",
+    ]
+    before = pl.read_parquet(workflow.output_filename)
+
+    assert workflow._apply_updates()
+
+    actual = pl.read_parquet(workflow.output_filename)
+    assert actual.columns == before.columns
+    assert actual.height == before.height + 1
+    assert actual.filter(~col("siren").is_in(["000325175", "999999999"])).equals(
+        before.filter(col("siren") != "000325175")
+    )
+    updated = actual.filter(col("siren") == "000325175").row(0, named=True)
+    assert updated["raison_sociale"] == "COMMUNE"
+    assert updated["naf8"] == "8411Z"
+    assert updated["Libellé_naf_n5"] == "Sous-classe 84.11Z"
+    assert updated["categorie_juridique_n3_name"] == "Commune"
+    # The unit processed before the stock file is ignored, the latest version is kept
+    assert actual.filter(col("siren") == "001807254")["is_active"].to_list() == [False]
+    assert actual.filter(col("siren") == "999999999")["raison_sociale"].to_list() == [
+        "NOUVELLE"
+    ]
+
+    assert workflow._apply_updates()
+    assert pl.read_parquet(workflow.output_filename).equals(actual)
+
+
+def test_run_downloads_and_applies_updates(workflow, formatted):
+    update = workflow.data_folder / "update.parquet"
+    _update(
+        formatted,
+        "999999999",
+        dateDernierTraitementUniteLegale=formatted["dateDernierTraitementUniteLegale"].max()
+        + timedelta(days=1),
+    ).write_parquet(update)
+    workflow.config["update_urls"] = [update.as_uri()]
+
+    workflow.run()
+
+    names = pl.read_parquet(SireneWorkflow.get_names_path(workflow.main_config))
+    assert names["siren"].to_list()[-1] == "999999999"
+    assert (workflow.updates_folder / "update.parquet").exists()
+
+
+def test_no_updates(workflow, formatted):
+    before = pl.read_parquet(workflow.output_filename)
+
+    assert not workflow._apply_updates()
+
+    assert pl.read_parquet(workflow.output_filename).equals(before)
+
+
+def test_refreshed_source_rebuilds(tmp_path, monkeypatch):
+    monkeypatch.setattr(sirene.pl, "read_excel", read_labels)
+    monkeypatch.setattr(sirene, "RATE_LIMIT_DELAY", 0)
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "cj_septembre_2022.xls").write_text("labels")
+    raw = pl.read_parquet(FIXTURES / "sirene_raw.parquet")
+    raw.write_parquet(source / "StockUniteLegale.parquet")
+    config = {
+        "sirene": {
+            "data_folder": str(tmp_path / "sirene"),
+            "combined_filename": str(tmp_path / "sirene" / "sirene.parquet"),
+            "url": (source / "StockUniteLegale.parquet").as_uri(),
+            "xls_urls_cat_ju": (source / "cj_septembre_2022.xls").as_uri(),
+            "refresh_downloads": True,
+        }
+    }
+    SireneWorkflow(config).run()
+    assert pl.read_parquet(SireneWorkflow.get_output_path(config)).height == raw.height
+
+    raw.head(3).write_parquet(source / "StockUniteLegale.parquet")
+    SireneWorkflow(config).run()
+
+    assert pl.read_parquet(SireneWorkflow.get_output_path(config)).height == 3
+    assert pl.read_parquet(SireneWorkflow.get_names_path(config)).height == 3
@@ -1,3 +1,4 @@
+import json
 import os
 import tempfile
 from pathlib import Path
@@ -147,6 +148,91 @@ class TestTopicAggregator:
         pd.testing.assert_frame_equal(out, expected)
 
 
+class TestParallelNormalization:
+    SCHEMA = ["idAttribuant", "idBeneficiaire", "montant", "dateConvention", "nomBeneficiaire"]
+
+    def setup_method(self):
+        self.path = tempfile.TemporaryDirectory()
+        sources = Path(self.path.name) / "sources"
+        sources.mkdir()
+        frames = [
+            pd.DataFrame(
+                {
+                    "idAttribuant": "20004697700019",
+                    "idBeneficiaire": ["47785695900010", "47787695900010"],
+                    "montant": [4500, 120],
+                    "dateConvention": "2023-11-09",
+                    "commentaire": "a",
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "idAttribuant": "20004697700019",
+                    "idBeneficiaire": ["47785695900010", None],
+                    "montant": [10, 20],
+                    "dateConvention": "2022-01-01",
+                    "zone": "b",
+                    "commentaire": "c",
+                }
+            ),
+            pd.DataFrame({"nomBeneficiaire": ["A"], "montant": [1]}),
+        ]
+        urls = []
+        for i, frame in enumerate(frames):
+            frame.to_csv(sources / f"raw_{i}.csv", index=False)
+            urls.append("file:" + str(sources / f"raw_{i}.csv"))
+        # Failing download, among the valid files
+        urls.insert(1, "file:" + str(sources / "missing.csv"))
+        self.files_in_scope = pd.DataFrame(
+            {"url": urls, "format": "csv", "siren": "123456789", "type": "COM", "title": "t"}
+        )
+
+    def teardown_method(self):
+        self.path.cleanup()
+
+    def _run(self, name: str, download_workers: int, normalize_workers: int) -> Path:
+        folder = Path(self.path.name) / name
+        folder.mkdir()
+        pd.DataFrame({"name": self.SCHEMA}).assign(
+            lower_name=lambda df: df["name"].str.lower()
+        ).to_parquet(folder / "official_schema_subventions.parquet")
+        config = {
+            "data_folder": str(folder),
+            "combined_filename": str(folder / "final.parquet"),
+            "download_workers": download_workers,
+            "normalize_workers": normalize_workers,
+        }
+        TopicAggregator(
+            files_in_scope=self.files_in_scope,
+            topic="subventions",
+            datafile_loader_config=config,
+        ).run()
+        return folder
+
+    @pytest.mark.parametrize(
+        "download_workers, normalize_workers", [(3, 1), (1, 2), (3, 2)], ids=str
+    )
+    def test_same_outputs_as_sequential(self, download_workers, normalize_workers):
+        sequential = self._run("sequential", download_workers=1, normalize_workers=1)
+        parallel = self._run("parallel", download_workers, normalize_workers)
+
+        sort_by = ["url", "id_beneficiaire"]
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(parallel / "final.parquet").sort_values(sort_by, ignore_index=True),
+            pd.read_parquet(sequential / "final.parquet").sort_values(
+                sort_by, ignore_index=True
+            ),
+        )
+        # The failing download and two files failing the normalization
+        assert len(json.loads((sequential / "errors.json").read_text())) == 3
+        for filename in ["extra_columns.csv", "errors.json"]:
+            assert (parallel / filename).read_text() == (sequential / filename).read_text()
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(parallel / "missing_data.parquet"),
+            pd.read_parquet(sequential / "missing_data.parquet"),
+        )
+
+
 class TestYearFromMetadata:
     def test_from_dataset_title(self):
         files_in_scope = pd.DataFrame({"dataset_title": ["Subventions 2023."], "title": None})
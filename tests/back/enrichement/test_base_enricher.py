@@ -0,0 +1,185 @@
+from datetime import datetime
+from pathlib import Path
+
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from back.scripts.enrichment.bareme_enricher import BaremeEnricher
+from back.scripts.enrichment.base_enricher import BaseEnricher, eager
+from back.scripts.enrichment.communities_enricher import CommunitiesEnricher
+
+
+@eager
+def _types(frame, other=None):
+    return pl.DataFrame({"frame": [type(frame).__name__], "other": [type(other).__name__]})
+
+
+def test_eager_collects_lazy_frames():
+    frame = pl.DataFrame({"a": [1]})
+
+    actual = _types(frame.lazy(), other=frame.lazy())
+
+    assert isinstance(actual, pl.LazyFrame)
+    assert actual.collect().row(0) == ("DataFrame", "DataFrame")
+
+
+def test_eager_keeps_dataframes():
+    actual = _types(pl.DataFrame({"a": [1]}))
+
+    assert isinstance(actual, pl.DataFrame)
+    assert actual.row(0) == ("DataFrame", "NoneType")
+
+
+class DummyEnricher(BaseEnricher):
+    @classmethod
+    def get_dataset_name(cls) -> str:
+        return "dummy"
+
+    @classmethod
+    def get_input_paths(cls, main_config: dict) -> list[Path]:
+        folder = Path(main_config["warehouse"]["data_folder"])
+        return [folder / "left.parquet", folder / "right.parquet"]
+
+    @classmethod
+    def _clean_and_enrich(cls, inputs: list[pl.LazyFrame]) -> pl.LazyFrame:
+        left, right = inputs
+        assert isinstance(left, pl.LazyFrame)
+        return (
+            left.filter(pl.col("annee") == 2024)
+            .join(right.select("siren", "nom"), on="siren", how="left")
+            .pipe(cls.add_rang)
+        )
+
+    @staticmethod
+    @eager
+    def add_rang(frame: pl.DataFrame) -> pl.DataFrame:
+        return frame.with_columns(pl.Series("rang", range(frame.height)))
+
+
+@pytest.mark.parametrize("as_dataframe", [False, True])
+def test_enrich_writes_output(tmp_path, as_dataframe, monkeypatch):
+    pl.DataFrame({"siren": ["1", "2"], "annee": [2024, 2023]}).write_parquet(
+        tmp_path / "left.parquet"
+    )
+    pl.DataFrame({"siren": ["1"], "nom": ["A"], "autre": [0]}).write_parquet(
+        tmp_path / "right.parquet"
+    )
+    if as_dataframe:
+        enrich = DummyEnricher._clean_and_enrich.__func__
+        monkeypatch.setattr(
+            DummyEnricher,
+            "_clean_and_enrich",
+            classmethod(lambda cls, inputs: enrich(cls, inputs).collect()),
+        )
+    config = {"warehouse": {"data_folder": str(tmp_path)}}
+
+    DummyEnricher.enrich(config)
+
+    assert_frame_equal(
+        pl.read_parquet(tmp_path / "dummy.parquet"),
+        pl.DataFrame({"siren": ["1"], "annee": [2024], "nom": ["A"], "rang": [0]}),
+        check_dtypes=False,
+    )
+
+
+class DownstreamEnricher(BaseEnricher):
+    @classmethod
+    def get_dataset_name(cls) -> str:
+        return "downstream"
+
+    @classmethod
+    def get_input_paths(cls, main_config: dict) -> list[Path]:
+        return [DummyEnricher.get_output_path(main_config)]
+
+    @classmethod
+    def _clean_and_enrich(cls, inputs: list[pl.LazyFrame]) -> pl.LazyFrame:
+        (dummy,) = inputs
+        return dummy.select(pl.len())
+
+
+def _fixed_now(year: int) -> type[datetime]:
+    class FixedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(year, 1, 1, tzinfo=tz)
+
+    return FixedDatetime
+
+
+class TestIncrementalEnrich:
+    def setup_inputs(self, folder: Path, annee: int = 2024, nom: str = "A"):
+        pl.DataFrame({"siren": ["1", "2"], "annee": [annee, 2023]}).write_parquet(
+            folder / "left.parquet"
+        )
+        pl.DataFrame({"siren": ["1"], "nom": [nom], "autre": [0]}).write_parquet(
+            folder / "right.parquet"
+        )
+
+    def run(self, config: dict) -> list[str]:
+        return [
+            enricher.get_dataset_name()
+            for enricher in [DummyEnricher, DownstreamEnricher]
+            if enricher.enrich(config)
+        ]
+
+    def test_up_to_date_outputs_are_kept(self, tmp_path):
+        self.setup_inputs(tmp_path)
+        config = {"warehouse": {"data_folder": str(tmp_path)}}
+
+        assert self.run(config) == ["dummy", "downstream"]
+        assert self.run(config) == []
+        assert DummyEnricher.get_fingerprint_path(config).exists()
+
+    def test_changed_input_cascades(self, tmp_path):
+        self.setup_inputs(tmp_path)
+        config = {"warehouse": {"data_folder": str(tmp_path)}}
+        self.run(config)
+
+        self.setup_inputs(tmp_path, annee=2023)
+
+        assert self.run(config) == ["dummy", "downstream"]
+        assert pl.read_parquet(tmp_path / "downstream.parquet").item() == 0
+
+    def test_identical_output_does_not_cascade(self, tmp_path):
+        self.setup_inputs(tmp_path)
+        config = {"warehouse": {"data_folder": str(tmp_path)}}
+        self.run(config)
+
+        # Only a filtered out row changes
+        pl.DataFrame({"siren": ["1", "2"], "annee": [2024, 2022]}).write_parquet(
+            tmp_path / "left.parquet"
+        )
+
+        assert self.run(config) == ["dummy"]
+
+    def test_missing_output_or_fingerprint_rebuilds(self, tmp_path):
+        self.setup_inputs(tmp_path)
+        config = {"warehouse": {"data_folder": str(tmp_path)}}
+        self.run(config)
+
+        DummyEnricher.get_output_path(config).unlink()
+        assert DummyEnricher.enrich(config)
+        DummyEnricher.get_fingerprint_path(config).unlink()
+        assert DummyEnricher.enrich(config)
+
+    def test_changed_config_rebuilds(self, tmp_path, monkeypatch):
+        self.setup_inputs(tmp_path)
+        config = {"warehouse": {"data_folder": str(tmp_path)}}
+        self.run(config)
+
+        monkeypatch.setattr(
+            DummyEnricher, "get_config_slice", classmethod(lambda cls, config: {"seuil": 1})
+        )
+
+        assert self.run(config) == ["dummy"]
+
+    @pytest.mark.parametrize("enricher", [BaremeEnricher, CommunitiesEnricher])
+    def test_new_year_changes_config(self, enricher, monkeypatch):
+        config = {"warehouse": {"data_folder": "data"}}
+        slices = []
+        for year in (2025, 2026):
+            monkeypatch.setattr(f"{enricher.__module__}.datetime", _fixed_now(year))
+            slices.append(enricher.get_config_slice(config))
+
+        assert slices[0] != slices[1]
@@ -0,0 +1,319 @@
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import polars as pl
+import pytest
+
+from back.scripts.datasets.marches import MarchesPublicsWorkflow
+from back.scripts.enrichment.marches_enricher import MarchesPublicsEnricher
+
+RAW_MARCHES = (
+    Path(__file__).parents[3]
+    / "back/tests/data/marches_publics"
+    / "34ad127d2c6e13d4d3f50f75c4ddff0559c908a7f6147e7c4d344fb035a26683/raw.json"
+)
+COLUMNS = ["id", "objet", "montant", "dureeMois", "dateNotification", "datePublicationDonnees"]
+
+
+def tri_modification(mod):
+    return (
+        mod.get("datePublicationDonneesModification")
+        or mod.get("dateNotificationModification")
+        or mod.get("dateSignatureModification")
+        or mod.get("updated_at")
+        or (mod.get("id") if isinstance(mod.get("id"), str) else "")
+    )
+
+
+def appliquer_modifications_par_ligne(row):
+    """
+    Previous row-wise implementation, used as reference.
+    """
+    try:
+        modifications_list = json.loads(row["modifications"])
+    except (json.JSONDecodeError, TypeError):
+        return row
+    if not isinstance(modifications_list, list):
+        return row
+
+    modifs = [
+        mod["modification"] if isinstance(mod, dict) and "modification" in mod else mod
+        for mod in modifications_list
+    ]
+    for modif in sorted(modifs, key=tri_modification):
+        for key, value in modif.items():
+            if key == "id":
+                if isinstance(value, int):
+                    continue
+                elif isinstance(value, str):
+                    row["id"] = value
+                    continue
+
+            if (key == "titulaires") & isinstance(value, list):
+                flat = []
+                for v in value:
+                    if isinstance(v, list):
+                        flat.extend(v)
+                    else:
+                        flat.append(v)
+                if len(value) == 0:
+                    continue
+                if all(
+                    isinstance(d, dict) and all(val is None for val in d.values()) for d in flat
+                ):
+                    continue
+                if all(isinstance(d, dict) and "id" not in set(d.keys()) for d in flat):
+                    continue
+
+            base_key = key.replace("Modification", "") if key.endswith("Modification") else key
+            if base_key in row:
+                try:
+                    if isinstance(row[base_key], (float, int)):
+                        row[base_key] = float(value)
+                    else:
+                        row[base_key] = value
+                except (ValueError, TypeError):
+                    row[base_key] = value
+    return row
+
+
+def _marches(declarations: list[dict]) -> pl.DataFrame:
+    rows = []
+    for declaration in declarations:
+        row = MarchesPublicsWorkflow.clean_row(declaration)
+        rows.append(
+            {column: row.get(column) for column in COLUMNS}
+            | {
+                "titulaires": json.dumps(row["titulaires"]) if "titulaires" in row else None,
+                "modifications": row.get("modifications"),
+            }
+        )
+    return pl.DataFrame(rows, schema_overrides={"montant": pl.Float64}).with_row_index("id_mp")
+
+
+def _comparable(frame: pd.DataFrame) -> list[dict]:
+    return [
+        {
+            k: json.loads(v) if k == "titulaires" and isinstance(v, str) else v
+            for k, v in row.items()
+            if not (v is None or (isinstance(v, float) and pd.isna(v)))
+        }
+        for row in frame.drop(columns=["modifications"]).to_dict(orient="records")
+    ]
+
+
+DECLARATIONS = [
+    {
+        "id": "unsorted",
+        "montant": 100,
+        "dureeMois": 12,
+        "titulaires": [{"id": "1", "denominationSociale": "A"}],
+        "modifications": [
+            {"montant": 300, "datePublicationDonneesModification": "2024-02-01"},
+            {
+                "montant": "200,5",
+                "dureeMois": 24,
+                "datePublicationDonneesModification": "2024-01-01",
+                "titulaires": [[{"id": "2", "denominationSociale": "B"}]],
+            },
+        ],
+    },
+    {
+        "id": "wrapped",
+        "montant": 100,
+        "titulaires": [{"id": "1"}],
+        "modifications": [
+            {
+                "modification": {
+                    "id": "nouvel-id",
+                    "montantModification": 150,
+                    "dateNotificationModification": "2024-03-07",
+                    "titulaires": [{"titulaire": {"id": "3"}}],
+                }
+            }
+        ],
+    },
+    {
+        "id": "titulaires-vides",
+        "objet": "objet",
+        "titulaires": [{"id": "1"}],
+        "modifications": [
+            {"id": 1, "titulaires": []},
+            {"id": 2, "titulaires": [{"id": None, "denominationSociale": None}]},
+            {"id": 3, "objetModification": "nouvel objet"},
+        ],
+    },
+    {"id": "vide", "montant": 1, "modifications": []},
+    {"id": "dict", "montant": 1, "modifications": {"montant": 2}},
+    {"id": "sans", "montant": 1},
+]
+
+
+def test_same_as_row_wise_on_fixtures():
+    declarations = json.loads(RAW_MARCHES.read_text())["marches"]["marche"]
+    marches = _marches(declarations + DECLARATIONS)
+
+    expected = marches.to_pandas().apply(appliquer_modifications_par_ligne, axis=1)
+    actual = MarchesPublicsEnricher.appliquer_modifications(marches)
+
+    assert actual.columns == marches.columns
+    assert _comparable(actual.to_pandas()) == _comparable(expected)
+
+
+@pytest.mark.parametrize("modifications", ["pas du json", None, "[]"])
+def test_invalid_modifications_ignored(modifications):
+    marches = pl.DataFrame(
+        {"id_mp": [1], "id": ["a"], "montant": [1.0], "modifications": [modifications]},
+        schema_overrides={"modifications": pl.String},
+    )
+
+    actual = MarchesPublicsEnricher.appliquer_modifications(marches)
+
+    assert actual.to_dicts() == marches.to_dicts()
+
+
+def test_no_modifications():
+    marches = pl.DataFrame(
+        {
+            "id_mp": [1, 2],
+            "id": ["a", "b"],
+            "montant": [1.0, 2.0],
+            "titulaires": ["[]", '[{"id": "1"}]'],
+            "modifications": ["[]", None],
+        }
+    )
+
+    actual = MarchesPublicsEnricher.appliquer_modifications(marches)
+
+    assert actual.to_dicts() == marches.to_dicts()
+
+
+def test_unnest_titulaires():
+    marches = pl.DataFrame(
+        {
+            "id": ["liste", "imbriquee", "dict", "titulaire", "repr", "vide", "nulle"],
+            "titulaires": [
+                '[{"id": "1", "denominationSociale": "A"}, {"id": 2}]',
+                '[[{"id": "3"}]]',
+                '{"id": "4", "typeIdentifiant": "SIRET"}',
+                '{"titulaire": [{"id": "5"}]}',
+                "[{'id': '6', 'denominationSociale': None}]",
+                "[]",
+                None,
+            ],
+        }
+    )
+
+    actual = MarchesPublicsEnricher.unnest_titulaires(marches)
+
+    assert actual["id"].to_list() == [
+        "liste",
+        "liste",
+        "imbriquee",
+        "dict",
+        "titulaire",
+        "repr",
+        "vide",
+        "nulle",
+    ]
+    assert actual["titulaire_id"].to_list() == ["1", "2", "3", "4", "5", "6", None, None]
+    assert actual["titulaire_denominationSociale"].to_list()[:2] == ["A", None]
+    assert actual["titulaire_typeIdentifiant"].to_list()[3] == "SIRET"
+    assert "titulaires" not in actual.columns
+
+
+def test_normalize_date():
+    marches = pl.DataFrame(
+        {
+            "date": [
+                "2024-03-07",
+                "2024-03-07+01:00",
+                "2024-03-07T10:30:15.5Z",
+                "2024-03-07 10:30-02:30",
+                "07/03/2024",
+                "2024/03/07",
+                "07-03-2024",
+                "2024",
+                "1999-01-01",
+                "2000-01-01T00:30:00+01:00",
+                "test",
+            ]
+        }
+    )
+
+    actual = MarchesPublicsEnricher.normalize_date(marches, "date")
+
+    expected = datetime(2024, 3, 7, tzinfo=timezone.utc)
+    assert actual["date"].to_list() == [
+        expected,
+        datetime(2024, 3, 6, 23, tzinfo=timezone.utc),
+        datetime(2024, 3, 7, 10, 30, 15, 500_000, tzinfo=timezone.utc),
+        datetime(2024, 3, 7, 13, tzinfo=timezone.utc),
+        expected,
+        expected,
+        expected,
+        datetime(2024, 1, 1, tzinfo=timezone.utc),
+        None,
+        None,
+        None,
+    ]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ('["b", "a", "b"]', "a et b"),
+        ('{"typePrix": ["Révisable", "Ferme"]}', "Ferme et Révisable"),
+        ('{"typePrix": "Ferme"}', "Ferme"),
+        ('{"typePrix": []}', None),
+        ('{"autre": "Ferme"}', None),
+        ('{"typePrix": 5}', None),
+        ('{"typePrix": true}', None),
+        ('{"typePrix": {"a": 1}}', None),
+        ('{"typePrix" : "5"}', "5"),
+        ('{"typePrix": "[Ferme]"}', "[Ferme]"),
+        ('{"typePrix": "{Ferme}"}', "{Ferme}"),
+        ('{"typePrix": [1, 2]}', '{"typePrix": [1, 2]}'),
+        ("[]", None),
+        ("Forfaitaire", "Forfaitaire"),
+        ('[{"a": 1}]', '[{"a": 1}]'),
+        ("123", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_generic_json_column_enrich(value, expected):
+    marches = pl.DataFrame({"typesPrix": [value]}, schema={"typesPrix": pl.String})
+
+    actual = MarchesPublicsEnricher.generic_json_column_enrich(marches, "typesPrix", "typePrix")
+
+    assert actual["typesPrix"].to_list() == [expected]
+
+
+def test_lieu_execution_enrich():
+    marches = pl.DataFrame(
+        {
+            "lieuExecution": [
+                '{"code": "75001", "typeCode": "Code postal", "nom": "PARIS"}',
+                '{"code": 21, "typeCode": "Bourgogne"}',
+                '{"code": "2A", "typeCode": "Code département", "nom": "Corse"}',
+                "pas du json",
+                None,
+            ]
+        }
+    )
+
+    actual = MarchesPublicsEnricher.lieu_execution_enrich(marches)
+
+    assert actual["lieu_execution_nom"].to_list() == ["paris", None, "corse", None, None]
+    assert actual["lieu_execution_code_postal"].to_list() == ["75001", None, None, None, None]
+    assert actual["lieu_execution_code_departement"].to_list() == [
+        "75",
+        "21",
+        "2a",
+        None,
+        None,
+    ]
+    assert "lieuExecution" not in actual.columns
@@ -11,6 +11,13 @@ class BaseLoader(BaseLoaderBase):
     file_media_type_regex = None
 
 
+@pytest.fixture(autouse=True)
+def clear_resolution_cache():
+    BaseLoader.clear_resolution_cache()
+    yield
+    BaseLoader.clear_resolution_cache()
+
+
 class TestBaseLoader:
     def test_get_file_is_url(self):
         is_url = BaseLoader.get_file_is_url("http://example.com")
@@ -161,6 +168,34 @@ class TestBaseLoader:
             loader_url.load(force=False)
         assert loader_url.load(force=True) == expected_data
 
+    @responses.activate
+    def test_search_loader_class_from_extension(self):
+        # No request is registered: a HEAD request would fail
+        loader_class = BaseLoader.search_loader_class("https://example.com/file.csv")
+        assert loader_class.__name__ == "CSVLoader"
+
+    @responses.activate
+    def test_search_loader_class_cached(self):
+        url = "https://example.com/resource"
+        responses.add(responses.HEAD, url, status=200, content_type="text/csv")
+
+        assert BaseLoader.search_loader_class(url).__name__ == "CSVLoader"
+        assert BaseLoader.search_loader_class(url).__name__ == "CSVLoader"
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_media_type_from_download(self):
+        loader_url = BaseLoader("https://example.com/resource")
+        loader_url.process_data = lambda _: "processed_data"
+        responses.add(
+            responses.GET, loader_url.file_url, status=200, content_type="application/json"
+        )
+
+        loader_url.load()
+
+        assert BaseLoader.get_file_media_type(loader_url.file_url) == "application/json"
+        assert len(responses.calls) == 1
+
     def test_empty_file_url(self):
         loader_file = BaseLoader("")
         with pytest.raises(RuntimeError):
@@ -260,3 +260,14 @@ class TestCSVLoader:
         df = loader.load()
         assert isinstance(df, pd.DataFrame)
         assert df.shape[1] > 1
+
+    def test_encoding_error_after_sample(self, tmp_path):
+        """The encoding is checked on a sample only, a later decoding error falls back to the next encoding."""
+        filename = tmp_path / "late_latin1.csv"
+        rows = ["name;age"] + ["John;30"] * 20_000 + ["Jos\xe9;45"]
+        filename.write_bytes("\n".join(rows).encode("latin1"))
+
+        df = CSVLoader(filename).load()
+
+        assert df.shape[1] == 2
+        assert df.iloc[-1, 0] == "José"
@@ -0,0 +1,31 @@
+import pandas as pd
+import polars as pl
+
+from back.scripts.loaders import BaseLoader
+from back.scripts.loaders.parquet_loader import ParquetLoader
+
+
+def test_load_lazy_pushdown(tmp_path):
+    filename = tmp_path / "test.parquet"
+    pd.DataFrame({"siren": ["1", "2", "3"], "naf8": ["A", "B", "A"], "other": 0}).to_parquet(
+        filename
+    )
+
+    frame = ParquetLoader(filename, columns=["siren", "naf8"]).load_lazy()
+
+    assert isinstance(frame, pl.LazyFrame)
+    # Projection and filter are pushed down into the parquet scan
+    plan = frame.filter(pl.col("naf8") == "A").explain()
+    assert "PROJECT 2/3 COLUMNS" in plan
+    assert "SELECTION" in plan
+    assert frame.filter(pl.col("naf8") == "A").collect()["siren"].to_list() == ["1", "3"]
+
+
+def test_load_lazy_default_wraps_eager_load(tmp_path):
+    filename = tmp_path / "test.csv"
+    filename.write_text("siren,naf8\n1,A\n2,B\n")
+
+    frame = BaseLoader.loader_factory(filename, dtype={"siren": str}).load_lazy()
+
+    assert isinstance(frame, pl.LazyFrame)
+    assert frame.collect().to_dict(as_series=False) == {"siren": ["1", "2"], "naf8": ["A", "B"]}
@@ -1,6 +1,8 @@
+import zipfile
+
 import pandas as pd
 
-from back.scripts.loaders import JSONLoader, ZipLoader
+from back.scripts.loaders import CSVLoader, JSONLoader, ZipLoader
 
 
 def test_zip_loader():
@@ -37,3 +39,42 @@ class Test_get_archive_prefix:
     def test_find_json_with_path(self):
         loader = ZipLoader(file_url="https://example.com/data/json/test.zip")
         assert loader.get_archive_prefix() == "test"
+
+
+class TestStreamedMembers:
+    def test_csv_member(self, tmp_path):
+        archive = tmp_path / "data.zip"
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("readme.txt", "not data")
+            zf.writestr(
+                "data.csv",
+                "name;age;city\nJos\xe9;30;New York\nAnna;25;Los Angeles\nPeter;45;Chicago".encode(
+                    "latin1"
+                ),
+            )
+
+        df = ZipLoader(archive, archived_file_loader_class=CSVLoader).load()
+
+        pd.testing.assert_frame_equal(
+            df,
+            pd.DataFrame(
+                {
+                    "name": ["José", "Anna", "Peter"],
+                    "age": [30, 25, 45],
+                    "city": ["New York", "Los Angeles", "Chicago"],
+                }
+            ),
+        )
+        # Nothing is extracted next to the archive
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["data.zip"]
+
+    def test_parquet_member(self, tmp_path):
+        expected = pd.DataFrame({"siren": ["1", "2"], "montant": [1.0, 2.0]})
+        expected.to_parquet(tmp_path / "data.parquet")
+        archive = tmp_path / "data.zip"
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.write(tmp_path / "data.parquet", "data.parquet")
+
+        df = ZipLoader(archive, columns=["montant"]).load()
+
+        pd.testing.assert_frame_equal(df, expected[["montant"]])
@@ -0,0 +1,167 @@
+import hashlib
+import http.client
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from back.scripts.utils.downloads import HostThrottle, IntegrityError, download
+
+
+class TestHostThrottle:
+    def _run(self, throttle: HostThrottle, urls: list[str], duration: float = 0.05) -> dict:
+        lock = threading.Lock()
+        current: dict[str, int] = {}
+        peaks: dict[str, int] = {}
+        starts: dict[str, list[float]] = {}
+
+        def request(url: str) -> None:
+            host = url.split("/")[2]
+            with throttle.slot(url):
+                with lock:
+                    current[host] = current.get(host, 0) + 1
+                    peaks[host] = max(peaks.get(host, 0), current[host])
+                    starts.setdefault(host, []).append(time.monotonic())
+                time.sleep(duration)
+                with lock:
+                    current[host] -= 1
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(request, urls))
+        return {"peaks": peaks, "starts": starts}
+
+    def test_limits_concurrency_per_host(self):
+        urls = [f"https://a.fr/{i}" for i in range(6)] + [f"https://b.fr/{i}" for i in range(6)]
+
+        result = self._run(HostThrottle(max_per_host=2), urls)
+
+        assert result["peaks"] == {"a.fr": 2, "b.fr": 2}
+
+    def test_delay_between_requests_on_same_host(self):
+        sleeps = []
+        throttle = HostThrottle(
+            max_per_host=3, delay=0.1, clock=lambda: 0.0, sleep=sleeps.append
+        )
+
+        for url in ["https://a.fr/0", "https://a.fr/1", "https://b.fr/0", "https://a.fr/2"]:
+            with throttle.slot(url):
+                pass
+
+        assert sleeps == [0.1, 0.2]
+
+
+class _VersionedHandler(BaseHTTPRequestHandler):
+    """
+    Serve a file with an ETag, answering 304 to matching conditional requests
+    and 206 to range requests. The connection is cut after `truncate` bytes if set.
+    """
+
+    content = b"v1"
+    truncate: int | None = None
+    requests: list[dict] = []
+
+    def do_GET(self):
+        etag = '"' + hashlib.sha1(self.content).hexdigest() + '"'
+        self.requests.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        start = 0
+        if self.headers.get("Range") and self.headers.get("If-Range") == etag:
+            start = int(self.headers["Range"].removeprefix("bytes=").rstrip("-"))
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(self.content) - 1}/{len(self.content)}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(self.content) - start))
+        self.end_headers()
+        self.wfile.write(self.content[start : self.truncate])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _VersionedHandler.content = b"v1"
+    _VersionedHandler.truncate = None
+    _VersionedHandler.requests = []
+    httpd = HTTPServer(("127.0.0.1", 0), _VersionedHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}/file.json"
+    httpd.shutdown()
+
+
+class TestDownload:
+    def test_existing_file_is_kept(self, server, tmp_path):
+        path = tmp_path / "raw.json"
+        path.write_bytes(b"local")
+
+        assert not download(server, path)
+
+        assert path.read_bytes() == b"local"
+        assert _VersionedHandler.requests == []
+
+    def test_revalidation(self, server, tmp_path):
+        path = tmp_path / "raw.json"
+        assert download(server, path)
+        assert path.read_bytes() == b"v1"
+
+        # Unchanged resource : the server answers 304 and the file is kept
+        assert not download(server, path, refresh=True)
+        assert "If-None-Match" in _VersionedHandler.requests[-1]
+
+        # Modified resource : the file is downloaded again
+        _VersionedHandler.content = b"v2"
+        assert download(server, path, refresh=True)
+        assert path.read_bytes() == b"v2"
+        assert not path.with_name("raw.json.part").exists()
+
+    def _interrupted_download(self, server, path) -> None:
+        _VersionedHandler.content = bytes(range(100))
+        _VersionedHandler.truncate = 40
+        with pytest.raises((http.client.IncompleteRead, IntegrityError)):
+            download(server, path)
+        _VersionedHandler.truncate = None
+
+    def test_resume_interrupted_download(self, server, tmp_path):
+        path = tmp_path / "raw.json"
+        self._interrupted_download(server, path)
+        assert not path.exists()
+        assert path.with_name("raw.json.part").stat().st_size == 40
+
+        assert download(server, path)
+
+        assert _VersionedHandler.requests[-1]["Range"] == "bytes=40-"
+        assert path.read_bytes() == bytes(range(100))
+        assert not path.with_name("raw.json.part").exists()
+
+    def test_resume_modified_resource_restarts(self, server, tmp_path):
+        path = tmp_path / "raw.json"
+        self._interrupted_download(server, path)
+
+        _VersionedHandler.content = b"v2"
+        assert download(server, path)
+
+        assert path.read_bytes() == b"v2"
+
+    def test_checksum(self, server, tmp_path):
+        path = tmp_path / "raw.json"
+        assert download(server, path, checksum=hashlib.sha1(b"v1").hexdigest())
+        assert path.read_bytes() == b"v1"
+
+    def test_checksum_mismatch(self, server, tmp_path):
+        path = tmp_path / "raw.json"
+        with pytest.raises(IntegrityError):
+            download(server, path, checksum=hashlib.sha1(b"v0").hexdigest())
+
+        # The corrupted file is neither moved into place, nor kept to be resumed
+        assert not path.exists()
+        assert not path.with_name("raw.json.part").exists()
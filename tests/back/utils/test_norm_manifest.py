@@ -0,0 +1,75 @@
+import polars as pl
+
+from back.scripts.utils.norm_manifest import NormManifest
+
+
+def _write_norm(folder, url_hash: str, n_rows: int):
+    path = folder / url_hash / "norm.parquet"
+    path.parent.mkdir(parents=True)
+    pl.DataFrame({"value": list(range(n_rows))}).write_parquet(path)
+    return path
+
+
+class TestNormManifest:
+    def test_bootstrap_from_existing_files(self, tmp_path):
+        _write_norm(tmp_path, "b", 2)
+        _write_norm(tmp_path, "a", 1)
+
+        manifest = NormManifest(tmp_path)
+
+        assert manifest.normalized_hashes() == {"a", "b"}
+        assert manifest.normalized_paths() == [
+            tmp_path / "a" / "norm.parquet",
+            tmp_path / "b" / "norm.parquet",
+        ]
+
+    def test_record_does_not_rescan(self, tmp_path):
+        manifest = NormManifest(tmp_path)
+        assert manifest.normalized_hashes() == set()
+
+        path = _write_norm(tmp_path, "a", 3)
+        _write_norm(tmp_path, "not_recorded", 1)
+        manifest.record_normalized("a", path, duration=0.5)
+        manifest.record_failed("b", error="boom")
+
+        assert manifest.normalized_hashes() == {"a"}
+        assert manifest.failures() == {"b": "boom"}
+
+    def test_failure_then_success(self, tmp_path):
+        manifest = NormManifest(tmp_path)
+        manifest.record_failed("a")
+
+        manifest.record_normalized("a", _write_norm(tmp_path, "a", 3))
+
+        assert manifest.normalized_hashes() == {"a"}
+        assert manifest.failures() == {}
+
+    def test_deleted_files_are_dropped(self, tmp_path):
+        manifest = NormManifest(tmp_path)
+        for url_hash in ["a", "b"]:
+            manifest.record_normalized(url_hash, _write_norm(tmp_path, url_hash, 1))
+
+        (tmp_path / "a" / "norm.parquet").unlink()
+
+        assert manifest.normalized_paths() == [tmp_path / "b" / "norm.parquet"]
+        assert manifest.normalized_hashes() == {"b"}
+
+    def test_normalized_files(self, tmp_path):
+        manifest = NormManifest(tmp_path)
+        manifest.record_normalized("a", _write_norm(tmp_path, "a", 1))
+        manifest.record_normalized("b", _write_norm(tmp_path, "b", 2))
+        path = tmp_path / "c" / "norm.parquet"
+        path.parent.mkdir()
+        pl.DataFrame({"other": ["x"]}).write_parquet(path)
+        manifest.record_normalized("c", path)
+
+        files = manifest.normalized_files()
+
+        assert list(files) == ["a", "b", "c"]
+        assert [file.path for file in files.values()] == manifest.normalized_paths()
+        assert files["a"].schema_fingerprint == files["b"].schema_fingerprint
+        assert files["a"].schema_fingerprint != files["c"].schema_fingerprint
+        assert manifest.schema_fingerprints() == {
+            files["a"].schema_fingerprint,
+            files["c"].schema_fingerprint,
+        }
@@ -0,0 +1,42 @@
+import polars as pl
+import polars.testing as pltesting
+
+from back.scripts.utils.dataframe_operation import IdentifierFormat
+from back.scripts.utils.polars_operation import normalize_identifiant_pl, normalize_montant_pl
+
+
+class TestNormalizeMontant:
+    def test_column_not_present(self):
+        df = pl.DataFrame({"other_col": [1, 2, 3]})
+        result = normalize_montant_pl(df, "missing_col")
+        pltesting.assert_frame_equal(result, df)
+
+    def test_int_column_is_cast_to_float(self):
+        df = pl.DataFrame({"amount": [1, -2, 3]})
+        expected = pl.DataFrame({"amount": [1.0, 2.0, 3.0]})
+        result = normalize_montant_pl(df, "amount")
+        pltesting.assert_frame_equal(result, expected)
+
+    def test_string_with_special_characters(self):
+        df = pl.DataFrame(
+            {"amount": ["1,500 €", "2 500 euros", "3,500.00", "125.3", "-1000", None, ""]}
+        )
+        expected = pl.DataFrame({"amount": [1500.0, 2500.0, 3500.0, 125.3, 1000, None, None]})
+        result = normalize_montant_pl(df, "amount")
+        pltesting.assert_frame_equal(result, expected)
+
+
+class TestNormalizeIdentifiant:
+    def test_siren_and_siret(self):
+        df = pl.DataFrame(
+            {"id": ["123456789", "12345678900012.0", " 123 456 789 ", "12", None]}
+        )
+        result = normalize_identifiant_pl(df, "id", IdentifierFormat.SIREN)
+        expected = pl.DataFrame({"id": ["123456789", "123456789", "123456789", None, None]})
+        pltesting.assert_frame_equal(result, expected)
+
+        result = normalize_identifiant_pl(df, "id", IdentifierFormat.SIRET)
+        expected = pl.DataFrame(
+            {"id": ["12345678900000", "12345678900012", "12345678900000", None, None]}
+        )
+        pltesting.assert_frame_equal(result, expected)